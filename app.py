@@ -4,6 +4,18 @@ import streamlit as st
 st.set_page_config(page_title="Halo", layout="wide")
 
 from utils.semantic_matcher import find_best_matching_qid  # returns (qid, prompt, score)
+from utils.intent_prompts import SUGGESTED_PROMPTS
+from utils.dataset_version import get_dataset_service, current_version
+from utils.schema_registry import apply_schema
+from utils.param_extractor import extract_params
+from utils.intent_rules import is_q1_margin_below_intent, is_q3_cb_variance_intent
+from utils.question_runner import (get_question_runner, get_fallback_runner, current_session_id,
+                                   budget_for, QuestionTimeout, QuestionCancelled)
+from utils.batch_questions import run_batch
+from utils.result_cache import cached_result
+from utils.groupby_kernels import cached_fingerprint
+from utils.table_server import serve_table
+from questions.question_q10 import load_cohort as load_fresher_cohort
 import importlib
 from kpi_engine import margin
 import os
@@ -28,17 +40,7 @@ def _safe_has_cols(frame: pd.DataFrame, cols) -> bool:
 # -----------------------------
 # Prompt bank (preserving UX)
 # -----------------------------
-PROMPT_BANK = [
-    "List accounts with margin % less than 30% in the last quarter",
-    "Which cost caused margin drop last month in Transportation?",
-    "How much C&B varied from last quarter to this quarter?",
-    "C&B cost as percentage of revenue trend",
-    "What is FTE trend over months?",
-    "How is utilization % trending?",
-    "realized rate",
-    "revenue per person",
-    "fresher ut trend"
-]
+PROMPT_BANK = list(SUGGESTED_PROMPTS)
 
 # -----------------------------
 # Session state (preserved)
@@ -60,29 +62,25 @@ def clear_input():
 # Data loaders (P&L preserved) + OPTIONAL UT loader
 # -----------------------------
 load_dotenv('.env.template')
-@st.cache_data
-
-def load_pnl():
+@st.cache_data(max_entries=2)
+def load_pnl(dataset_version=None):
+    # dataset_version only keys the cache: a new version reloads, the old entry is evicted
       # Explicitly load from .env.template
     
     # 2. Get configuration
     filepath = "LnTPnL.xlsx"
     
     df = margin.load_pnl_data(filepath)
-    df = margin.preprocess_pnl_data(df)
-    # Ensure Month is datetime for filtering
-    if "Month" in df.columns:
-        try:
-            df["Month"] = pd.to_datetime(df["Month"], errors="coerce")
-        except Exception:
-            pass
+    df = margin.preprocess_pnl_data(df)  # Month is datetime via the schema registry
     if df.empty:
         raise ValueError("Loaded P&L data is empty after preprocessing.")
+    # Hashed once per dataset version; cache keys downstream reuse it
+    cached_fingerprint(df)
     return df
 
 
-@st.cache_data
-def load_ut_optional():
+@st.cache_data(max_entries=2)
+def load_ut_optional(dataset_version=None):
     ut_path = "LNTData.xlsx"  # Matches os.path.join("sample_data", "LNTData.xlsx")
 
     try:
@@ -102,33 +100,34 @@ def load_ut_optional():
             file_obj.seek(0)
             df = pd.read_excel(file_obj)
         
-        df.columns = [str(c).strip() for c in df.columns]
-
-        if "Date_a" in df.columns:
-            df["Date_a_dt"] = pd.to_datetime(df["Date_a"], errors="coerce")
-            df["Year"] = df["Date_a_dt"].dt.year
-            df["MonthNum"] = df["Date_a_dt"].dt.month
-            df["MonthName"] = df["Date_a_dt"].dt.strftime("%b")
-        else:
-            if "Month" in df.columns and pd.api.types.is_numeric_dtype(df["Month"]):
-                month_map = {1:"Jan",2:"Feb",3:"Mar",4:"Apr",5:"May",6:"Jun",
-                            7:"Jul",8:"Aug",9:"Sep",10:"Oct",11:"Nov",12:"Dec"}
-                df["MonthName"] = df["Month"].map(month_map)
-                df["MonthNum"] = df["Month"]
+        # Column aliases, dtypes and Date_a_dt/Year/MonthNum/MonthName
+        df = apply_schema(df, "ut")
         # ▲ END OF ORIGINAL LOGIC
+        cached_fingerprint(df)
         
         return df
         
     except Exception:  # ← Same silent error handling
         return None
 
+# New dataset versions are built in the background, then swapped in
+try:
+    dataset_service = get_dataset_service()
+    dataset_service.register_builder("pnl", load_pnl)
+    dataset_service.register_builder("ut", load_ut_optional)
+    dataset_service.register_builder("fresher_cohort", load_fresher_cohort)
+except Exception:
+    dataset_service = None  # metadata unreachable: serve the unversioned data
+
+dataset_version = current_version()
+
 try:
-    df_pnl = load_pnl()
+    df_pnl = load_pnl(dataset_version)
 except Exception as e:
     st.error(f"❌ Failed to load data: {e}")
     st.stop()
 
-df_ut = load_ut_optional()  # may be None (non-breaking)
+df_ut = load_ut_optional(dataset_version)  # may be None (non-breaking)
 
 # -----------------------------
 # Header (preserved)
@@ -270,36 +269,10 @@ def series_to_million(s: pd.Series) -> pd.Series:
 SIM_THRESHOLD = 0.72
 FREEFORM_TRIGGERS = ("ai:", "freeform:", "ad-hoc:")
 
-MONTH_ALIASES = {
-    "jan": 1, "january": 1,
-    "feb": 2, "february": 2,
-    "mar": 3, "march": 3,
-    "apr": 4, "april": 4,
-    "may": 5,
-    "jun": 6, "june": 6,
-    "jul": 7, "july": 7,
-    "aug": 8, "august": 8,
-    "sep": 9, "sept": 9, "september": 9,
-    "oct": 10, "october": 10,
-    "nov": 11, "november": 11,
-    "dec": 12, "december": 12
-}
-
 def parse_month_year_from_text(q: str):
     """Returns (month_num, year) if found; otherwise (None, None)."""
-    ql = (q or "").lower()
-    m = re.search(
-        r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|june|july|august|september|october|november|december)\s+(\d{4})\b",
-        ql,
-    )
-    if m:
-        month_token, year = m.group(1), int(m.group(2))
-        month_num = MONTH_ALIASES.get(month_token, None)
-        return month_num, year
-    for token, mnum in MONTH_ALIASES.items():
-        if re.search(rf"\b{token}\b", ql):
-            return mnum, None
-    return None, None
+    params = extract_params(q)
+    return params.month, params.year
 
 def parse_account_token(q: str):
     """Light account parser: tokens like 'A1', 'A-1'."""
@@ -318,36 +291,6 @@ def _unique_nontrivial_values(series: pd.Series):
     )
     return [v for v in vals if isinstance(v, str) and len(v.strip()) >= 3]
 
-# =========================================================
-# (NEW) Lightweight rule override for Q1 — "margin % below <N>"
-# =========================================================
-_Q1_PATTERNS = [
-    r"\b(?:margin|gm|cm)\s*%?\s*<\s*\d+\s*%?",
-    r"\b(?:margin|gm|cm)\s*(?:%|percent|percentage)?\s*(?:less than|below|under)\s*\d+\s*%?",
-    r"\b(?:less than|below|under)\s*\d+\s*%?\s*(?:margin|gm|cm)\b",
-]
-def _is_q1_margin_below_intent(q: str | None) -> bool:
-    if not q:
-        return False
-    ql = q.lower()
-    return any(re.search(p, ql) for p in _Q1_PATTERNS)
-
-# =========================================================
-# (NEW) Lightweight rule override for Q3 — "C&B quarter-over-quarter change"
-# =========================================================
-_Q3_PATTERNS = [
-    r"\bc\s*&\s*b\b.*\b(var(?:y|ied)|change|delta|diff(?:erence)?)\b.*\bquarter\b",
-    r"\bc\s*and\s*b\b.*\b(var(?:y|ied)|change|delta|diff(?:erence)?)\b.*\bquarter\b",
-    r"\bc&b\b.*\bqoq\b",
-    r"\bqoq\b.*\bc&b\b",
-    r"\bcompare\b.*\bc&b\b.*\bquarter\b",
-]
-def _is_q3_cb_variance_intent(q: str | None) -> bool:
-    if not q:
-        return False
-    ql = q.lower()
-    return any(re.search(p, ql) for p in _Q3_PATTERNS)
-
 # =========================================================
 # UT headcount fallback (multi-dimension + Date_a) — working
 # =========================================================
@@ -590,7 +533,7 @@ def _generic_margin_summary(df: pd.DataFrame, user_q: str):
             by_acct = dff.groupby([key, "Type"], dropna=False)[amount_col].sum().reset_index()
             by_acct[amount_col] = series_to_million(by_acct[amount_col])
             st.markdown(f"**By {key}** (values in {unit})")
-            st.dataframe(by_acct.head(50))
+            serve_table(by_acct, f"by_acct_{key}")
             break
 
 def _use_kpi_tools_if_available(user_q: str, df: pd.DataFrame):
@@ -723,32 +666,127 @@ def ai_fallback(user_q: str, df: pd.DataFrame):
         _generic_margin_summary(df, user_q)
     st.success("✅ AI-generated fallback completed.")
 
+# =========================================================
+# Off-thread question execution (time budgets + cancellation)
+# =========================================================
+FALLBACK_TIMEOUT_S = 15
+
+def render_structured(result):
+    """Generic rendering of a batch-mode (structured) answer."""
+    if isinstance(result, pd.DataFrame):
+        st.dataframe(result)
+    elif hasattr(result, "_asdict"):
+        render_structured(result._asdict())
+    elif isinstance(result, dict):
+        for key, value in result.items():
+            if isinstance(value, (pd.DataFrame, dict)) or hasattr(value, "_asdict"):
+                st.markdown(f"**{key}**")
+                render_structured(value)
+            else:
+                st.markdown(f"**{key}**: {value}")
+    elif result is not None:
+        st.write(result)
+
+def approximate_answer(qid: str, user_q: str, matched_prompt, score):
+    """
+    Answer from the shared result cache or the batch engines (already warm
+    for most sessions), within a short budget of its own and on a pool of
+    its own: the timed-out run may still hold a question worker.
+    """
+    runner = get_fallback_runner()
+    params = {"question": user_q, "source": cached_fingerprint(df_pnl)}
+    compute = lambda: run_batch([user_q], {"pnl": df_pnl, "ut": df_ut},
+                                matcher=lambda qs: [(qid, matched_prompt, score)])[0]
+    run = runner.submit(f"{current_session_id()}:fallback", cached_result, f"approx_{qid}", params, compute, qid=qid)
+    try:
+        answer = runner.wait(run, timeout=FALLBACK_TIMEOUT_S)
+    except (QuestionTimeout, QuestionCancelled):
+        answer = None
+    if answer is None or answer.error:
+        st.info("No cached or approximate answer is available for this question yet. Please try again shortly.")
+        return
+    st.caption("Approximate answer (cached or from the shared KPI engines):")
+    render_structured(answer.result)
+
+def run_question(qid: str, run_func, run_args, user_q: str, matched_prompt=None, score=None):
+    """
+    Run a question module on the worker pool within its time budget. A newer
+    question from this session cancels the run; a timeout falls back to
+    approximate_answer() instead of blocking the page.
+    Returns (completed, result).
+    """
+    runner = get_question_runner()
+    run = runner.submit(current_session_id(), run_func, *run_args, qid=qid)
+    progress = st.empty()
+    shown = {"seconds": 0}
+
+    def on_tick(elapsed):
+        # Also a yield point: a rerun (edited question) interrupts the wait here
+        if int(elapsed) > shown["seconds"]:
+            shown["seconds"] = int(elapsed)
+            progress.caption(f"⏳ Running {qid}… {shown['seconds']}s (budget {budget_for(qid):.0f}s)")
+
+    try:
+        return True, runner.wait(run, on_tick=on_tick)
+    except QuestionTimeout as e:
+        progress.empty()
+        st.warning(f"{e} Showing an approximate answer instead.")
+        approximate_answer(qid, user_q, matched_prompt, score)
+    except QuestionCancelled:
+        st.info("This question was superseded by a newer one.")
+    finally:
+        progress.empty()
+    return False, None
+
+# =========================================================
+# Routing (pinned per question)
+# =========================================================
+def match_question(user_q: str):
+    """(qid, matched_prompt, score, note) from the matcher and the rule-based overrides."""
+    res = find_best_matching_qid(user_q)
+    best_qid, matched_prompt, score = None, None, None
+    if isinstance(res, tuple):
+        if len(res) == 3:
+            best_qid, matched_prompt, score = res
+        elif len(res) == 2:
+            best_qid, matched_prompt = res
+        elif len(res) == 1:
+            best_qid = res[0]
+    elif isinstance(res, dict):
+        best_qid = res.get("qid") or res.get("best_qid")
+        matched_prompt = res.get("prompt") or res.get("matched_prompt")
+        score = res.get("score")
+
+    # --- Rule-based overrides BEFORE threshold check ---
+    note = None
+    if is_q1_margin_below_intent(user_q):
+        best_qid, matched_prompt, score = "Q1", "Margin % below threshold", 1.0
+        note = "Q1 override: explicit 'margin% below N' intent detected."
+    elif is_q3_cb_variance_intent(user_q):
+        best_qid, matched_prompt, score = "Q3", "C&B QoQ variation", 1.0
+        note = "Q3 override: explicit 'C&B quarter-over-quarter change' intent detected."
+    return best_qid, matched_prompt, score, note
+
+def pinned_route(user_q: str):
+    """
+    match_question() for the current question, pinned in session state:
+    reruns that keep the question (e.g. a widget change) don't go through
+    the matcher again.
+    """
+    pinned = st.session_state.get("pinned_route")
+    if pinned is None or pinned[0] != user_q:
+        pinned = (user_q, match_question(user_q))
+        st.session_state.pinned_route = pinned
+    return pinned[1]
+
 # =========================================================
 # MAIN ROUTER (prebuilt path preserved + AI fallback)
 # =========================================================
 if user_question and not st.session_state.clear_chat:
     try:
-        res = find_best_matching_qid(user_question)
-        best_qid, matched_prompt, score = None, None, None
-        if isinstance(res, tuple):
-            if len(res) == 3:
-                best_qid, matched_prompt, score = res
-            elif len(res) == 2:
-                best_qid, matched_prompt = res
-            elif len(res) == 1:
-                best_qid = res[0]
-        elif isinstance(res, dict):
-            best_qid = res.get("qid") or res.get("best_qid")
-            matched_prompt = res.get("prompt") or res.get("matched_prompt")
-            score = res.get("score")
-
-        # --- Rule-based overrides BEFORE threshold check ---
-        if _is_q1_margin_below_intent(user_question):
-            best_qid, matched_prompt, score = "Q1", "Margin % below threshold", 1.0
-            st.caption("Q1 override: explicit 'margin% below N' intent detected.")
-        elif _is_q3_cb_variance_intent(user_question):
-            best_qid, matched_prompt, score = "Q3", "C&B QoQ variation", 1.0
-            st.caption("Q3 override: explicit 'C&B quarter-over-quarter change' intent detected.")
+        best_qid, matched_prompt, score, note = pinned_route(user_question)
+        if note:
+            st.caption(note)
 
         force_ai = user_question.lower().strip().startswith(FREEFORM_TRIGGERS)
         low_score = (score is not None and score < SIM_THRESHOLD)
@@ -771,20 +809,19 @@ if user_question and not st.session_state.clear_chat:
                 raise AttributeError(f"'run' function not found in module for {best_qid}")
 
             run_params = inspect.signature(run_func).parameters
-            if len(run_params) >= 2:
-                result = run_func(df_pnl, user_question)
-            else:
-                result = run_func(df_pnl)
-
-            st.success("✅ Analysis complete.")
-            if isinstance(result, pd.DataFrame):
-                st.dataframe(result)
-            elif isinstance(result, str):
-                st.markdown(result)
-            elif isinstance(result, None.__class__):
-                pass
-            else:
-                st.write(result)
+            run_args = (df_pnl, user_question) if len(run_params) >= 2 else (df_pnl,)
+            completed, result = run_question(best_qid, run_func, run_args, user_question, matched_prompt, score)
+
+            if completed:
+                st.success("✅ Analysis complete.")
+                if isinstance(result, pd.DataFrame):
+                    st.dataframe(result)
+                elif isinstance(result, str):
+                    st.markdown(result)
+                elif isinstance(result, None.__class__):
+                    pass
+                else:
+                    st.write(result)
 
         except (ModuleNotFoundError, AttributeError) as e:
             st.info(f"Switching to AI fallback for your question (reason: {e})")
@@ -0,0 +1,85 @@
+# benchmarks/bench_charts.py
+"""
+Compare per-rerun chart construction with the cached chart layer in
+utils.visuals: the pyplot PNG bar chart against the pooled Agg renderer
+(cold, then cached), and the Q7 Altair trend chart built and validated
+from scratch against its cached Vega-Lite spec.
+
+    python benchmarks/bench_charts.py --categories 20 2000
+"""
+
+import argparse
+import base64
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from utils import visuals
+from questions.question_q7 import trend_chart
+
+
+def pyplot_bar_chart(df, x_col, y_col, title):
+    """generate_bar_chart() as it was: a new pyplot figure per call, one bar per row."""
+    fig, ax = plt.subplots()
+    ax.bar(df[x_col], df[y_col])
+    ax.set_title(title)
+    plt.xticks(rotation=45)
+    buf = io.BytesIO()
+    plt.tight_layout()
+    plt.savefig(buf, format="png")
+    plt.close(fig)
+    return base64.b64encode(buf.getvalue()).decode("utf-8")
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(n_categories: int, repeat: int):
+    rng = np.random.default_rng(0)
+    bars = pd.DataFrame({"Account": [f"acct{i}" for i in range(n_categories)],
+                         "Revenue": rng.uniform(1, 100, n_categories)})
+    months = pd.period_range("2024-04", periods=12, freq="M").astype(str)
+    trend = pd.DataFrame(rng.integers(50, 500, (12, 6)), index=pd.Index(months, name="Month"),
+                         columns=[f"client{i}" for i in range(6)])
+
+    def cold_bar():
+        visuals._chart_cache.clear()
+        visuals.generate_bar_chart(bars, "Account", "Revenue", "Revenue by account")
+
+    rows = [
+        ("pyplot bar chart", timed(lambda: pyplot_bar_chart(bars, "Account", "Revenue", "Revenue by account"), repeat)),
+        ("pooled Agg, top-N + Other", timed(cold_bar, repeat)),
+        ("cached image", timed(lambda: visuals.generate_bar_chart(bars, "Account", "Revenue", "Revenue by account"),
+                               repeat)),
+        ("Altair trend, to_dict()", timed(lambda: trend_chart(trend, "Client").to_dict(), repeat)),
+        ("cached trend spec", timed(lambda: visuals.cached_spec("trend", trend, lambda d: trend_chart(d, "Client")),
+                                    repeat)),
+    ]
+    print(f"\n{n_categories:,} bar categories")
+    for name, seconds in rows:
+        print(f"{name:<28}{seconds * 1e3:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--categories", type=int, nargs="+", default=[20, 2000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for n in args.categories:
+        run(n, args.repeat)
@@ -0,0 +1,89 @@
+# benchmarks/bench_encoder_service.py
+"""
+Routing-encode throughput under concurrent callers: each caller encodes
+one question at a time, either directly (one forward pass per query, as
+every session used to) or through the micro-batching EncoderService.
+
+    python benchmarks/bench_encoder_service.py --callers 1 8 64 --threads 4
+    python benchmarks/bench_encoder_service.py --backend onnx-int8 --max-wait-ms 2
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+QUESTIONS = [
+    "List clients with margin below 30% in June 2025",
+    "Why did margin drop in Transportation last month?",
+    "How did C&B cost vary quarter over quarter by segment",
+    "Revenue per person trend for Med Tech",
+    "Realized rate drop by account this quarter",
+    "UT% by DU for the last 3 months",
+    "How are freshers utilized compared to last quarter?",
+    "Headcount trend by client, billable vs non-billable",
+]
+
+
+def load(callers: int, per_caller: int, encode):
+    """(queries/s, per-query latencies) with `callers` threads issuing queries back to back."""
+    latencies = [[] for _ in range(callers)]
+    barrier = threading.Barrier(callers + 1)
+
+    def caller(i):
+        barrier.wait()
+        for j in range(per_caller):
+            start = time.perf_counter()
+            encode([QUESTIONS[(i + j) % len(QUESTIONS)]])
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return callers * per_caller / elapsed, np.concatenate([np.array(l) for l in latencies])
+
+
+def run(callers_list, queries: int, max_batch: int, max_wait_ms: float):
+    from utils.encoders import get_encoder
+    from utils.encoder_service import EncoderService
+
+    encoder = get_encoder()
+    service = EncoderService(encoder, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    encoder.encode(QUESTIONS)  # warm-up
+    print(f"\nbackend {encoder.name}, max batch {service.max_batch}, max wait {service.max_wait_s * 1e3:g} ms")
+    print(f"{'callers':>8}{'mode':>10}{'queries/s':>12}{'p50 ms':>9}{'p95 ms':>9}")
+    for callers in callers_list:
+        per_caller = max(1, queries // callers)
+        for mode, encode in [("direct", encoder.encode), ("batched", service.encode)]:
+            qps, latencies = load(callers, per_caller, encode)
+            print(f"{callers:>8}{mode:>10}{qps:>12.1f}{np.percentile(latencies, 50) * 1e3:>9.2f}"
+                  f"{np.percentile(latencies, 95) * 1e3:>9.2f}")
+    service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--queries", type=int, default=512, help="queries per run, split across callers")
+    parser.add_argument("--backend", help="ENCODER_BACKEND (torch, onnx, onnx-int8)")
+    parser.add_argument("--threads", type=int, help="ENCODER_THREADS (model intra-op threads)")
+    parser.add_argument("--max-batch", type=int)
+    parser.add_argument("--max-wait-ms", type=float)
+    args = parser.parse_args()
+
+    # Read by utils.encoders at import
+    if args.backend:
+        os.environ["ENCODER_BACKEND"] = args.backend
+    if args.threads:
+        os.environ["ENCODER_THREADS"] = str(args.threads)
+    run(args.callers, args.queries, args.max_batch, args.max_wait_ms)
@@ -0,0 +1,127 @@
+# benchmarks/bench_encoders.py
+"""
+Compare the intent-matcher encoder backends (utils.encoders): torch
+(sentence-transformers), ONNX fp32 and ONNX int8. For each backend,
+reported from a fresh process:
+  - load time: imports, model load and PROMPT_BANK encoding
+  - peak RSS
+  - single-query latency (p50/p95)
+  - agreement with the torch path:
+      - leave-one-out routing over the PROMPT_BANK (the qid of each
+        prompt's nearest other prompt)
+      - full routing (threshold included) of probe questions
+      - the largest cosine deviation of the bank embeddings
+
+    python benchmarks/bench_encoders.py --export      # once: writes ONNX_MODEL_DIR
+    python benchmarks/bench_encoders.py --queries 200
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+BACKENDS = ["torch", "onnx", "onnx-int8"]
+
+PROBES = [
+    "List clients with margin below 30% in June 2025",
+    "Why did margin drop in Transportation last month?",
+    "How did C&B cost vary quarter over quarter by segment",
+    "MoM C&B as a share of revenue",
+    "Revenue per person trend for Med Tech",
+    "Realized rate drop by account this quarter",
+    "Headcount trend by client, billable vs non-billable",
+    "UT% by DU for the last 3 months",
+    "How are freshers utilized compared to last quarter?",
+    "What is the weather in Chennai?",
+]
+
+
+def child(backend: str, n_queries: int, out_path: str):
+    """Measure one backend in this (fresh) process and dump the results."""
+    import numpy as np
+
+    os.environ["ENCODER_BACKEND"] = backend
+    start = time.perf_counter()
+    from utils import semantic_matcher
+    from utils.encoders import get_encoder
+    bank = semantic_matcher.question_embeddings()  # imports the backend, loads the model, encodes the bank
+    load_s = time.perf_counter() - start
+    encoder = get_encoder()
+    if encoder.name != backend:
+        raise SystemExit(f"{backend} unavailable (loaded {encoder.name})")
+
+    latencies = []
+    for i in range(n_queries):
+        query = PROBES[i % len(PROBES)]
+        start = time.perf_counter()
+        encoder.encode([query])
+        latencies.append(time.perf_counter() - start)
+
+    similarities = semantic_matcher.cos_sim(bank, bank)
+    np.fill_diagonal(similarities, -np.inf)
+    np.save(out_path + ".npy", bank)
+    with open(out_path, "w") as f:
+        json.dump({
+            "load_s": load_s,
+            "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "p50_ms": float(np.percentile(latencies, 50) * 1e3),
+            "p95_ms": float(np.percentile(latencies, 95) * 1e3),
+            "loo_routes": [semantic_matcher.qids[i] for i in similarities.argmax(axis=1)],
+            # Embeddings only: the lexical fast path would hide backend differences
+            "probe_routes": [qid for qid, _, _ in semantic_matcher.embedding_matches(PROBES)],
+        }, f)
+
+
+def run(backends, n_queries: int):
+    import numpy as np
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            out_path = os.path.join(tmp, backend)
+            proc = subprocess.run([sys.executable, __file__, "--child", backend, "--queries", str(n_queries),
+                                   "--out", out_path], capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{backend:<11} skipped: {(proc.stderr or proc.stdout).strip().splitlines()[-1]}")
+                continue
+            with open(out_path) as f:
+                results[backend] = json.load(f)
+            results[backend]["bank"] = np.load(out_path + ".npy")
+
+    reference = results.get("torch")
+    print(f"\n{'backend':<11}{'load s':>8}{'RSS MB':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'LOO agree':>11}{'probes agree':>14}{'max |Δcos|':>12}")
+    for backend, r in results.items():
+        line = f"{backend:<11}{r['load_s']:>8.2f}{r['rss_mb']:>9.0f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+        if reference is not None:
+            loo = np.mean([a == b for a, b in zip(r["loo_routes"], reference["loo_routes"])]) * 100
+            probes = np.mean([a == b for a, b in zip(r["probe_routes"], reference["probe_routes"])]) * 100
+            drift = np.abs((r["bank"] * reference["bank"]).sum(axis=1) - 1).max()
+            line += f"{loo:>10.1f}%{probes:>13.1f}%{drift:>12.4f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--export", action="store_true", help="export the ONNX models first")
+    parser.add_argument("--child", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.queries, args.out)
+    else:
+        if args.export:
+            from utils.encoders import export_onnx
+            print(f"Exported to {export_onnx()}")
+        run(args.backends, args.queries)
@@ -0,0 +1,88 @@
+# benchmarks/bench_groupby_kernels.py
+"""
+Compare pandas groupby with the factorized kernels in utils.groupby_kernels
+on synthetic UT-shaped data (string dimensions, float measures, PSNo).
+
+    python benchmarks/bench_groupby_kernels.py --rows 1000000 10000000
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.groupby_kernels import GroupKeys, grouped_sum, grouped_mean, grouped_nunique
+
+KEYS = ['FinalCustomerName', 'Segment', 'BU', 'DU', 'Month']
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    def labels(prefix, n):
+        return np.array([f"{prefix} {i:04d}" for i in range(n)], dtype=object)
+
+    # Each account sits in one Segment/BU/DU, as in the UT extract
+    customers = rng.integers(0, 800, rows)
+    du_of_customer = rng.integers(0, 40, 800)
+    du = du_of_customer[customers]
+    return pd.DataFrame({
+        'FinalCustomerName': labels("Customer", 800)[customers],
+        'Segment': labels("Segment", 6)[du % 6],
+        'BU': labels("BU", 12)[du % 12],
+        'DU': labels("DU", 40)[du],
+        'Month': np.array(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                           'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], dtype=object)[rng.integers(0, 12, rows)],
+        'NetAvailableHours': rng.uniform(0, 180, rows),
+        'PSNo': rng.integers(0, 60_000, rows),
+    })
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(rows: int, repeat: int):
+    df = make_frame(rows)
+    cases = [
+        ("sum", lambda: df.groupby(KEYS)['NetAvailableHours'].sum().reset_index(),
+         lambda keys: grouped_sum(df, KEYS, 'NetAvailableHours'), lambda keys: keys.sum(df['NetAvailableHours'])),
+        ("mean", lambda: df.groupby(KEYS)['NetAvailableHours'].mean().reset_index(),
+         lambda keys: grouped_mean(df, KEYS, 'NetAvailableHours'), lambda keys: keys.mean(df['NetAvailableHours'])),
+        ("nunique", lambda: df.groupby(['Segment', 'Month'])['PSNo'].nunique().reset_index(),
+         None, None),
+    ]
+
+    factorize_s, keys = timed(lambda: GroupKeys(df, KEYS), repeat)
+    print(f"\n{rows:,} rows — factorize {len(KEYS)} keys once: {factorize_s:.3f}s ({keys.n_groups:,} groups)")
+    print(f"{'agg':<8}{'pandas':>10}{'kernel':>10}{'cached keys':>13}{'speedup':>9}{'cached':>8}")
+
+    for name, pandas_fn, kernel_fn, cached_fn in cases:
+        if name == "nunique":
+            small_keys = GroupKeys(df, ['Segment', 'Month'])
+            kernel_fn = lambda _: grouped_nunique(df, ['Segment', 'Month'], 'PSNo')
+            cached_fn = lambda _: small_keys.nunique(df['PSNo'])
+        pandas_s, expected = timed(pandas_fn, repeat)
+        kernel_s, result = timed(lambda: kernel_fn(keys), repeat)
+        cached_s, _ = timed(lambda: cached_fn(keys), repeat)
+        np.testing.assert_allclose(result.iloc[:, -1].to_numpy(), expected.iloc[:, -1].to_numpy(), rtol=1e-9)
+        print(f"{name:<8}{pandas_s:>9.3f}s{kernel_s:>9.3f}s{cached_s:>12.3f}s"
+              f"{pandas_s / kernel_s:>8.1f}x{pandas_s / cached_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for rows in args.rows:
+        run(rows, args.repeat)
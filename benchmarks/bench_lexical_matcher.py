@@ -0,0 +1,147 @@
+# benchmarks/bench_lexical_matcher.py
+"""
+Calibrate and measure the lexical fast path of intent routing
+(utils.lexical_matcher). Over labelled questions (button copies, typos,
+reworded prompts, keyword questions, open paraphrases and off-topic
+questions), for each candidate threshold it reports:
+  - fast-path share: questions answered without the embedding model
+  - precision: fast-path answers routed to the labelled intent (an
+    off-topic question answered at all counts as wrong)
+The recommended LEXICAL_THRESHOLD is the lowest one with no wrong route.
+With --embeddings the end-to-end router is timed against embeddings only.
+
+    python benchmarks/bench_lexical_matcher.py
+    python benchmarks/bench_lexical_matcher.py --embeddings --queries 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# (question, intended qid; None = should fall through to the embeddings / AI mode)
+LABELLED = [
+    # Suggested prompts and bank prompts, as the buttons submit them or retyped
+    ("List accounts with margin % less than 30% in the last quarter", "Q1"),
+    ("Which cost caused margin drop last month in Transportation?", "Q2"),
+    ("What is FTE trend over months?", "Q7"),
+    ("How is utilization % trending?", "Q8"),
+    ("C&B cost as percentage of revenue trend", "Q4"),
+    ("realized rate", "Q6"),
+    ("revenue per person", "Q9"),
+    ("fresher ut trend", "Q10"),
+    ("which accounts had cm% < 30 in the last quarter", "Q1"),
+    ("Show monthly headcount trend per client", "Q7"),
+    ("Compare C&B cost by segment over two quarters", "Q3"),
+    ("YoY revenue trend by account", "Q4"),
+    # Typos, word order and small edits
+    ("Show utilization by acount", "Q8"),
+    ("how is utilisation trending", "Q8"),
+    ("headcount trend month over month", "Q7"),
+    ("C&B vs revenue trend monthly", "Q4"),
+    ("Which accounts had CM% < 30 last quarter", "Q1"),
+    ("Which cost caused the margin drop last month", "Q2"),
+    ("Segment wise change in C&B costs", "Q3"),
+    ("compare revenue over time by client", "Q4"),
+    ("Utilization trend YoY", "Q8"),
+    ("Monthly headcount per client", "Q7"),
+    ("Clients with under 30% margin last quarter", "Q1"),
+    ("Show C&B cost trend by segments", "Q3"),
+    # One word away from a bank prompt of another (or no) intent
+    ("Which accounts had revenue below 30 last quarter", None),
+    ("Show me accounts with less than 40% revenue", None),
+    ("margin trend over months", None),
+    ("Trend of margin growth", None),
+    ("utilization of C&B cost", None),
+    ("Which accounts had margin above 30 percent", "Q1"),
+    ("Show revenue by account", "Q4"),
+    ("Show monthly revenue per client", "Q4"),
+    ("Compare revenue by segment over two quarters", "Q4"),
+    ("What is the total revenue by BU this year?", "Q4"),
+    ("What is the MoM trend of headcount?", "Q7"),
+    ("Monthly total billable hours per DU", "Q7"),
+    ("Show utilization by segment this quarter", "Q8"),
+    ("Compare utilization over time", "Q8"),
+    # Decisive keywords
+    ("Realized rate drop by account this quarter", "Q6"),
+    ("realized rate for BFSI", "Q6"),
+    ("Revenue per person trend for Med Tech", "Q9"),
+    ("revenue per head by DU", "Q9"),
+    ("How are freshers utilized compared to last quarter?", "Q10"),
+    ("fresher ut", "Q10"),
+    # Paraphrases: the embeddings' job
+    ("Why did margin drop in Transportation last month?", "Q2"),
+    ("How did C&B cost vary quarter over quarter by segment", "Q3"),
+    ("MoM C&B as a share of revenue", "Q4"),
+    ("Headcount trend by client, billable vs non-billable", "Q7"),
+    ("UT% by DU for the last 3 months", "Q8"),
+    ("List clients with margin below 30% in June 2025", "Q1"),
+    ("Which expense went up and hurt profitability?", "Q2"),
+    ("How many people are on each account every month?", "Q7"),
+    ("Is bench time going up across delivery units?", "Q8"),
+    ("Revenue growth trend for Healthcare", "Q4"),
+    # Off-topic
+    ("What is the weather in Chennai?", None),
+    ("Who is the account manager for Acme?", None),
+    ("Export the P&L to Excel", None),
+    ("hello", None),
+]
+
+# Not below semantic_matcher.SIM_THRESHOLD (0.72): the app treats lower scores as weak matches
+THRESHOLDS = [0.75, 0.8, 0.85, 0.9, 0.95, 1.0]
+
+
+def calibrate():
+    from utils.lexical_matcher import LexicalMatcher
+
+    matcher = LexicalMatcher(threshold=0.0)
+    scored = [(matcher.score(q), label) for q, label in LABELLED]
+    print(f"{'threshold':>10}{'fast share':>12}{'precision':>11}{'wrong':>7}")
+    recommended = None
+    for threshold in THRESHOLDS:
+        fast = [(qid, label) for (qid, _, conf), label in scored if conf >= threshold]
+        wrong = sum(qid != label for qid, label in fast)
+        precision = (1 - wrong / len(fast)) * 100 if fast else 100.0
+        print(f"{threshold:>10.2f}{len(fast) / len(scored) * 100:>11.1f}%{precision:>10.1f}%{wrong:>7}")
+        if wrong == 0 and recommended is None:
+            recommended = threshold
+    print(f"\nlowest threshold without a wrong route: {recommended}")
+
+    misses = [(q, qid, conf, label) for (q, label), ((qid, _, conf), _) in zip(LABELLED, scored)
+              if qid != label and conf >= 0.5]
+    for q, qid, conf, label in misses:
+        print(f"  {conf:.2f}  {q!r}: {qid}, labelled {label}")
+
+
+def timing(n_queries: int):
+    from utils import semantic_matcher
+    from utils.lexical_matcher import get_lexical_matcher
+
+    questions = [q for q, _ in LABELLED]
+    semantic_matcher.embedding_matches(questions)  # warm-up: loads the model and bank
+    print(f"\n{'router':<14}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, route in [("embeddings", semantic_matcher.embedding_matches),
+                        ("lexical+emb", semantic_matcher.find_best_matching_qids)]:
+        latencies = []
+        for i in range(n_queries):
+            start = time.perf_counter()
+            route([questions[i % len(questions)]])
+            latencies.append(time.perf_counter() - start)
+        print(f"{name:<14}{np.percentile(latencies, 50) * 1e3:>9.2f}{np.percentile(latencies, 95) * 1e3:>9.2f}")
+    stats = get_lexical_matcher().stats()
+    print(f"fast path served {stats['fast']} of {stats['fast'] + stats['deferred']} ({stats['share']:.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", action="store_true", help="also time the router against embeddings only")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    calibrate()
+    if args.embeddings:
+        timing(args.queries)
@@ -0,0 +1,95 @@
+# benchmarks/bench_param_extractor.py
+"""
+Compare the per-question regex loops the question modules used to run
+(month aliases, Q1 threshold/month, Q2/Q3/Q4 segment matching) with the
+single-pass compiled extractor in utils.param_extractor.
+
+    python benchmarks/bench_param_extractor.py --questions 20000
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.param_extractor import MONTH_ALIASES, get_extractor
+
+SEGMENTS = ['Transportation', 'Med Tech', 'Media & Technology', 'Plant Engineering', 'Industrial Products']
+
+QUESTIONS = [
+    "List clients with margin below 30% in June 2025",
+    "Which accounts have margin less than 25 for Transportation",
+    "How did C&B cost vary quarter over quarter in Med Tech",
+    "Show revenue per person trend for Media & Technology in sept 2024",
+    "What is the non-billable headcount onsite in march",
+    "Margin drop reasons for Plant Engineering last month",
+    "UT% by DU for Industrial Products over the last 3 months",
+    "Compare fresher utilization QoQ",
+]
+
+
+def legacy(question):
+    """The extraction the modules ran before, one question module after another."""
+    ql = question.lower()
+    # app.parse_month_year_from_text
+    m = re.search(r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|june|"
+                  r"july|august|september|october|november|december)\s+(\d{4})\b", ql)
+    if not m:
+        for token in MONTH_ALIASES:
+            if re.search(rf"\b{token}\b", ql):
+                break
+    # question_q1.extract_threshold / extract_month
+    for pattern in [r"margin\s*<\s*(\d+)", r"less than\s*(\d+)", r"below\s*(\d+)", r"under\s*(\d+)", r"margin.*?(\d+)\s*%"]:
+        if re.search(pattern, ql):
+            break
+    for name in ["january", "february", "march", "april", "may", "june", "july", "august",
+                 "september", "october", "november", "december"]:
+        if name in ql:
+            re.search(rf"{name}\s*(\d{{4}})", ql)
+    # question_q2 segment loop
+    next((s for s in SEGMENTS if s.lower() in ql), None)
+    # question_q3 segment regex, built per call
+    re.search(r'\b(?:' + '|'.join(map(re.escape, SEGMENTS)) + r')\b', question, flags=re.IGNORECASE)
+    # question_q4 hardcoded segment regex
+    re.search(r"\b(?:in|for)?\s*(Transportation|Med Tech|Media & Technology|Plant Engineering|Industrial Products)\b",
+              question, re.IGNORECASE)
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(n_questions: int, repeat: int):
+    questions = (QUESTIONS * (n_questions // len(QUESTIONS) + 1))[:n_questions]
+    vocabulary = {'Segment': SEGMENTS}
+    # The re module keeps 512 compiled patterns; a busy process with more distinct
+    # patterns than that recompiles the legacy ones, which "cold re cache" shows
+    legacy_s = timed(lambda: [legacy(q) for q in questions], repeat)
+    purged_s = timed(lambda: [(re.purge(), legacy(q)) for q in questions], repeat)
+    extractor = get_extractor(vocabulary)
+    held_s = timed(lambda: [extractor.extract(q) for q in questions], repeat)
+    lookup_s = timed(lambda: [get_extractor(vocabulary).extract(q) for q in questions], repeat)
+    print(f"\n{n_questions:,} questions")
+    print(f"{'legacy loops':<26}{legacy_s * 1e6 / n_questions:>9.1f} µs/question")
+    print(f"{'legacy, cold re cache':<26}{purged_s * 1e6 / n_questions:>9.1f} µs/question")
+    print(f"{'compiled extractor':<26}{held_s * 1e6 / n_questions:>9.1f} µs/question"
+          f"  ({legacy_s / held_s:.1f}x)")
+    print(f"{'+ versioned cache lookup':<26}{lookup_s * 1e6 / n_questions:>9.1f} µs/question"
+          f"  ({legacy_s / lookup_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, nargs="+", default=[20_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for n in args.questions:
+        run(n, args.repeat)
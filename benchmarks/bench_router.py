@@ -0,0 +1,97 @@
+# benchmarks/bench_router.py
+"""
+Compare the intent routers of utils.semantic_matcher on the labelled
+questions of bench_lexical_matcher.py:
+  - embeddings: nearest PROMPT_BANK prompt by sentence-transformer cosine
+  - classifier: the trained TF-IDF + logistic regression model
+  - each behind the lexical fast path (what find_best_matching_qids serves)
+For each: accuracy (routed to the labelled intent, or abstained on an
+off-topic question), wrong routes (answered with another intent: worse
+than abstaining, which falls back to AI mode), load time (model or
+artifact) and single-question latency (p50/p95). Routers whose packages
+are missing are skipped.
+
+    python benchmarks/bench_router.py --train     # (re)writes INTENT_CLASSIFIER_PATH first
+    python benchmarks/bench_router.py --queries 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_lexical_matcher import LABELLED
+
+
+def behind_lexical(route):
+    from utils.lexical_matcher import LexicalMatcher
+
+    lexical = LexicalMatcher()
+
+    def routed(queries):
+        return [lexical.match(q) or route([q])[0] for q in queries]
+    return routed
+
+
+def measure(name: str, load, n_queries: int):
+    try:
+        start = time.perf_counter()
+        route = load()
+        load_s = time.perf_counter() - start
+    except Exception as e:  # e.g. EncoderUnavailable without sentence-transformers
+        print(f"{name:<22} skipped: {e}")
+        return
+
+    questions = [q for q, _ in LABELLED]
+    routes = [qid for qid, _, _ in route(questions)]
+    accuracy = np.mean([qid == label for qid, (_, label) in zip(routes, LABELLED)]) * 100
+    wrong = sum(qid is not None and qid != label for qid, (_, label) in zip(routes, LABELLED))
+
+    latencies = []
+    for i in range(n_queries):
+        start = time.perf_counter()
+        route([questions[i % len(questions)]])
+        latencies.append(time.perf_counter() - start)
+    print(f"{name:<22}{accuracy:>9.1f}%{wrong:>7}{load_s * 1e3:>10.1f}"
+          f"{np.percentile(latencies, 50) * 1e3:>9.3f}{np.percentile(latencies, 95) * 1e3:>9.3f}")
+
+
+def run(n_queries: int):
+    from utils import semantic_matcher
+    from utils.intent_classifier import IntentClassifier, INTENT_CLASSIFIER_PATH
+
+    def load_embeddings():
+        semantic_matcher.question_embeddings()
+        return semantic_matcher.embedding_matches
+
+    def load_classifier():
+        classifier = IntentClassifier.load(INTENT_CLASSIFIER_PATH, threshold=semantic_matcher.SIM_THRESHOLD)
+        return classifier.matches
+
+    if os.path.exists(INTENT_CLASSIFIER_PATH):
+        print(f"artifact {INTENT_CLASSIFIER_PATH}: {os.path.getsize(INTENT_CLASSIFIER_PATH) / 1024:.0f} KB")
+    print(f"{len(LABELLED)} labelled questions\n")
+    print(f"{'router':<22}{'accuracy':>10}{'wrong':>7}{'load ms':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    measure("classifier", load_classifier, n_queries)
+    measure("lexical + classifier", lambda: behind_lexical(load_classifier()), n_queries)
+    measure("embeddings", load_embeddings, n_queries)
+    measure("lexical + embeddings", lambda: behind_lexical(load_embeddings()), n_queries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--train", action="store_true", help="train and save the classifier first")
+    args = parser.parse_args()
+
+    if args.train:
+        from utils.intent_classifier import train_classifier
+        start = time.perf_counter()
+        path = train_classifier().save()
+        print(f"Trained {path} in {time.perf_counter() - start:.2f}s")
+    run(args.queries)
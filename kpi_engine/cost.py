@@ -4,6 +4,7 @@ from google.cloud import storage
 import os
 from io import BytesIO
 from dotenv import load_dotenv
+from kpi_engine.pnl_hierarchy import pnl_hierarchy
 
 
 load_dotenv('.env.template')
@@ -38,7 +39,7 @@ def calculate_total_cost(df: pd.DataFrame) -> float:
     """
     Calculate total cost by summing 'Amount in USD' across all records.
     """
-    return df["Amount in USD"].sum()
+    return pnl_hierarchy(df).total()
 
 def calculate_cost_by_type(df: pd.DataFrame, cost_type: str) -> float:
     """
@@ -54,17 +55,18 @@ def calculate_cost_by_type(df: pd.DataFrame, cost_type: str) -> float:
     else:
         raise ValueError(f"Invalid cost type: {cost_type}")
 
-    filtered_df = df[df["Group1"].isin(groups)]
-    return filtered_df["Amount in USD"].sum()
+    return pnl_hierarchy(df).total({"Group1": groups})
 
 def summarize_cost(df: pd.DataFrame) -> list:
     """
     Generate a simple 3-point AI-style summary for total and breakdown of costs.
+    All four figures are lookups on one P&L hierarchy roll-up.
     """
-    total = calculate_total_cost(df)
-    onsite = calculate_cost_by_type(df, "ONSITE")
-    offshore = calculate_cost_by_type(df, "OFFSHORE")
-    indirect = calculate_cost_by_type(df, "INDIRECT")
+    tree = pnl_hierarchy(df)
+    total = tree.total()
+    onsite = tree.total({"Group1": ONSITE_COST_GROUPS})
+    offshore = tree.total({"Group1": OFFSHORE_COST_GROUPS})
+    indirect = tree.total({"Group1": INDIRECT_COST_GROUPS})
 
     summary = [
         f"💰 Total cost incurred: ${total:,.2f}",
@@ -0,0 +1,79 @@
+# fresher_cohort.py
+
+import numpy as np
+import pandas as pd
+from utils.schema_registry import apply_schema
+from utils.calendar_dim import month_keys, attach_periods
+from utils.groupby_kernels import GroupKeys
+
+# Hours per fresher bucket, Segment/BU/DU and month (the precomputed fresher_cohort table)
+COHORT_KEYS = ['FresherAgeingCategory', 'Segment', 'BU', 'DU', 'MonthKey']
+HOUR_COLUMNS = ['TotalBillableHours', 'NetAvailableHours']
+
+
+def prepare_cohort_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    UT rows with a fresher bucket, a month key from Date_a and usable hours.
+    Rows without available hours have no UT% and are left out, as before.
+    """
+    df = apply_schema(df, "ut", derive=False)
+    rows = pd.DataFrame({'MonthKey': month_keys(df['Date_a'])}, index=df.index)
+    rows['FresherAgeingCategory'] = df['FresherAgeingCategory']
+    for col in ['Segment', 'BU', 'DU']:
+        rows[col] = df[col] if col in df.columns else 'Unknown'
+    for col in HOUR_COLUMNS:
+        rows[col] = pd.to_numeric(df[col], errors='coerce')
+    usable = (rows['MonthKey'] >= 0) & rows['FresherAgeingCategory'].notna() \
+        & rows['TotalBillableHours'].notna() & (rows['NetAvailableHours'] > 0)
+    return rows[usable]
+
+
+def build_fresher_cohort(df: pd.DataFrame) -> pd.DataFrame:
+    """Summed billable and available hours per COHORT_KEYS, built once per dataset refresh."""
+    rows = prepare_cohort_rows(df)
+    grouper = GroupKeys(rows, COHORT_KEYS)
+    cohort = grouper.index_frame()
+    for col in HOUR_COLUMNS:
+        cohort[col] = grouper.sum(rows[col])
+    return cohort
+
+
+def cohort_view(cohort: pd.DataFrame, level: str = None, filters: dict = None) -> dict:
+    """
+    UT%, billable and available pivots (fresher bucket [x level] by month)
+    from the cohort table in one group-by. UT% is billable / available
+    hours of each cell. Month columns are labelled 'Jun-2025' and sorted.
+
+    Returns {"ut", "billable", "available", "latest_month", "latest"} where
+    "latest" ranks the buckets by UT% in the most recent month.
+    """
+    for column, allowed in (filters or {}).items():
+        if allowed:
+            allowed = [allowed] if isinstance(allowed, str) else list(allowed)
+            cohort = cohort[cohort[column].isin(allowed)]
+
+    index = ['FresherAgeingCategory'] + ([level] if level else [])
+    table = cohort.groupby(index + ['MonthKey'], observed=True)[HOUR_COLUMNS].sum()
+    table['UT%'] = np.where(table['NetAvailableHours'] > 0,
+                            table['TotalBillableHours'] / table['NetAvailableHours'] * 100, np.nan)
+
+    month_keys_sorted = sorted(table.index.get_level_values('MonthKey').unique())
+    starts = pd.Series(pd.to_datetime([f"{k // 12}-{k % 12 + 1:02d}-01" for k in month_keys_sorted]))
+    periods = attach_periods(starts, ['MonthLabel', 'Year'])
+    labels = dict(zip(month_keys_sorted, periods['MonthLabel'] + '-' + periods['Year'].astype(str)))
+
+    wide = table.unstack('MonthKey').rename(columns=labels, level='MonthKey')
+    wide.columns = wide.columns.set_names([None, 'MonthYear'])
+
+    latest_key = month_keys_sorted[-1] if month_keys_sorted else None
+    latest = pd.Series(dtype=float)
+    if latest_key is not None:
+        latest = wide['UT%'][labels[latest_key]].dropna().sort_values(ascending=False)
+
+    return {
+        "ut": wide['UT%'],
+        "billable": wide['TotalBillableHours'],
+        "available": wide['NetAvailableHours'],
+        "latest_month": labels.get(latest_key),
+        "latest": latest,
+    }
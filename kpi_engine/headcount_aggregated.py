@@ -1,5 +1,10 @@
 # ✅ FINAL: headcount_aggregated.py — uses distinct PSNo like q7.py, grouped by Segment and Month
 import pandas as pd
+from utils.calendar_dim import period_of
+from utils.parallel_agg import parallel_aggregate
+from utils.schema_registry import apply_schema
+
+ACCOUNT_KEYS = ['FinalCustomerName', 'Segment', 'BU', 'DU', 'Month']
 
 def run(df):
     df = df.copy()
@@ -9,16 +14,33 @@ def run(df):
     df = df.dropna(subset=['Date_a', 'Segment', 'PSNo'])
 
     # Create month column in format like 'Jan', 'Feb', etc.
-    df['Month'] = df['Date_a'].dt.strftime('%b')
+    df['Month'] = period_of(df['Date_a'], 'MonthLabel')
 
     # Include relevant fields
     df = df[['PSNo', 'Status', 'FinalCustomerName', 'Segment', 'Date_a', 'BU', 'DU', 'Month']]
 
     # Compute unique headcount (distinct PSNo) by Segment and Month
-    grouped = df.groupby(['Segment', 'Month'])['PSNo'].nunique().reset_index()
-    grouped = grouped.rename(columns={'PSNo': 'Headcount'})
+    # PSNo-hash partitions keep each person in one worker, so distinct counts add up
+    grouped = parallel_aggregate(df, ['Segment', 'Month'], {'Headcount': ('PSNo', 'nunique')}, partition_by='hash')
 
     # Format headcount to 1 decimal (optional)
     grouped['Headcount'] = grouped['Headcount'].astype(float).round(1)
 
     return grouped
+
+
+def prepare_account_headcount_rows(df):
+    """UT rows keyed by account/Segment/BU/DU and a 'Jan'..'Dec' Month label."""
+    df = apply_schema(df, "ut", derive=False)
+    df = df.dropna(subset=['Date_a', 'PSNo']).copy()
+    df['Month'] = period_of(df['Date_a'], 'MonthLabel')
+    for col in ['BU', 'DU']:
+        if col not in df.columns:
+            df[col] = 'Unknown'
+    return df
+
+
+def account_headcount(df):
+    """Distinct PSNo per account/Segment/BU/DU/Month (the precomputed headcount table)."""
+    return parallel_aggregate(prepare_account_headcount_rows(df), ACCOUNT_KEYS,
+                              {'Headcount': ('PSNo', 'nunique')}, partition_by='hash')
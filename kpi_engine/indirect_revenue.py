@@ -6,6 +6,7 @@ from io import BytesIO
 import json
 import os
 from dotenv import load_dotenv
+from kpi_engine.pnl_hierarchy import pnl_hierarchy
 
 load_dotenv('.env.template')
 
@@ -28,7 +29,7 @@ def load_data(pnl_path: str) -> pd.DataFrame:
 
 def calculate_indirect_revenue(df: pd.DataFrame) -> float:
     try:
-        indirect_revenue = df[df["Type"] == "Indirect Revenue"]["Amount in USD"].sum()
+        indirect_revenue = pnl_hierarchy(df).total(filters={"Type": "Indirect Revenue"})
         return indirect_revenue
     except Exception as e:
         raise RuntimeError(f"Error calculating Indirect Revenue: {e}")
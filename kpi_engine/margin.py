@@ -5,6 +5,9 @@ from io import BytesIO
 import json
 import os
 from dotenv import load_dotenv
+from utils.schema_registry import apply_schema
+from utils.calendar_dim import period_of
+from utils.groupby_kernels import pivot_sum
 
 
 load_dotenv('.env.template')
@@ -31,41 +34,15 @@ def load_pnl_data(filepath, sheet_name="LnTPnL"):
         raise RuntimeError(f"Failed to load data: {e}")  # Same error message
 
 def preprocess_pnl_data(df):
-    df.columns = df.columns.str.strip()
-
-    # Dynamic column renaming
-    column_map = {}
-
-    if 'Company Code' in df.columns:
-        column_map['Company Code'] = 'Client'
-    elif 'Company_Code' in df.columns:
-        column_map['Company_Code'] = 'Client'
-
-    if 'Amount in USD' in df.columns:
-        column_map['Amount in USD'] = 'Amount'
-    elif 'Amount' in df.columns:
-        column_map['Amount'] = 'Amount'
-
-    if 'Month' in df.columns:
-        column_map['Month'] = 'Month'
-
-    if 'Type' in df.columns:
-        column_map['Type'] = 'Type'
-
-    if 'Segment' in df.columns:
-        column_map['Segment'] = 'Segment'
-
-    df = df.rename(columns=column_map)
-
-    # Convert Month column to datetime safely
-    df['Month'] = pd.to_datetime(df['Month'], errors='coerce')
+    # Aliases (Company Code -> Client, Amount in USD -> Amount, Exec DG/DU -> BU/DU),
+    # stripping and Month/Amount dtypes are resolved once by the schema registry
+    df = apply_schema(df, "pnl")
 
     # Check for Group1 column before revenue mapping
     if 'Group1' not in df.columns:
         raise ValueError("Required column 'Group1' not found in the dataset for revenue logic.")
 
-    # Coerce Amount column and drop missing
-    df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce')
+    # Drop rows missing the keys
     df = df.dropna(subset=['Month', 'Amount', 'Client'])
 
     # Reclassify Group1 values as 'Revenue'
@@ -80,14 +57,14 @@ def preprocess_pnl_data(df):
 
 def compute_margin(df):
     # Add Quarter column
-    df['Quarter'] = df['Month'].dt.to_period("Q").astype(str)
+    df['Quarter'] = period_of(df['Month'], 'CalendarQuarter')
 
     # Grouping by Quarter, Month, Client, and optionally Segment
     groupby_cols = ['Quarter', 'Month', 'Client']
     if 'Segment' in df.columns:
         groupby_cols.append('Segment')
 
-    grouped = df.groupby(groupby_cols + ['Type'])['Amount'].sum().unstack().fillna(0)
+    grouped = pivot_sum(df, groupby_cols, 'Type', 'Amount')
 
     grouped['Revenue'] = grouped.get('Revenue', 0)
     grouped['Cost'] = grouped.get('Cost', 0)
@@ -0,0 +1,128 @@
+# margin_root_cause.py
+
+from collections import namedtuple
+import pandas as pd
+from utils.schema_registry import apply_schema
+from utils.calendar_dim import month_keys, month_key_of, period_at
+
+VALID_REVENUE_GROUP1 = ['ONSITE', 'OFFSHORE', 'INDIRECT REVENUE']
+
+RootCause = namedtuple("RootCause", [
+    "segment", "prev_month", "latest_month",
+    "segment_margin", "client_margin", "segment_cost", "group4",
+])
+
+
+def _with_month_pairs(table: pd.DataFrame, keys, values) -> pd.DataFrame:
+    """
+    Line every (keys, MonthKey) row up with the same keys one month earlier.
+    Missing sides count as 0, like the unstack(fill_value=0) pivots they replace.
+    """
+    prev = table[keys + ['MonthKey'] + values].copy()
+    prev['MonthKey'] += 1
+    paired = pd.merge(table[keys + ['MonthKey'] + values], prev, on=keys + ['MonthKey'],
+                      how='outer', suffixes=('', 'Prev'))
+    value_cols = values + [f"{v}Prev" for v in values]
+    paired[value_cols] = paired[value_cols].fillna(0)
+    return paired
+
+
+def _margin_pct(revenue, cost):
+    return (revenue - cost) / revenue.replace(0, 1) * 100
+
+
+class MarginRootCause:
+    """
+    Month-over-month margin movement and Group4 cost deltas for every
+    segment, client and month pair, built in one pass over the P&L rows.
+
+    `group4` is ranked by absolute cost increase within each
+    (Segment, MonthKey), so answering "why did margin drop in X" for any
+    segment and month is a lookup on these tables.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = apply_schema(df, "pnl")
+        keep = [c for c in ['Segment', 'Client', 'Group4', 'Group1', 'Type', 'Amount'] if c in df.columns]
+        rows = df[keep].copy()
+        rows['MonthKey'] = month_keys(df['Month'])
+        rows = rows[rows['MonthKey'] >= 0]
+
+        # Group1-based Revenue logic, without touching the caller's frame
+        rows['Type'] = rows['Type'].fillna('').where(~rows['Group1'].isin(VALID_REVENUE_GROUP1), 'Revenue')
+        rows = rows[rows['Type'].isin(['Revenue', 'Cost'])]
+        self.latest_key = int(rows['MonthKey'].max()) if len(rows) else None
+
+        client_month = (
+            rows.groupby(['Segment', 'Client', 'MonthKey', 'Type'])['Amount'].sum()
+            .unstack('Type', fill_value=0)
+            .reindex(columns=['Revenue', 'Cost'], fill_value=0)
+            .reset_index()
+        )
+        client_month.columns.name = None
+
+        segment_month = client_month.groupby(['Segment', 'MonthKey'], as_index=False)[['Revenue', 'Cost']].sum()
+        segment_month['Margin %'] = _margin_pct(segment_month['Revenue'], segment_month['Cost'])
+        self.segment_month = segment_month.set_index(['Segment', 'MonthKey']).sort_index()
+
+        clients = _with_month_pairs(client_month, ['Segment', 'Client'], ['Revenue', 'Cost'])
+        clients['Margin %'] = _margin_pct(clients['Revenue'], clients['Cost'])
+        clients['Margin % Prev'] = _margin_pct(clients['RevenuePrev'], clients['CostPrev'])
+        clients['Margin Drop'] = clients['Margin % Prev'] - clients['Margin %']
+        self.client_month = self._complete_pairs(clients)
+
+        cost_rows = rows[rows['Type'] == 'Cost'].dropna(subset=['Group4'])
+        g4 = cost_rows.groupby(['Segment', 'Group4', 'MonthKey'], as_index=False)['Amount'].sum()
+        g4 = _with_month_pairs(g4, ['Segment', 'Group4'], ['Amount'])
+        g4['abs_change'] = g4['Amount'] - g4['AmountPrev']
+        g4['% Change'] = g4['abs_change'] / g4['AmountPrev'].replace(0, 0.0001) * 100
+        g4 = self._complete_pairs(g4).sort_values(
+            ['Segment', 'MonthKey', 'abs_change'], ascending=[True, True, False], kind='stable')
+        g4['Rank'] = g4.groupby(['Segment', 'MonthKey']).cumcount() + 1
+        self.group4 = g4.set_index(['Segment', 'MonthKey']).sort_index(kind='stable')
+
+    def _complete_pairs(self, paired: pd.DataFrame) -> pd.DataFrame:
+        # Only month pairs where the segment has data in both months
+        known = self.segment_month.index
+        current = pd.MultiIndex.from_arrays([paired['Segment'], paired['MonthKey']]).isin(known)
+        previous = pd.MultiIndex.from_arrays([paired['Segment'], paired['MonthKey'] - 1]).isin(known)
+        return paired[current & previous].reset_index(drop=True)
+
+    @property
+    def segments(self):
+        return sorted(self.segment_month.index.get_level_values('Segment').unique())
+
+    def lookup(self, segment: str, month=None, top_n: int = 8):
+        """Root-cause summary for `segment` between `month` (default: latest) and the month before."""
+        latest_key = month_key_of(month) if month is not None else self.latest_key
+        if latest_key is None:
+            return None
+        prev_key = latest_key - 1
+        key = (segment, latest_key)
+
+        segment_margin = None
+        if key in self.segment_month.index and (segment, prev_key) in self.segment_month.index:
+            segment_margin = (self.segment_month.loc[(segment, prev_key), 'Margin %'],
+                              self.segment_month.loc[key, 'Margin %'])
+
+        segment_cost = (
+            self.segment_month['Cost'].get((segment, prev_key), 0),
+            self.segment_month['Cost'].get(key, 0),
+        )
+
+        clients = self.client_month[(self.client_month['Segment'] == segment) &
+                                    (self.client_month['MonthKey'] == latest_key)]
+        client_margin = (int((clients['Margin Drop'] > 0).sum()), len(clients))
+
+        group4 = self.group4.loc[[key]] if key in self.group4.index else self.group4.iloc[0:0]
+        group4 = group4[group4['abs_change'] > 0].head(top_n)
+
+        return RootCause(
+            segment=segment,
+            prev_month=period_at(prev_key, 'MonthStart'),
+            latest_month=period_at(latest_key, 'MonthStart'),
+            segment_margin=segment_margin,
+            client_margin=client_margin,
+            segment_cost=segment_cost,
+            group4=group4.reset_index(),
+        )
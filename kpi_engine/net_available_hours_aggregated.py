@@ -7,9 +7,31 @@ import json
 import os
 from google.cloud import storage
 from dotenv import load_dotenv
+from utils.schema_registry import apply_schema
+from utils.calendar_dim import period_of
+from utils.groupby_kernels import grouped_sum
 
 load_dotenv('.env.template')
 
+HOURS_KEYS = ['FinalCustomerName', 'Segment', 'BU', 'DU', 'Month']
+
+
+def prepare_hours_rows(df):
+    """UT rows with canonical columns and a 'Jan'..'Dec' Month label."""
+    # Date_a/hours dtypes and BU/DU aliases via the schema registry
+    df = apply_schema(df, "ut", derive=False)
+    df['Month'] = period_of(df['Date_a'], 'MonthLabel')
+
+    for col in ['Segment', 'BU', 'DU']:
+        if col not in df.columns:
+            df[col] = 'Unknown'
+    return df
+
+
+def aggregate_net_available_hours(df):
+    return grouped_sum(prepare_hours_rows(df), HOURS_KEYS, 'NetAvailableHours')
+
+
 def get_net_available_hours_aggregated(ut_path):
     
     try:
@@ -34,23 +56,4 @@ def get_net_available_hours_aggregated(ut_path):
         raise RuntimeError(f"Failed to get net available hours data: {e}")
     
 
-    df['Date_a'] = pd.to_datetime(df['Date_a'], errors='coerce')
-    df['Month'] = df['Date_a'].dt.month.map({
-        1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
-        7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'
-    })
-
-    if 'Segment' not in df.columns:
-        df['Segment'] = 'Unknown'
-    if 'Exec DG' in df.columns:
-        df['BU'] = df['Exec DG']
-    else:
-        df['BU'] = 'Unknown'
-    if 'Exec DU' in df.columns:
-        df['DU'] = df['Exec DU']
-    else:
-        df['DU'] = 'Unknown'
-
-    grouped = df.groupby(['FinalCustomerName', 'Segment', 'BU', 'DU', 'Month'])['NetAvailableHours'].sum().reset_index()
-    grouped = grouped.rename(columns={'NetAvailableHours': 'NetAvailableHours'})
-    return grouped
+    return aggregate_net_available_hours(df)
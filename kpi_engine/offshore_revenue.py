@@ -6,6 +6,7 @@ from io import BytesIO
 import json
 import os
 from dotenv import load_dotenv
+from kpi_engine.pnl_hierarchy import pnl_hierarchy
 
 load_dotenv('.env.template')
 
@@ -28,7 +29,7 @@ def load_data(pnl_path: str) -> pd.DataFrame:
 
 def calculate_offshore_revenue(df: pd.DataFrame) -> float:
     try:
-        offshore_revenue = df[df["Group1"] == "OFFSHORE"]["Amount in USD"].sum()
+        offshore_revenue = pnl_hierarchy(df).total({"Group1": "OFFSHORE"})
         return offshore_revenue
     except Exception as e:
         raise RuntimeError(f"Error calculating Offshore Revenue: {e}")
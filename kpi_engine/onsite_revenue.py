@@ -6,6 +6,7 @@ from io import BytesIO
 import json
 import os
 from dotenv import load_dotenv
+from kpi_engine.pnl_hierarchy import pnl_hierarchy
 
 load_dotenv('.env.template')
 
@@ -28,7 +29,7 @@ def load_data(pnl_path: str) -> pd.DataFrame:
 
 def calculate_onsite_revenue(df: pd.DataFrame) -> float:
     try:
-        onsite_revenue = df[df["Group1"] == "ONSITE"]["Amount in USD"].sum()
+        onsite_revenue = pnl_hierarchy(df).total({"Group1": "ONSITE"})
         return onsite_revenue
     except Exception as e:
         raise RuntimeError(f"Error calculating Onsite Revenue: {e}")
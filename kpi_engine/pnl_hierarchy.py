@@ -0,0 +1,146 @@
+# pnl_hierarchy.py
+
+import numpy as np
+import pandas as pd
+from utils.schema_registry import resolve_column
+from utils.calendar_dim import month_keys, attach_periods, period_at
+from utils.groupby_kernels import cached_fingerprint
+from utils.dataset_version import VersionedCache
+
+# P&L line-item tree, top to bottom
+HIERARCHY = ['Group1', 'Group4', 'Group Description']
+
+# Dimensions amounts can be broken down by
+DIMENSIONS = ['Segment', 'BU', 'DU']
+
+# Compensation & benefits line items (Group Description)
+CB_DESCRIPTIONS = [
+    "Onsite Salaries & Allowances", "Cost of Onsite TPCs/Retainers",
+    "C&B Cost Offshore", "Professional Fee - Retainers/TPC"
+]
+
+# Revenue lines (Group1)
+REVENUE_GROUP1 = ['ONSITE', 'OFFSHORE', 'INDIRECT REVENUE']
+
+# Time grains -> calendar field of the period
+GRAINS = {'month': 'MonthPeriod', 'quarter': 'CalendarQuarterPeriod', 'year': 'YearPeriod'}
+
+# Memoized lookups per tree; the oldest are dropped beyond this
+MAX_LOOKUPS = 512
+
+_tree_cache = VersionedCache()
+
+
+class PnlHierarchy:
+    """
+    P&L amounts for every node of the Group1 -> Group4 -> Group Description
+    tree by Segment/BU/DU, Type and month, summed in one pass.
+
+    Totals such as onsite cost, offshore revenue or C&B for a segment and
+    quarter are sums over the matching leaves of this small table, not new
+    scans of the P&L rows. `Type` is matched case-insensitively.
+    """
+
+    def __init__(self, df: pd.DataFrame, dimensions=DIMENSIONS):
+        amount_col = resolve_column(df, "pnl", "Amount")
+        if not amount_col:
+            raise ValueError("Column not found: Amount in USD")
+
+        self.dimensions = list(dimensions)
+        rows = pd.DataFrame(index=df.index)
+        for col in self.dimensions + HIERARCHY:
+            rows[col] = df[col] if col in df.columns else ('Unknown' if col in self.dimensions else np.nan)
+        rows['Type'] = df['Type'].astype(str).str.strip().str.lower().where(df['Type'].notna()) \
+            if 'Type' in df.columns else np.nan
+        month_col = resolve_column(df, "pnl", "Month")
+        rows['MonthKey'] = month_keys(pd.to_datetime(df[month_col], errors='coerce')) if month_col else -1
+        rows['Amount'] = pd.to_numeric(df[amount_col], errors='coerce')
+
+        keys = self.dimensions + ['Type'] + HIERARCHY + ['MonthKey']
+        leaves = rows.groupby(keys, dropna=False, observed=True, sort=False)['Amount'].sum().reset_index()
+
+        # Period labels of each month (undated rows have none)
+        dated = leaves['MonthKey'] >= 0
+        starts = pd.Series(pd.NaT, index=leaves.index, dtype='datetime64[ns]')
+        starts[dated] = pd.to_datetime(pd.DataFrame({
+            'year': leaves.loc[dated, 'MonthKey'] // 12, 'month': leaves.loc[dated, 'MonthKey'] % 12 + 1, 'day': 1}))
+        periods = attach_periods(starts, list(GRAINS.values()))
+        for field in GRAINS.values():
+            leaves[field] = periods[field]
+        self.leaves = leaves
+        self._lookups = {}
+
+    @staticmethod
+    def _freeze(spec) -> tuple:
+        frozen = []
+        for column, allowed in (spec or {}).items():
+            allowed = [allowed] if isinstance(allowed, str) or not hasattr(allowed, '__iter__') else list(allowed)
+            frozen.append((column, tuple(sorted(set(allowed), key=str))))
+        return tuple(sorted(frozen))
+
+    def _select(self, frozen) -> pd.DataFrame:
+        leaves = self.leaves
+        for column, allowed in frozen:
+            if column not in leaves.columns:
+                return leaves.iloc[0:0]
+            if column == 'Type':
+                allowed = [str(a).strip().lower() for a in allowed]
+            leaves = leaves[leaves[column].isin(allowed)]
+        return leaves
+
+    def _memo(self, key, compute):
+        if key not in self._lookups:
+            if len(self._lookups) >= MAX_LOOKUPS:
+                self._lookups.pop(next(iter(self._lookups)))
+            self._lookups[key] = compute()
+        return self._lookups[key]
+
+    def values(self, column: str) -> list:
+        """Distinct values of a dimension, tree level or Type."""
+        return sorted(self.leaves[column].dropna().unique(), key=str)
+
+    def latest_month(self, filters: dict = None):
+        """Start of the latest month with rows within `filters` (None if undated)."""
+        keys = self._select(self._freeze(filters))['MonthKey']
+        return period_at(int(keys.max()), 'MonthStart') if (keys >= 0).any() else None
+
+    def total(self, node: dict = None, filters: dict = None) -> float:
+        """
+        Sum of the amounts under `node`, e.g. {'Group1': ['COST - ONSITE']}
+        or {'Group Description': CB_DESCRIPTIONS}, within `filters`
+        (dimensions, Type, MonthKey or period columns).
+        """
+        frozen = self._freeze(node) + self._freeze(filters)
+        return self._memo(('total', frozen), lambda: float(self._select(frozen)['Amount'].sum()))
+
+    def amounts(self, by=(), grain: str = None, node: dict = None, filters: dict = None) -> pd.Series:
+        """
+        Amounts under `node` by `by` columns (dimensions or tree levels) and,
+        with a `grain` ('month', 'quarter', 'year'), by period as the last level.
+        Undated rows are left out of period breakdowns.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        frozen = self._freeze(node) + self._freeze(filters)
+        return self._memo(('amounts', tuple(by), grain, frozen), lambda: self._amounts(by, grain, frozen))
+
+    def _amounts(self, by, grain, frozen):
+        leaves = self._select(frozen)
+        keys = list(by)
+        if grain:
+            leaves = leaves[leaves['MonthKey'] >= 0]
+            keys.append(GRAINS[grain])
+        if not keys:
+            return pd.Series({'Total': leaves['Amount'].sum()}, name='Amount')
+        return leaves.groupby(keys, observed=True)['Amount'].sum()
+
+    def node_amounts(self, level: str, by=(), grain: str = None, filters: dict = None) -> pd.Series:
+        """Amounts of every node down to `level` of the tree (its path as the index)."""
+        depth = HIERARCHY.index(level) + 1
+        by = [by] if isinstance(by, str) else list(by)
+        return self.amounts(by + HIERARCHY[:depth], grain, filters=filters)
+
+
+def pnl_hierarchy(df: pd.DataFrame) -> PnlHierarchy:
+    """Tree for a P&L frame, reused for the current dataset version."""
+    key = ('pnl_hierarchy', len(df), cached_fingerprint(df))
+    return _tree_cache.get_or_compute(key, lambda: PnlHierarchy(df))
@@ -1,13 +1,15 @@
 import pandas as pd
+from utils.calendar_dim import period_of
+from kpi_engine.realized_rate_matrix import quarter_over_quarter
 
 def calculate_realized_rate_quarterly(pnl_df: pd.DataFrame, ut_df: pd.DataFrame, segment_filter: str = None, drop_threshold: float = 3.0):
-    # Standardize Month format
-    pnl_df['Month'] = pd.to_datetime(pnl_df['Month'], errors='coerce')
-    ut_df['Month'] = pd.to_datetime(ut_df['Month'], errors='coerce')
+    # Standardize Month format (on copies: callers' frames are left untouched)
+    pnl_df = pnl_df.assign(Month=pd.to_datetime(pnl_df['Month'], errors='coerce'))
+    ut_df = ut_df.assign(Month=pd.to_datetime(ut_df['Month'], errors='coerce'))
 
     # Drop rows with missing join keys
-    pnl_df.dropna(subset=['FinalCustomerName', 'Month'], inplace=True)
-    ut_df.dropna(subset=['FinalCustomerName', 'Month'], inplace=True)
+    pnl_df = pnl_df.dropna(subset=['FinalCustomerName', 'Month'])
+    ut_df = ut_df.dropna(subset=['FinalCustomerName', 'Month'])
 
     # Filter revenue rows only
     pnl_df = pnl_df[
@@ -21,36 +23,34 @@ def calculate_realized_rate_quarterly(pnl_df: pd.DataFrame, ut_df: pd.DataFrame,
 
     # Aggregate revenue
     revenue_df = pnl_df.groupby(['FinalCustomerName', 'Month'], as_index=False)["Amount in USD"].sum()
-    revenue_df.rename(columns={"Amount in USD": "Revenue"}, inplace=True)
+    revenue_df = revenue_df.rename(columns={"Amount in USD": "Revenue"})
 
     # Aggregate UT data
     ut_df = ut_df.dropna(subset=['NetAvailableHours'])
     ut_df = ut_df[ut_df['NetAvailableHours'] != 0]
     ut_grouped = ut_df.groupby(['FinalCustomerName', 'Month'], as_index=False)['NetAvailableHours'].sum()
-    ut_grouped.rename(columns={'NetAvailableHours': 'AvailableHours'}, inplace=True)
+    ut_grouped = ut_grouped.rename(columns={'NetAvailableHours': 'AvailableHours'})
 
     # Merge P&L and UT data
     merged_df = pd.merge(revenue_df, ut_grouped, on=['FinalCustomerName', 'Month'], how='inner')
 
     # Compute realized rate per month
-    merged_df = merged_df[merged_df['AvailableHours'] != 0]
+    merged_df = merged_df[merged_df['AvailableHours'] != 0].copy()
     merged_df['RealizedRate'] = merged_df['Revenue'] / merged_df['AvailableHours']
 
     # Compute quarter from Month
-    merged_df['Quarter'] = merged_df['Month'].dt.to_period('Q')
+    merged_df['Quarter'] = period_of(merged_df['Month'], 'CalendarQuarterPeriod')
 
     # Aggregate to quarterly level
     qtr_df = merged_df.groupby(['FinalCustomerName', 'Quarter'], as_index=False).agg({
         'Revenue': 'sum',
         'AvailableHours': 'sum'
     })
-    qtr_df = qtr_df[qtr_df['AvailableHours'] != 0]
+    qtr_df = qtr_df[qtr_df['AvailableHours'] != 0].copy()
     qtr_df['RealizedRate'] = qtr_df['Revenue'] / qtr_df['AvailableHours']
 
     # Sort by FinalCustomerName and Quarter to compute difference
-    qtr_df.sort_values(['FinalCustomerName', 'Quarter'], inplace=True)
-    qtr_df['PrevRealizedRate'] = qtr_df.groupby('FinalCustomerName')['RealizedRate'].shift(1)
-    qtr_df['RateDrop'] = qtr_df['PrevRealizedRate'] - qtr_df['RealizedRate']
+    qtr_df = quarter_over_quarter(qtr_df, ['FinalCustomerName'])
 
     # Filter accounts where rate drop > threshold
     qtr_df_filtered = qtr_df[qtr_df['RateDrop'] > drop_threshold]
@@ -58,4 +58,5 @@ def calculate_realized_rate_quarterly(pnl_df: pd.DataFrame, ut_df: pd.DataFrame,
     return qtr_df_filtered[['FinalCustomerName', 'Quarter', 'PrevRealizedRate', 'RealizedRate', 'RateDrop']].reset_index(drop=True)
 
 
-# This function can now be called in q6.py and passed pnl_df, ut_df, segment, threshold from the UI.
+# q6 answers threshold/segment queries from the precomputed RealizedRateDropMatrix
+# (kpi_engine/realized_rate_matrix.py) instead of calling this per sidebar change.
@@ -0,0 +1,110 @@
+# realized_rate_matrix.py
+
+import numpy as np
+import pandas as pd
+from utils.calendar_dim import FISCAL_QUARTER_BY_LABEL, MONTH_NUMBER_BY_LABEL, fiscal_quarter_key
+
+ACCOUNT_KEYS = ['FinalCustomerName', 'Segment', 'BU', 'DU']
+ALL = "All"
+
+
+def monthly_realized_rate(df_revenue: pd.DataFrame, df_hours: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merge precomputed revenue and net available hours per account/Segment/BU/DU/Month
+    and add 'Realized Rate' (Revenue / NetAvailableHours, 0 when there are no hours),
+    the fiscal 'Quarter' label and 'QuarterKey', which orders quarters across
+    fiscal years. The precomputed tables carry month labels only ('Jan'..'Dec',
+    one calendar year), so Jan–Mar (FY Q4) comes before Apr–Jun (next FY Q1);
+    a 'MonthKey' column (year * 12 + month - 1) is used instead when present.
+    """
+    group_keys = ACCOUNT_KEYS + ['Month']
+    hours = df_hours.groupby(group_keys, observed=True)['NetAvailableHours'].sum().reset_index()
+    revenue = df_revenue.drop(columns=['Quarter'], errors='ignore')
+    merged = pd.merge(revenue, hours, on=group_keys, how='inner')
+
+    merged['Revenue'] = merged['Revenue'].fillna(0)
+    merged['NetAvailableHours'] = merged['NetAvailableHours'].fillna(0)
+    hours_value = merged['NetAvailableHours'].to_numpy(dtype=float)
+    rate = np.divide(merged['Revenue'].to_numpy(dtype=float), hours_value,
+                     out=np.zeros(len(merged)), where=hours_value > 0)
+    merged['Realized Rate'] = rate.round(2)
+    merged['Quarter'] = merged['Month'].astype(str).map(FISCAL_QUARTER_BY_LABEL)
+    if 'MonthKey' in merged.columns:
+        keys = merged['MonthKey'].to_numpy(dtype=np.int64)
+    else:
+        keys = merged['Month'].astype(str).map(MONTH_NUMBER_BY_LABEL).to_numpy(dtype=np.int64) - 1
+    merged['QuarterKey'] = fiscal_quarter_key(keys)
+    return merged
+
+
+def quarter_over_quarter(qtr_df: pd.DataFrame, keys, quarter_col='Quarter', rate_col='RealizedRate',
+                         order_col=None) -> pd.DataFrame:
+    """
+    Add 'PrevRealizedRate' and 'RateDrop' (previous - current) within each key group,
+    ordered by `order_col` (default: the quarter column itself, which must then sort
+    chronologically, e.g. a Period). Returns a new frame.
+    """
+    qtr_df = qtr_df.sort_values(list(keys) + [order_col or quarter_col])
+    qtr_df['PrevRealizedRate'] = qtr_df.groupby(list(keys), observed=True)[rate_col].shift(1)
+    qtr_df['RateDrop'] = qtr_df['PrevRealizedRate'] - qtr_df[rate_col]
+    return qtr_df
+
+
+class RealizedRateDropMatrix:
+    """
+    Quarter-over-quarter realized rate drops for every account × Segment/BU/DU,
+    computed once per dataset version.
+
+    Drops are stored sorted ascending, once overall and once per segment, so a
+    threshold query is a binary search for the first drop above it; BU/DU and
+    rate bounds are then applied to that (small) tail only.
+    """
+
+    def __init__(self, monthly: pd.DataFrame):
+        self.monthly = monthly
+
+        # Quarters are ordered by QuarterKey: the 'Q1'..'Q4' label has no fiscal year
+        quarterly = monthly.groupby(ACCOUNT_KEYS + ['QuarterKey', 'Quarter'], observed=True, as_index=False).agg(
+            Revenue=('Revenue', 'sum'), AvailableHours=('NetAvailableHours', 'sum'))
+        quarterly = quarterly[quarterly['AvailableHours'] > 0].copy()
+        quarterly['RealizedRate'] = quarterly['Revenue'] / quarterly['AvailableHours']
+        drops = quarter_over_quarter(quarterly, ACCOUNT_KEYS, order_col='QuarterKey').dropna(subset=['RateDrop'])
+
+        self.drops = drops.sort_values('RateDrop', kind='stable').reset_index(drop=True)
+        self._sorted = {ALL: self.drops['RateDrop'].to_numpy()}
+        self._positions = {ALL: np.arange(len(self.drops))}
+        for segment, positions in self.drops.groupby('Segment', observed=True).indices.items():
+            # groupby indices keep row order, so each partition stays sorted by drop
+            self._positions[segment] = positions
+            self._sorted[segment] = self._sorted[ALL][positions]
+
+    @classmethod
+    def build(cls, df_revenue: pd.DataFrame, df_hours: pd.DataFrame):
+        return cls(monthly_realized_rate(df_revenue, df_hours))
+
+    def query(self, threshold: float = 0.0, segment: str = ALL, bu: str = ALL, du: str = ALL,
+              min_rate: float = None, max_rate: float = None) -> pd.DataFrame:
+        """Accounts whose realized rate dropped by more than `threshold`, largest drop first."""
+        segment = segment or ALL
+        if segment not in self._sorted:
+            return self.drops.iloc[0:0]
+
+        start = np.searchsorted(self._sorted[segment], threshold, side='right')
+        result = self.drops.iloc[self._positions[segment][start:][::-1]]
+
+        if bu and bu != ALL:
+            result = result[result['BU'] == bu]
+        if du and du != ALL:
+            result = result[result['DU'] == du]
+        if min_rate is not None:
+            result = result[result['RealizedRate'] >= min_rate]
+        if max_rate is not None:
+            result = result[result['RealizedRate'] <= max_rate]
+        return result.reset_index(drop=True)
+
+    def count_above(self, threshold: float, segment: str = ALL) -> int:
+        """Number of account-quarters with a drop above `threshold` (binary search only)."""
+        drops = self._sorted.get(segment or ALL)
+        if drops is None:
+            return 0
+        return int(len(drops) - np.searchsorted(drops, threshold, side='right'))
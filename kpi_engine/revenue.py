@@ -1,4 +1,5 @@
 import pandas as pd
+from utils.calendar_dim import period_of
 
 def calculate_revenue(pnl_df: pd.DataFrame,
                       segment: str = None,
@@ -22,7 +23,7 @@ def calculate_revenue(pnl_df: pd.DataFrame,
     """
     df = pnl_df.copy()
     df['Month'] = pd.to_datetime(df['Month'], errors='coerce')
-    df['Quarter'] = df['Month'].dt.to_period('Q').astype(str)
+    df['Quarter'] = period_of(df['Month'], 'CalendarQuarter')
 
     df = df[(df['Type'].str.lower() == 'revenue') &
             (df['Group1'].str.upper().isin(['ONSITE', 'OFFSHORE', 'INDIRECT REVENUE']))]
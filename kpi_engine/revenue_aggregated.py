@@ -5,8 +5,33 @@ import json
 import os
 from google.cloud import storage
 from dotenv import load_dotenv
+from utils.schema_registry import apply_schema
+from utils.calendar_dim import period_of
+from utils.groupby_kernels import grouped_sum
 
 load_dotenv('.env.template')
+
+REVENUE_KEYS = ['FinalCustomerName', 'Segment', 'BU', 'DU', 'Month']
+
+
+def prepare_revenue_rows(df):
+    """Revenue rows with canonical columns and a 'Jan'..'Dec' Month label."""
+    # Amount in USD -> Amount, Month dtype and Exec DG/DU -> BU/DU via the schema registry
+    df = apply_schema(df, "pnl")
+    df = df[df['Type'] == 'Revenue'].copy()
+    df['Month'] = period_of(df['Month'], 'MonthLabel')
+
+    for col in ['Segment', 'BU', 'DU']:
+        if col not in df.columns:
+            df[col] = 'Unknown'
+    return df
+
+
+def aggregate_revenue(df):
+    grouped = grouped_sum(prepare_revenue_rows(df), REVENUE_KEYS, 'Amount')
+    return grouped.rename(columns={'Amount': 'Revenue'})
+
+
 def get_revenue_aggregated(pnl_path):
     try:
         # Initialize GCS client using credentials from environment variables
@@ -29,24 +54,4 @@ def get_revenue_aggregated(pnl_path):
     except Exception as e:
         raise RuntimeError(f"Failed to get net available hours data: {e}")
 
-    df = df[df['Type'] == 'Revenue']
-    df['Month'] = pd.to_datetime(df['Month'], errors='coerce').dt.month
-    df['Month'] = df['Month'].map({
-        1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
-        7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'
-    })
-
-    if 'Segment' not in df.columns:
-        df['Segment'] = 'Unknown'
-    if 'Exec DG' in df.columns:
-        df['BU'] = df['Exec DG']
-    else:
-        df['BU'] = 'Unknown'
-    if 'Exec DU' in df.columns:
-        df['DU'] = df['Exec DU']
-    else:
-        df['DU'] = 'Unknown'
-
-    grouped = df.groupby(['FinalCustomerName', 'Segment', 'BU', 'DU', 'Month'])['Amount in USD'].sum().reset_index()
-    grouped = grouped.rename(columns={'Amount in USD': 'Revenue'})
-    return grouped
+    return aggregate_revenue(df)
@@ -1,4 +1,6 @@
 import pandas as pd
+from utils.schema_registry import apply_schema
+from utils.calendar_dim import period_of
 
 def calculate_revenue_per_person(pnl_df: pd.DataFrame, ut_df: pd.DataFrame,
                                  segment: str = None,
@@ -14,7 +16,7 @@ def calculate_revenue_per_person(pnl_df: pd.DataFrame, ut_df: pd.DataFrame,
     # Prepare and clean P&L data
     pnl_df = pnl_df.copy()
     pnl_df['Month'] = pd.to_datetime(pnl_df['Month'], errors='coerce')
-    pnl_df['Quarter'] = pnl_df['Month'].dt.to_period('Q').astype(str)
+    pnl_df['Quarter'] = period_of(pnl_df['Month'], 'CalendarQuarter')
 
     pnl_df = pnl_df[
         (pnl_df['Type'].str.lower() == 'revenue') &
@@ -34,9 +36,9 @@ def calculate_revenue_per_person(pnl_df: pd.DataFrame, ut_df: pd.DataFrame,
     revenue_grouped.rename(columns={'Amount in USD': 'Revenue'}, inplace=True)
 
     # Prepare and clean UT data
-    ut_df = ut_df.copy()
-    ut_df['date_a'] = pd.to_datetime(ut_df['date_a'], errors='coerce')
-    ut_df['Quarter'] = ut_df['date_a'].dt.to_period('Q').astype(str)
+    # 'date_a'/'Date_a' and its dtype are resolved by the schema registry
+    ut_df = apply_schema(ut_df, "ut", derive=False).copy()
+    ut_df['Quarter'] = period_of(ut_df['Date_a'], 'CalendarQuarter')
 
     if segment:
         ut_df = ut_df[ut_df['Segment'].str.lower() == segment.lower()]
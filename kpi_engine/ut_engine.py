@@ -0,0 +1,175 @@
+# ut_engine.py
+
+import numpy as np
+import pandas as pd
+from utils.schema_registry import apply_schema
+from utils.calendar_dim import month_keys, attach_periods
+from utils.groupby_kernels import GroupKeys, cached_fingerprint
+from utils.dataset_version import VersionedCache
+
+# Additive base table: hours per account/segment/BU/DU and month
+CUBE_KEYS = ['Segment', 'BU', 'DU', 'Account', 'MonthKey']
+HOUR_COLUMNS = ['TotalBillableHours', 'NetAvailableHours']
+
+# Levels a UT% view can be broken down by (FinalCustomerName is the account)
+LEVELS = {'DU': 'DU', 'BU': 'BU', 'Segment': 'Segment', 'Account': 'Account', 'FinalCustomerName': 'Account'}
+
+# Time grains -> (calendar field labelling a period, field ordering the periods)
+GRAINS = {
+    'month': ('MonthPeriod', 'MonthKey'),
+    'quarter': ('CalendarQuarterPeriod', 'MonthKey'),
+    'year': ('YearPeriod', 'MonthKey'),
+    'month_of_year': ('MonthLabel', 'MonthNum'),
+    'quarter_of_year': ('CalendarQuarter', 'MonthKey'),
+}
+PERIOD_FIELDS = ['MonthPeriod', 'CalendarQuarterPeriod', 'YearPeriod', 'MonthLabel', 'MonthNum', 'CalendarQuarter']
+
+VALUES = ['UT%'] + HOUR_COLUMNS
+
+# Memoized views per engine; the oldest are dropped beyond this
+MAX_VIEWS = 256
+
+_engine_cache = VersionedCache()
+
+
+def prepare_cube_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """UT rows reduced to the cube keys and the two additive hour columns."""
+    df = apply_schema(df, "ut", derive=False)
+    date_col = 'Date_a' if 'Date_a' in df.columns else 'Month'
+    rows = pd.DataFrame({'MonthKey': month_keys(df[date_col])}, index=df.index)
+    for col in ['Segment', 'BU', 'DU']:
+        rows[col] = df[col] if col in df.columns else 'Unknown'
+    rows['Account'] = df['FinalCustomerName'] if 'FinalCustomerName' in df.columns else 'Unknown'
+    for col in HOUR_COLUMNS:
+        rows[col] = pd.to_numeric(df[col], errors='coerce')
+    return rows[rows['MonthKey'] >= 0]
+
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """Summed billable and available hours per CUBE_KEYS."""
+    rows = prepare_cube_rows(df)
+    grouper = GroupKeys(rows, CUBE_KEYS)
+    cube = grouper.index_frame()
+    for col in HOUR_COLUMNS:
+        cube[col] = grouper.sum(rows[col])
+    return cube
+
+
+def ut_pct(billable, available):
+    """Ratio-of-sums UT% (0 where nothing was available)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(available > 0, billable / available * 100, 0.0)
+
+
+class UtilizationEngine:
+    """
+    UT% at any level and time grain from additive hours.
+
+    The UT extract is reduced once to billable and available hours per
+    account/segment/BU/DU and month. Every view sums those hours to the
+    requested level and period and divides afterwards, so UT% is a ratio
+    of sums (hour-weighted) rather than an average of row-level ratios.
+    Pivots are memoized per (level, grain, filters, value).
+    """
+
+    def __init__(self, df: pd.DataFrame = None, cube: pd.DataFrame = None):
+        cube = build_cube(df) if cube is None else cube
+        self.cube = self._with_periods(cube.reset_index(drop=True))
+        self._views = {}
+
+    @classmethod
+    def from_cube(cls, cube: pd.DataFrame) -> "UtilizationEngine":
+        return cls(cube=cube)
+
+    @staticmethod
+    def _with_periods(cube: pd.DataFrame) -> pd.DataFrame:
+        starts = pd.to_datetime(pd.DataFrame({
+            'year': cube['MonthKey'] // 12, 'month': cube['MonthKey'] % 12 + 1, 'day': 1}))
+        periods = attach_periods(starts, PERIOD_FIELDS)
+        for field in PERIOD_FIELDS:
+            values = periods[field]
+            cube[field] = values if field == 'MonthNum' else values.astype(str)
+        return cube
+
+    def values(self, column: str) -> list:
+        """Distinct values of a cube column, e.g. for filter widgets."""
+        return sorted(self.cube[LEVELS.get(column, column)].dropna().unique())
+
+    def _filtered(self, filters) -> pd.DataFrame:
+        cube = self.cube
+        for column, allowed in filters:
+            cube = cube[cube[LEVELS.get(column, column)].isin(allowed)]
+        return cube
+
+    def _memo(self, key, compute):
+        if key not in self._views:
+            if len(self._views) >= MAX_VIEWS:
+                self._views.pop(next(iter(self._views)))
+            self._views[key] = compute()
+        return self._views[key]
+
+    @staticmethod
+    def _freeze(filters) -> tuple:
+        # Empty selections mean "no filter"
+        frozen = []
+        for column, allowed in (filters or {}).items():
+            allowed = [allowed] if isinstance(allowed, str) else list(allowed if allowed is not None else [])
+            if allowed:
+                frozen.append((column, tuple(sorted(set(allowed), key=str))))
+        return tuple(sorted(frozen))
+
+    def _periods(self, cube, grain):
+        field, order = GRAINS[grain]
+        ordered = cube[[field, order]].drop_duplicates().sort_values(order, kind='stable')
+        return list(dict.fromkeys(ordered[field]))
+
+    def hours(self, level: str, grain: str = 'month', filters: dict = None) -> pd.DataFrame:
+        """Long table: level, period, summed hours and UT% per combination."""
+        frozen = self._freeze(filters)
+        return self._memo(('hours', level, grain, frozen), lambda: self._hours(level, grain, frozen))
+
+    def _hours(self, level, grain, frozen):
+        field, _ = GRAINS[grain]
+        column = LEVELS[level] if level is not None else None
+        keys = [column, field] if column else [field]
+        cube = self._filtered(frozen)
+        table = cube.groupby(keys, sort=False, observed=True)[HOUR_COLUMNS].sum().reset_index()
+        table['UT%'] = ut_pct(table['TotalBillableHours'].to_numpy(), table['NetAvailableHours'].to_numpy())
+        return table
+
+    def pivot(self, level: str, grain: str = 'month', filters: dict = None, value: str = 'UT%') -> pd.DataFrame:
+        """One row per level value, one column per period (0 where there is no data)."""
+        if value not in VALUES:
+            raise ValueError(f"Unknown UT value '{value}'; use one of {VALUES}.")
+        frozen = self._freeze(filters)
+        return self._memo(('pivot', level, grain, frozen, value), lambda: self._pivot(level, grain, frozen, value))
+
+    def _pivot(self, level, grain, frozen, value):
+        field, _ = GRAINS[grain]
+        column = LEVELS[level]
+        table = self.hours(level, grain, dict(frozen))
+        pivot = table.pivot(index=column, columns=field, values=value)
+        pivot = pivot.reindex(columns=self._periods(self._filtered(frozen), grain)).fillna(0)
+        pivot.index.name = level
+        pivot.columns.name = field
+        return pivot.sort_index()
+
+    def totals(self, grain: str = 'month', filters: dict = None, value: str = 'UT%') -> pd.Series:
+        """Hour-weighted total across all level values, per period."""
+        frozen = self._freeze(filters)
+        return self._memo(('totals', grain, frozen, value), lambda: self._totals(grain, frozen, value))
+
+    def _totals(self, grain, frozen, value):
+        field, _ = GRAINS[grain]
+        table = self.hours(None, grain, dict(frozen)).set_index(field)
+        return table[value].reindex(self._periods(self._filtered(frozen), grain)).fillna(0)
+
+    def trend(self, level: str, grain: str = 'month') -> pd.DataFrame:
+        """Periods as rows, level values as columns (the layout of the get_ut_*_trend views)."""
+        return self._memo(('trend', level, grain), lambda: self.pivot(level, grain).T)
+
+
+def ut_engine(df: pd.DataFrame) -> UtilizationEngine:
+    """Engine for a UT frame, reused for the current dataset version."""
+    key = ('ut_engine', len(df), cached_fingerprint(df))
+    return _engine_cache.get_or_compute(key, lambda: UtilizationEngine(df))
@@ -8,10 +8,13 @@ from io import BytesIO
 import json
 from google.cloud import storage
 from dotenv import load_dotenv
+from utils.calendar_dim import attach_periods
+from kpi_engine.ut_engine import ut_engine
 
 load_dotenv('.env.template')
-@st.cache_data
-def load_ut_data():
+@st.cache_data(max_entries=2)
+def load_ut_data(dataset_version=None):
+    # Callers pass current_version() so a new dataset version reloads
     try:
         # Initialize GCS client using credentials from environment variables
         client = storage.Client.from_service_account_info(
@@ -38,37 +41,39 @@ def load_ut_data():
         
     except Exception as e:
         raise RuntimeError(f"Failed to load UT data: {e}")
-    
+
+    return prepare_ut_rows(df)
+
+
+def prepare_ut_rows(df):
     # Clean and standardize column names
+    df = df.copy()
     df.columns = df.columns.str.strip()
     
     # Calculate UT%
     df["UT%"] = (df["TotalBillableHours"] / df["NetAvailableHours"]) * 100
     df["Month"] = pd.to_datetime(df["Month"])
-    df["Quarter"] = df["Month"].dt.to_period("Q")
-    df["Year"] = df["Month"].dt.year.astype(str)
+    periods = attach_periods(df["Month"], ["MonthPeriod", "CalendarQuarterPeriod", "Year"])
+    df["YearMonth"] = periods["MonthPeriod"].astype(str)
+    df["Quarter"] = periods["CalendarQuarterPeriod"]
+    df["Year"] = periods["Year"].astype(str)
     
     return df
 
 
-# ✅ Monthly trend for UT%
+# ✅ Monthly trend for UT% (ratio of summed hours, see kpi_engine/ut_engine.py)
 def get_ut_mom_trend(df, level="DU"):
-    trend = df.groupby([pd.Grouper(key="Month", freq="M"), level])["UT%"].mean().reset_index()
-    trend["Month"] = trend["Month"].dt.strftime("%Y-%m")
-    return trend.pivot(index="Month", columns=level, values="UT%").fillna(0)
+    return ut_engine(df).trend(level, "month").rename_axis(index="Month", columns=level)
 
 
 # ✅ Quarterly trend for UT%
 def get_ut_qoq_trend(df, level="DU"):
-    trend = df.groupby(["Quarter", level])["UT%"].mean().reset_index()
-    trend["Quarter"] = trend["Quarter"].astype(str)
-    return trend.pivot(index="Quarter", columns=level, values="UT%").fillna(0)
+    return ut_engine(df).trend(level, "quarter").rename_axis(index="Quarter", columns=level)
 
 
 # ✅ Yearly trend for UT%
 def get_ut_yoy_trend(df, level="DU"):
-    trend = df.groupby(["Year", level])["UT%"].mean().reset_index()
-    return trend.pivot(index="Year", columns=level, values="UT%").fillna(0)
+    return ut_engine(df).trend(level, "year").rename_axis(index="Year", columns=level)
 
 
 # ✅ Agent-level UT%
@@ -1,61 +1,61 @@
 # ✅ FINAL Q1 — Margin % is (Revenue - Cost)/Revenue | Tabs by Segment, DU, BU, Customer | 1 Decimal Formatting
 import pandas as pd
-from dateutil.relativedelta import relativedelta
 import streamlit as st
-import re
+from utils.schema_registry import apply_schema
+from utils.groupby_kernels import pivot_sum, cached_fingerprint
+from utils.result_cache import cached_result
+from utils.param_extractor import extract_params
+from utils.lazy_tabs import lazy_tabs
+from utils.calendar_dim import month_keys, month_key_of, resolve_relative_period, month_range_mask
 
 pd.options.display.float_format = '{:,.1f}'.format  # Force 1 decimal display globally
 
 def compute_margin(df, groupby_fields):
-    df = df.copy()
-    pivot = df.pivot_table(index=["Month"] + groupby_fields, columns="Type", values="Amount", aggfunc="sum").reset_index()
+    pivot = pivot_sum(df, ["Month"] + groupby_fields, "Type", "Amount").reset_index()
     pivot["Revenue"] = pivot.get("Revenue", 0)
     pivot["Cost"] = pivot.get("Cost", 0)
     return pivot
 
 def extract_threshold(user_question, default_threshold=30):
-    if user_question:
-        patterns = [
-            r"margin\s*<\s*(\d+)",
-            r"less than\s*(\d+)",
-            r"below\s*(\d+)",
-            r"under\s*(\d+)",
-            r"margin.*?(\d+)\s*%"
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, user_question.lower())
-            if match:
-                return float(match.group(1))
-    return default_threshold
+    threshold = extract_params(user_question).threshold
+    return default_threshold if threshold is None else threshold
 
 def extract_month(user_question):
-    months = {
-        "january": 1, "february": 2, "march": 3, "april": 4,
-        "may": 5, "june": 6, "july": 7, "august": 8,
-        "september": 9, "october": 10, "november": 11, "december": 12
+    return extract_params(user_question).month_start
+
+def period_rows(df_margin, target_month):
+    """Rows of the requested month, else of the last 3 reported months, with a label."""
+    if target_month:
+        return df_margin[month_keys(df_margin["Month"]) == month_key_of(target_month)], target_month.strftime("%B %Y")
+    latest_month = df_margin["Month"].max()
+    last_quarter = resolve_relative_period("last 3 months", latest_month)
+    return df_margin[month_range_mask(df_margin["Month"], last_quarter)], "the last quarter"
+
+def portfolio_margin(df, target_month):
+    """Headline: overall margin % of the period the tabs cover (a single Month x Type pivot)."""
+    filtered_data, time_label = period_rows(compute_margin(df, []), target_month)
+    revenue, cost = filtered_data["Revenue"].sum(), filtered_data["Cost"].sum()
+    return {
+        "time_label": time_label,
+        "revenue_mn": revenue / 1e6,
+        "margin": (revenue - cost) / revenue * 100 if revenue else None,
     }
-    if user_question:
-        user_question = user_question.lower()
-        for name, num in months.items():
-            if name in user_question:
-                year_match = re.search(rf"{name}\s*(\d{{4}})", user_question)
-                if year_match:
-                    year = int(year_match.group(1))
-                    return pd.Timestamp(year=year, month=num, day=1)
-    return None
 
-def margin_analysis(df, group_field, threshold, target_month):
-    group_name = group_field if isinstance(group_field, str) else " × ".join(group_field)
+def render_portfolio_margin(result):
+    if result["margin"] is None:
+        return
+    st.markdown(f"📌 Overall margin for **{result['time_label']}**: **{result['margin']:.1f}%** "
+                f"on **{result['revenue_mn']:,.1f} Million USD** revenue.")
+
+def margin_table(df, group_field, threshold, target_month):
+    """Low-margin entities of one tab as plain data (cacheable, no rendering)."""
     df_margin = compute_margin(df, [group_field] if isinstance(group_field, str) else group_field)
+    return summarize_margin(df_margin, group_field, threshold, target_month)
 
-    if target_month:
-        filtered_data = df_margin[df_margin["Month"].dt.to_period("M") == target_month.to_period("M")]
-        time_label = target_month.strftime("%B %Y")
-    else:
-        latest_month = df_margin["Month"].max()
-        quarter_start = latest_month - relativedelta(months=2)
-        filtered_data = df_margin[(df_margin["Month"] >= quarter_start) & (df_margin["Month"] <= latest_month)]
-        time_label = "the last quarter"
+def summarize_margin(df_margin, group_field, threshold, target_month):
+    """margin_table() from an already computed monthly Revenue/Cost pivot of `group_field`."""
+    group_name = group_field if isinstance(group_field, str) else " × ".join(group_field)
+    filtered_data, time_label = period_rows(df_margin, target_month)
 
     group_cols = [group_field] if isinstance(group_field, str) else group_field
     grouped = filtered_data.groupby(group_cols).agg({
@@ -74,14 +74,26 @@ def margin_analysis(df, group_field, threshold, target_month):
     low_margin_count = filtered_df.shape[0]
     proportion = (low_margin_count / total_entities * 100) if total_entities else 0
 
+    return {
+        "group_name": group_name,
+        "time_label": time_label,
+        "threshold": threshold,
+        "low_margin_count": low_margin_count,
+        "total_entities": total_entities,
+        "proportion": proportion,
+        "top_10": top_10.reset_index(drop=True),
+    }
+
+def render_margin_table(result):
     st.markdown(
-        f"🔍 **{group_name}** - For **{time_label}**, **{low_margin_count} entities** had average margin below "
-        f"**{threshold}%**, which is **{proportion:.1f}%** of all **{total_entities} entities**."
+        f"🔍 **{result['group_name']}** - For **{result['time_label']}**, **{result['low_margin_count']} entities** "
+        f"had average margin below **{result['threshold']}%**, which is **{result['proportion']:.1f}%** of all "
+        f"**{result['total_entities']} entities**."
     )
 
-    if not top_10.empty:
+    if not result["top_10"].empty:
         st.dataframe(
-            top_10.reset_index(drop=True).style.format({
+            result["top_10"].style.format({
                 "Revenue": "{:,.1f}",
                 "Cost": "{:,.1f}",
                 "Margin %": "{:,.1f}",
@@ -93,28 +105,46 @@ def margin_analysis(df, group_field, threshold, target_month):
     else:
         st.info("No records found below margin threshold.")
 
-def run(df, user_question=None):
-    df = df.copy()
-    df['Month'] = pd.to_datetime(df['Month'], errors='coerce')
+def margin_analysis(df, group_field, threshold, target_month):
+    render_margin_table(margin_table(df, group_field, threshold, target_month))
+
+def prepare_margin_rows(df):
+    # Month dtype and Exec DG/DU -> BU/DU come from the schema registry
+    df = apply_schema(df, "pnl").copy()
     df = df.dropna(subset=["Month"])
     df["Client"] = df.get("FinalCustomerName", "Unknown")
-    df["Segment"] = df.get("Segment", "Unknown")
-    df["BU"] = df.get("Exec DG", "Unknown")
-    df["DU"] = df.get("Exec DU", "Unknown")
-
-    threshold = extract_threshold(user_question)
-    target_month = extract_month(user_question)
+    for col in ["Segment", "BU", "DU"]:
+        if col not in df.columns:
+            df[col] = "Unknown"
+    return df
 
-    tabs = st.tabs(["📋 By Client", "🚛 By Segment", "🏢 By BU", "🏭 By DU"])
+# Tabs of the view: label -> group field
+TABS = {"📋 By Client": "Client", "🚛 By Segment": "Segment", "🏢 By BU": "BU", "🏭 By DU": "DU"}
 
-    with tabs[0]:
-        margin_analysis(df, "Client", threshold, target_month)
-
-    with tabs[1]:
-        margin_analysis(df, "Segment", threshold, target_month)
-
-    with tabs[2]:
-        margin_analysis(df, "BU", threshold, target_month)
-
-    with tabs[3]:
-        margin_analysis(df, "DU", threshold, target_month)
+def run(df, user_question=None):
+    # One pass over the question for both the threshold and the month
+    question = extract_params(user_question)
+    threshold = 30 if question.threshold is None else question.threshold
+    target_month = question.month_start
+
+    # Results are shared across sessions and processes per (parameters, dataset
+    # version); the source fingerprint keeps different input frames apart
+    source = cached_fingerprint(df)
+    prepared = {}
+
+    def rows():
+        if "df" not in prepared:
+            prepared["df"] = prepare_margin_rows(df)
+        return prepared["df"]
+
+    # Cheapest first: the portfolio headline, then the open tab only
+    params = {"group": None, "month": target_month, "source": source}
+    render_portfolio_margin(cached_result("q1_headline", params, lambda: portfolio_margin(rows(), target_month)))
+
+    def show(label):
+        group_field = TABS[label]
+        params = {"group": group_field, "threshold": threshold, "month": target_month, "source": source}
+        render_margin_table(cached_result("q1", params,
+                                          lambda: margin_table(rows(), group_field, threshold, target_month)))
+
+    lazy_tabs(list(TABS), "q1_tab", show)
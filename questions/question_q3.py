@@ -5,54 +5,31 @@ import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 import matplotlib.cm as cm
 import numpy as np
-import re
-
-def run(df, user_question=None):
-    import streamlit as st
-
-    # Standardize column names
-    df.columns = df.columns.str.strip()
-
-    # Identify amount column
-    amount_col = next((col for col in df.columns if col.lower() in ['amount in usd', 'amountinusd', 'amount']), None)
-    if not amount_col:
-        st.error("❌ Column not found: Amount in USD")
-        return
-
-    # Extract segment from user prompt if any
-    selected_segment = None
-    if user_question:
-        segments = df['Segment'].dropna().unique().tolist()
-        pattern = r'\b(?:' + '|'.join(map(re.escape, segments)) + r')\b'
-        match = re.search(pattern, user_question, flags=re.IGNORECASE)
-        if match:
-            selected_segment = match.group(0)
-            df = df[df['Segment'].str.lower() == selected_segment.lower()]
-            st.markdown(f"📌 **Filtered Segment**: `{selected_segment}`")
-
-    # Clean and convert Month
-    df['Month'] = pd.to_datetime(df['Month'], errors='coerce')
-    df = df.dropna(subset=['Month'])
-    df['Quarter'] = df['Month'].dt.to_period('Q')
-
-    # Get latest and previous quarter
-    latest_month = df['Month'].max()
-    latest_q = latest_month.to_period('Q')
-    prev_q = (latest_month - pd.DateOffset(months=3)).to_period('Q')
-
-    # ✅ Use updated C&B logic from Group Description
-    cb_keywords = [
-        "Onsite Salaries & Allowances", "Cost of Onsite TPCs/Retainers",
-        "C&B Cost Offshore", "Professional Fee - Retainers/TPC"
-    ]
-    df_cb = df[df['Group Description'].isin(cb_keywords)]
-
-    df_cost = df[df['Type'].str.lower() == 'cost']
-    df_rev = df[df['Type'].str.lower() == 'revenue']
-
-    cb_summary = df_cb.groupby(['Segment', 'Quarter'])[amount_col].sum().unstack(fill_value=0)
-    cost_summary = df_cost.groupby(['Segment', 'Quarter'])[amount_col].sum().unstack(fill_value=0)
-    rev_summary = df_rev.groupby(['Segment', 'Quarter'])[amount_col].sum().unstack(fill_value=0)
+from utils.schema_registry import apply_schema, resolve_column
+from utils.calendar_dim import period_at, resolve_relative_period
+from utils.param_extractor import extract_params
+from kpi_engine.pnl_hierarchy import pnl_hierarchy, CB_DESCRIPTIONS
+
+def cb_comparison(tree, filters=None):
+    """
+    C&B, cost and revenue by segment for the latest and previous quarter
+    (USD mn) as plain data, or None when there are no dated rows.
+    """
+    filters = filters or {}
+    latest_month = tree.latest_month(filters)
+    if latest_month is None:
+        return None
+    latest_q = period_at(resolve_relative_period("this quarter", latest_month).start_key, 'CalendarQuarterPeriod')
+    prev_q = period_at(resolve_relative_period("previous quarter", latest_month).start_key, 'CalendarQuarterPeriod')
+
+    def by_segment_quarter(node=None, type_=None):
+        selected = dict(filters, Type=type_) if type_ else filters
+        return tree.amounts('Segment', 'quarter', node=node, filters=selected).unstack(fill_value=0)
+
+    # ✅ C&B from Group Description; cost and revenue by Type
+    cb_summary = by_segment_quarter(node={'Group Description': CB_DESCRIPTIONS})
+    cost_summary = by_segment_quarter(type_='cost')
+    rev_summary = by_segment_quarter(type_='revenue')
 
     for q in [prev_q, latest_q]:
         for summary in [cb_summary, cost_summary, rev_summary]:
@@ -74,14 +51,6 @@ def run(df, user_question=None):
 
     increased_segments = cb_summary[cb_summary[latest_q] > cb_summary[prev_q]].index.tolist()
 
-    # Header insights
-    st.markdown("### 📊 C&B Cost Insights")
-    st.markdown(f"- 💰 **Overall C&B change** from {prev_q} to {latest_q}: **{cb_change:+.1f}%**")
-    st.markdown(f"- ✅ **Overall Revenue change** from {prev_q} to {latest_q}: **{rev_change:+.1f}%**")
-    if increased_segments:
-        st.markdown(f"- 📈 **Segments with increased C&B**: {', '.join(increased_segments)}")
-
-    # Prepare display table
     merged = pd.DataFrame(index=cb_summary.index)
     merged['C&B Q1'] = cb_summary[prev_q]
     merged['C&B Q2'] = cb_summary[latest_q]
@@ -99,6 +68,51 @@ def run(df, user_question=None):
     total_row.name = 'Total'
     merged = pd.concat([merged, total_row.to_frame().T])
 
+    return {
+        "prev_quarter": prev_q,
+        "latest_quarter": latest_q,
+        "cb_change": cb_change,
+        "rev_change": rev_change,
+        "increased_segments": increased_segments,
+        "table": merged,
+    }
+
+def run(df, user_question=None):
+    import streamlit as st
+
+    # Standardized names and Month dtype come from the schema registry
+    df = apply_schema(df, "pnl")
+    amount_col = resolve_column(df, "pnl", "Amount")
+    if not amount_col:
+        st.error("❌ Column not found: Amount in USD")
+        return
+
+    # Amounts by segment/quarter/node come from the cached P&L hierarchy roll-up
+    tree = pnl_hierarchy(df)
+
+    # Extract segment from user prompt if any
+    filters = {}
+    selected_segment = extract_params(user_question, {'Segment': tree.values('Segment')}).first('Segment')
+    if selected_segment is not None:
+        filters['Segment'] = [selected_segment]
+        st.markdown(f"📌 **Filtered Segment**: `{selected_segment}`")
+
+    comparison = cb_comparison(tree, filters)
+    if comparison is None:
+        st.warning("No dated P&L rows available.")
+        return
+    prev_q, latest_q = comparison["prev_quarter"], comparison["latest_quarter"]
+    cb_change, rev_change = comparison["cb_change"], comparison["rev_change"]
+    increased_segments = comparison["increased_segments"]
+    merged = comparison["table"]
+
+    # Header insights
+    st.markdown("### 📊 C&B Cost Insights")
+    st.markdown(f"- 💰 **Overall C&B change** from {prev_q} to {latest_q}: **{cb_change:+.1f}%**")
+    st.markdown(f"- ✅ **Overall Revenue change** from {prev_q} to {latest_q}: **{rev_change:+.1f}%**")
+    if increased_segments:
+        st.markdown(f"- 📈 **Segments with increased C&B**: {', '.join(increased_segments)}")
+
     # Format
     def fmt(x): return f"{x:,.1f}"
     def fmt_pct(x): return f"{x:.2f}%" if pd.notnull(x) else "—"
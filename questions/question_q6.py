@@ -5,11 +5,17 @@ import os
 import json
 from io import BytesIO
 from dotenv import load_dotenv
+from utils.columnar import load_precomputed_table
+from utils.dataset_version import current_version, VersionedCache
+from kpi_engine.realized_rate_matrix import RealizedRateDropMatrix
+from utils.calendar_dim import FISCAL_QUARTER_BY_LABEL, MONTH_LABELS
+from utils.table_server import serve_table
 
 
 load_dotenv('.env.template')
-@st.cache_data
-def load_data():
+@st.cache_data(max_entries=2)
+def load_data(dataset_version=None):
+    # dataset_version only keys the cache: a new version reloads, the old entry is evicted
     try:
         # Initialize GCS client
         service_account_json = os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON")
@@ -21,81 +27,38 @@ def load_data():
         client = storage.Client.from_service_account_info(json.loads(service_account_json))
         bucket = client.bucket(bucket_name)
 
-        # File paths within GCS
-        revenue_file = "revenue.csv"
-        hours_file = "netavailablehours.csv"
-
-        # Load revenue data
-        with BytesIO() as buffer:
-            blob = bucket.blob(revenue_file)
-            if not blob.exists():
-                raise FileNotFoundError(f"File not found in GCS: {revenue_file}")
-            blob.download_to_file(buffer)
-            buffer.seek(0)
-            df_revenue = pd.read_csv(buffer)
-
-        # Load hours data
-        with BytesIO() as buffer:
-            blob = bucket.blob(hours_file)
-            if not blob.exists():
-                raise FileNotFoundError(f"File not found in GCS: {hours_file}")
-            blob.download_to_file(buffer)
-            buffer.seek(0)
-            df_hours = pd.read_csv(buffer)
-            
-        
+        # Typed Parquet tables (categorical dimensions, float measures)
+        df_revenue = load_precomputed_table(bucket, "revenue")
+        df_hours = load_precomputed_table(bucket, "netavailablehours")
 
     except Exception as e:
         raise RuntimeError(f"Failed to load data: {e}")
 
-    # Convert numbers to float
-    df_revenue['Revenue'] = df_revenue['Revenue'].replace('[\$,]', '', regex=True).astype(float)
-    df_hours['NetAvailableHours'] = df_hours['NetAvailableHours'].replace('[\$,]', '', regex=True).astype(float)
+    # Add fiscal Quarter column (Apr–Jun = Q1) from the calendar dimension
+    df_revenue['Quarter'] = df_revenue['Month'].map(FISCAL_QUARTER_BY_LABEL)
+    df_hours['Quarter'] = df_hours['Month'].map(FISCAL_QUARTER_BY_LABEL)
 
-    df_revenue['Month'] = df_revenue['Month'].astype(str).str.strip()
-    df_hours['Month'] = df_hours['Month'].astype(str).str.strip()
+    return df_revenue, df_hours
 
-    # Add Quarter column
-    month_to_qtr = {'Jan': 'Q4', 'Feb': 'Q4', 'Mar': 'Q4',
-                    'Apr': 'Q1', 'May': 'Q1', 'Jun': 'Q1',
-                    'Jul': 'Q2', 'Aug': 'Q2', 'Sep': 'Q2',
-                    'Oct': 'Q3', 'Nov': 'Q3', 'Dec': 'Q3'}
-    df_revenue['Quarter'] = df_revenue['Month'].map(month_to_qtr)
-    df_hours['Quarter'] = df_hours['Month'].map(month_to_qtr)
+# Monthly merge and QoQ drop matrix, built once per dataset version
+_matrix_cache = VersionedCache()
 
-    return df_revenue, df_hours
+def get_drop_matrix(df_revenue, df_hours):
+    return _matrix_cache.get_or_compute(
+        "realized_rate_drops", lambda: RealizedRateDropMatrix.build(df_revenue, df_hours))
 
 def pivot_summary(df, value_field, index_field='FinalCustomerName'):
-    df_grouped = df.groupby([index_field, 'Month'])[value_field].sum().reset_index()
+    df_grouped = df.groupby([index_field, 'Month'], observed=True)[value_field].sum().reset_index()
     df_pivot = df_grouped.pivot(index=index_field, columns='Month', values=value_field).fillna(0)
-    month_order = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
-    df_pivot = df_pivot[[m for m in month_order if m in df_pivot.columns]]
+    df_pivot = df_pivot[[m for m in MONTH_LABELS if m in df_pivot.columns]]
     if value_field != 'Realized Rate':
         df_pivot = df_pivot.astype(int)
     else:
         df_pivot = df_pivot.round(2)
     return df_pivot
 
-def apply_filters(df_revenue, df_hours, min_rate, max_rate, segment, bu, du, quarter):
-    # 🔄 Group hours at a more granular level
-    group_keys = ['FinalCustomerName', 'Segment', 'BU', 'DU', 'Month']
-    df_hours_grouped = df_hours.groupby(group_keys)['NetAvailableHours'].sum().reset_index()
-
-    # 🔄 Merge revenue and hours on same keys
-    merged = pd.merge(
-        df_revenue,
-        df_hours_grouped,
-        on=group_keys,
-        how='inner'
-    )
-
-    # 🔧 Realized Rate Calculation
-    merged['Revenue'] = merged['Revenue'].fillna(0)
-    merged['NetAvailableHours'] = merged['NetAvailableHours'].fillna(0)
-    merged['Realized Rate'] = merged.apply(
-        lambda row: round(row['Revenue'] / row['NetAvailableHours'], 2) if row['NetAvailableHours'] > 0 else 0,
-        axis=1
-    )
+def apply_filters(merged, min_rate, max_rate, segment, bu, du, quarter):
+    # Revenue/hours are merged and rated once per version (see get_drop_matrix)
 
     # ✅ Apply filters
     if segment != "All":
@@ -112,54 +75,89 @@ def apply_filters(df_revenue, df_hours, min_rate, max_rate, segment, bu, du, qua
 
     return merged
 
-def run(df=None, user_question=None):
-    st.title("Realized Rate by Account")
-
-    df_revenue, df_hours = load_data()
-
-    # Sidebar Filters
-    st.sidebar.header("🔍 Filters")
-    min_rate = st.sidebar.number_input("Minimum Realized Rate", min_value=0.0, max_value=1000.0, value=0.0, step=0.1)
-    max_rate = st.sidebar.number_input("Maximum Realized Rate", min_value=0.0, max_value=1000.0, value=1000.0, step=0.1)
-
-    segment_list = ['All'] + sorted(df_revenue['Segment'].dropna().unique())
-    segment = st.sidebar.selectbox("Segment", segment_list)
-
-    bu_list = ['All'] + sorted(df_revenue['BU'].dropna().unique())
-    bu = st.sidebar.selectbox("BU", bu_list)
+# Filtered results per filter tuple; a view is usually re-visited with a few combinations
+_view_cache = VersionedCache(max_entries=64)
 
-    du_list = ['All'] + sorted(df_revenue['DU'].dropna().unique())
-    du = st.sidebar.selectbox("DU", du_list)
+def account_view(matrix, min_rate, max_rate, segment, bu, du, quarter):
+    """Account match summary and monthly pivots of the filtered slice, as plain data."""
+    full_df = matrix.monthly
+    filtered_df = apply_filters(full_df, min_rate, max_rate, segment, bu, du, quarter)
 
-    quarter_list = ['All'] + ['Q1', 'Q2', 'Q3', 'Q4']
-    quarter = st.sidebar.selectbox("Quarter", quarter_list)
-
-    # Apply filters
-    filtered_df = apply_filters(df_revenue, df_hours, min_rate, max_rate, segment, bu, du, quarter)
-
-    # ✅ Show account-level match % summary
-    full_group_keys = ['FinalCustomerName', 'Segment', 'BU', 'DU', 'Month']
-    df_hours_grouped = df_hours.groupby(full_group_keys)['NetAvailableHours'].sum().reset_index()
-    full_df = pd.merge(df_revenue, df_hours_grouped, on=full_group_keys, how='inner')
-    full_df['Revenue'] = full_df['Revenue'].fillna(0)
-    full_df['NetAvailableHours'] = full_df['NetAvailableHours'].fillna(0)
-    full_df['Realized Rate'] = full_df.apply(
-        lambda row: round(row['Revenue'] / row['NetAvailableHours'], 2) if row['NetAvailableHours'] > 0 else 0,
-        axis=1
-    )
     total_accounts = full_df['FinalCustomerName'].nunique()
     filtered_accounts = filtered_df['FinalCustomerName'].nunique()
-    pct = round((filtered_accounts / total_accounts) * 100, 1) if total_accounts else 0
-    st.markdown(f"✅ **{filtered_accounts} of {total_accounts} accounts** met the selected Realized Rate threshold (**{pct}%**)")
+    return {
+        "total_accounts": total_accounts,
+        "filtered_accounts": filtered_accounts,
+        "pct": round((filtered_accounts / total_accounts) * 100, 1) if total_accounts else 0,
+        "rate": pivot_summary(filtered_df, 'Realized Rate'),
+        "revenue": pivot_summary(filtered_df, 'Revenue'),
+        "hours": pivot_summary(filtered_df, 'NetAvailableHours'),
+    }
+
+def render_account_view(view):
+    # ✅ Show account-level match % summary
+    st.markdown(f"✅ **{view['filtered_accounts']} of {view['total_accounts']} accounts** met the selected "
+                f"Realized Rate threshold (**{view['pct']}%**)")
 
     # Output tables
     st.subheader("Realized Rate by FinalCustomerName")
-    st.dataframe(pivot_summary(filtered_df, 'Realized Rate'))
+    serve_table(view["rate"], "q6_rate")
 
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("### 💰 Total Revenue by Month")
-        st.dataframe(pivot_summary(filtered_df, 'Revenue'))
+        serve_table(view["revenue"], "q6_revenue")
     with col2:
         st.markdown("### ⏱️ Total Net Available Hours by Month")
-        st.dataframe(pivot_summary(filtered_df, 'NetAvailableHours'))
+        serve_table(view["hours"], "q6_hours")
+
+def filter_options(df_revenue):
+    return {col: ['All'] + sorted(df_revenue[col].dropna().unique()) for col in ['Segment', 'BU', 'DU']}
+
+def run(df=None, user_question=None):
+    st.title("Realized Rate by Account")
+
+    df_revenue, df_hours = load_data(current_version())
+    matrix = get_drop_matrix(df_revenue, df_hours)
+    options = _matrix_cache.get_or_compute("filter_options", lambda: filter_options(df_revenue))
+
+    # Filters and results are one fragment: a filter change reruns this view
+    # only (no re-routing, reloading or re-merging). Fragments can't place
+    # widgets in the sidebar, so the filters sit above the tables.
+    @st.fragment
+    def filtered_view():
+        with st.expander("🔍 Filters", expanded=True):
+            col1, col2, col3 = st.columns(3)
+            min_rate = col1.number_input("Minimum Realized Rate", min_value=0.0, max_value=1000.0, value=0.0,
+                                         step=0.1, key="q6_min_rate")
+            max_rate = col2.number_input("Maximum Realized Rate", min_value=0.0, max_value=1000.0, value=1000.0,
+                                         step=0.1, key="q6_max_rate")
+            drop_threshold = col3.number_input("QoQ Realized Rate Drop Above", min_value=0.0, max_value=1000.0,
+                                               value=3.0, step=0.5, key="q6_drop_threshold")
+
+            col1, col2, col3, col4 = st.columns(4)
+            segment = col1.selectbox("Segment", options['Segment'], key="q6_segment")
+            bu = col2.selectbox("BU", options['BU'], key="q6_bu")
+            du = col3.selectbox("DU", options['DU'], key="q6_du")
+            quarter = col4.selectbox("Quarter", ['All'] + ['Q1', 'Q2', 'Q3', 'Q4'], key="q6_quarter")
+
+        # Apply filters: each filter combination is computed once per dataset version
+        filters = (min_rate, max_rate, segment, bu, du, quarter)
+        render_account_view(_view_cache.get_or_compute(("accounts",) + filters,
+                                                       lambda: account_view(matrix, *filters)))
+
+        # 📉 Quarter-over-quarter drops, answered from the precomputed matrix
+        drops = _view_cache.get_or_compute(
+            ("drops", drop_threshold, segment, bu, du, min_rate, max_rate),
+            lambda: matrix.query(drop_threshold, segment=segment, bu=bu, du=du, min_rate=min_rate, max_rate=max_rate))
+        st.subheader(f"📉 Accounts with QoQ Realized Rate Drop > {drop_threshold:g}")
+        if drops.empty:
+            st.info("No accounts exceed the selected drop threshold.")
+        else:
+            st.dataframe(
+                drops[['FinalCustomerName', 'Segment', 'BU', 'DU', 'Quarter', 'PrevRealizedRate', 'RealizedRate', 'RateDrop']]
+                .round({'PrevRealizedRate': 2, 'RealizedRate': 2, 'RateDrop': 2}),
+                use_container_width=True
+            )
+
+    filtered_view()
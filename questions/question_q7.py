@@ -9,11 +9,21 @@ import os
 import json
 from io import BytesIO
 from dotenv import load_dotenv
+from utils.dataset_version import current_version
+from utils.calendar_dim import period_of
+from utils.parallel_agg import parallel_aggregate
+from utils.question_runner import checkpoint
+from utils.progressive import ProgressiveView
+from utils.lazy_tabs import lazy_tabs
+from utils.table_server import serve_table
+from utils.visuals import cached_spec
+from utils.result_cache import cached_stages
 
 load_dotenv('.env.template')
 
-@st.cache_data
-def load_data():
+@st.cache_data(max_entries=2)
+def load_data(dataset_version=None):
+    # dataset_version only keys the cache: a new version reloads, the old entry is evicted
     try:
         service_account_json = os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON")
         bucket_name = os.getenv("GCS_BUCKET_NAME")
@@ -41,118 +51,176 @@ def load_data():
         st.error(f"Failed to load data from GCS: {e}")
         return pd.DataFrame()
 
+def headcount_breakdown(df):
+    """Billable/non-billable and onsite/offshore share of distinct people (cheap, whole frame)."""
+    total_count = df['PSNo'].nunique()
+    if total_count == 0:
+        return None
+    return {
+        "billable": df[df['Status'] == 'Billable']['PSNo'].nunique() / total_count * 100,
+        "nonbillable": df[df['Status'] == 'Non Billable']['PSNo'].nunique() / total_count * 100,
+        "onsite": df[df['Onsite/Offshore'] == 'Onsite']['PSNo'].nunique() / total_count * 100,
+        "offshore": df[df['Onsite/Offshore'] == 'Offshore']['PSNo'].nunique() / total_count * 100,
+    }
+
+def headcount_stages(df, groupby_col, shared=None):
+    """
+    (slot, payload) stages of one tab, cheapest first: the headcount
+    breakdown, the FTE change headline, the MoM FTE table and trend, then
+    the composition charts. `shared` memoizes the frame-level stages
+    (breakdown, composition) across tabs.
+    """
+    shared = {} if shared is None else shared
+    if "breakdown" not in shared:
+        shared["breakdown"] = headcount_breakdown(df)
+    yield "breakdown", shared["breakdown"]
+
+    monthly_headcount = parallel_aggregate(df, [groupby_col, 'Month'], {'FTE': ('PSNo', 'nunique')},
+                                           month_col='Month')
+    monthly_headcount['FTE'] = monthly_headcount['FTE'].round(1)
+
+    fte_pivot = monthly_headcount.pivot(index='Month', columns=groupby_col, values='FTE').fillna(0)
+    top_groups = fte_pivot.mean().sort_values(ascending=False).head(6).index
+    chart_data = fte_pivot[top_groups]
+
+    yield "summary", chart_data.sum(axis=1)
+    yield "fte", (groupby_col, monthly_headcount, chart_data)
+
+    if "composition" not in shared:
+        # Billable vs Non-Billable, Onsite vs Offshore
+        shared["composition"] = (
+            parallel_aggregate(df, ['Month', 'Status'], {'Headcount': ('PSNo', 'nunique')}, month_col='Month'),
+            parallel_aggregate(df, ['Month', 'Onsite/Offshore'], {'Headcount': ('PSNo', 'nunique')},
+                               month_col='Month'),
+        )
+    yield "composition", shared["composition"]
+
+def render_summary(overall_fte):
+    # Overall headcount change summary
+    if overall_fte.empty:
+        return
+    first_month = overall_fte.index[0]
+    last_month = overall_fte.index[-1]
+    fte_change = overall_fte.iloc[-1] - overall_fte.iloc[0]
+    pct_change = (fte_change / overall_fte.iloc[0]) * 100 if overall_fte.iloc[0] else 0
+    st.markdown(f"🔍 **Overall FTE (Headcount)** grew from **{overall_fte.iloc[0]:.1f}** "
+                f"in **{first_month}** to **{overall_fte.iloc[-1]:.1f}** in **{last_month}**, "
+                f"a change of **{fte_change:.1f} FTEs ({pct_change:.1f}%)**.")
+
+def render_breakdown(breakdown):
+    # Headcount breakdown
+    if breakdown is None:
+        return
+    st.markdown(f"🔍 **Headcount Breakdown**: **{breakdown['billable']:.1f}% Billable**, "
+                f"**{breakdown['nonbillable']:.1f}% Non-Billable**, "
+                f"**{breakdown['onsite']:.1f}% Onsite**, "
+                f"**{breakdown['offshore']:.1f}% Offshore**.")
+
+def render_fte(payload):
+    groupby_col, monthly_headcount, chart_data = payload
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        st.markdown(f"### 📋 MoM FTE per {groupby_col}")
+        # One row per group x month: paged server-side rather than sent whole
+        serve_table(monthly_headcount.rename(columns={groupby_col: groupby_col, "FTE": "FTE (Headcount)"}),
+                    f"q7_{groupby_col}_fte", use_container_width=True)
+
+    with col2:
+        st.markdown(f"### 📈 MoM FTE Trend (Top 6 by {groupby_col})")
+        # Spec is cached per (data, grouping): reruns and tab switches skip melt + Altair validation
+        st.vega_lite_chart(cached_spec("q7_trend", chart_data, lambda data: trend_chart(data, groupby_col), groupby_col),
+                           use_container_width=True)
+
+def trend_chart(chart_data, groupby_col):
+    chart_data_reset = chart_data.reset_index().melt(
+        id_vars="Month", var_name=groupby_col, value_name="FTE"
+    )
+
+    return (
+        alt.Chart(chart_data_reset)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("Month:T", title="Month"),
+            y=alt.Y("FTE:Q", title="FTE (Headcount)"),
+            color=alt.Color(f"{groupby_col}:N", legend=alt.Legend(title=groupby_col)),
+            tooltip=["Month", groupby_col, "FTE"]
+        )
+        .properties(width=500, height=450, title="Monthly FTE (Trend)")
+    )
+
+def composition_chart(payload):
+    stacked_data, stacked_data2 = payload
+
+    billable_chart = (
+        alt.Chart(stacked_data)
+        .mark_bar()
+        .encode(
+            x=alt.X("Month:T", title="Month"),
+            y=alt.Y("Headcount:Q", title="Headcount"),
+            color=alt.Color("Status:N", legend=alt.Legend(title="Status")),
+            tooltip=["Month", "Status", "Headcount"]
+        )
+        .properties(width=300, height=450, title="Monthly Billable vs Non-Billable")
+    )
+
+    onsite_chart = (
+        alt.Chart(stacked_data2)
+        .mark_bar()
+        .encode(
+            x=alt.X("Month:T", title="Month"),
+            y=alt.Y("Headcount:Q", title="Headcount"),
+            color=alt.Color("Onsite/Offshore:N", legend=alt.Legend(title="Location")),
+            tooltip=["Month", "Onsite/Offshore", "Headcount"]
+        )
+        .properties(width=300, height=450, title="Monthly Onsite vs Offshore")
+    )
+
+    return alt.hconcat(
+    billable_chart,
+    onsite_chart
+    ).resolve_scale(
+    y='independent'  # so their y-scales don’t clash
+    ).configure_concat(
+    spacing=400  # <-- add gap between the charts
+    )
+
+def render_composition(payload):
+    st.markdown("### 📊 Headcount Composition by Month")
+    st.vega_lite_chart(cached_spec("q7_composition", payload, composition_chart), use_container_width=True)
+
+# Display order of a tab; stages fill these as they complete
+SLOTS = ["summary", "breakdown", "fte", "composition"]
+RENDERERS = {"summary": render_summary, "breakdown": render_breakdown,
+             "fte": render_fte, "composition": render_composition}
+
+# Tabs of the view: label -> group column
+TABS = {"Client-wise View": "FinalCustomerName", "Segment-wise View": "Segment"}
+
+def prepare_headcount_rows(df):
+    df['Date_a'] = pd.to_datetime(df['Date_a'], errors='coerce')
+    df = df.dropna(subset=['Date_a', 'FinalCustomerName', 'PSNo'])
+    df['Month'] = period_of(df['Date_a'], 'MonthPeriod').astype(str)
+    return df
+
 def run(df, user_question):
-    df = load_data()
+    df = load_data(current_version())
     if df.empty:
         return
+    checkpoint()
 
-    df['Date_a'] = pd.to_datetime(df['Date_a'], errors='coerce')
-    df = df.dropna(subset=['Date_a', 'FinalCustomerName', 'PSNo'])
-    df['Month'] = df['Date_a'].dt.to_period('M').astype(str)
-
-    tab1, tab2 = st.tabs(["Client-wise View", "Segment-wise View"])
-
-    for tab, groupby_col in zip([tab1, tab2], ['FinalCustomerName', 'Segment']):
-        with tab:
-            monthly_headcount = df.groupby([groupby_col, 'Month'])['PSNo'].nunique().reset_index()
-            monthly_headcount = monthly_headcount.rename(columns={'PSNo': 'FTE'})
-            monthly_headcount['FTE'] = monthly_headcount['FTE'].round(1)
-
-            fte_pivot = monthly_headcount.pivot(index='Month', columns=groupby_col, values='FTE').fillna(0)
-            top_groups = fte_pivot.mean().sort_values(ascending=False).head(6).index
-            chart_data = fte_pivot[top_groups]
-
-            # Overall headcount change summary
-            overall_fte = chart_data.sum(axis=1)
-            if not overall_fte.empty:
-                first_month = overall_fte.index[0]
-                last_month = overall_fte.index[-1]
-                fte_change = overall_fte.iloc[-1] - overall_fte.iloc[0]
-                pct_change = (fte_change / overall_fte.iloc[0]) * 100 if overall_fte.iloc[0] else 0
-                st.markdown(f"🔍 **Overall FTE (Headcount)** grew from **{overall_fte.iloc[0]:.1f}** "
-                            f"in **{first_month}** to **{overall_fte.iloc[-1]:.1f}** in **{last_month}**, "
-                            f"a change of **{fte_change:.1f} FTEs ({pct_change:.1f}%)**.")
-            
-            # Headcount breakdown
-            total_count = df['PSNo'].nunique()
-            if total_count > 0:
-                billable_pct = df[df['Status'] == 'Billable']['PSNo'].nunique() / total_count * 100
-                nonbillable_pct = df[df['Status'] == 'Non Billable']['PSNo'].nunique() / total_count * 100
-                onsite_pct = df[df['Onsite/Offshore'] == 'Onsite']['PSNo'].nunique() / total_count * 100
-                offshore_pct = df[df['Onsite/Offshore'] == 'Offshore']['PSNo'].nunique() / total_count * 100
-                st.markdown(f"🔍 **Headcount Breakdown**: **{billable_pct:.1f}% Billable**, "
-                            f"**{nonbillable_pct:.1f}% Non-Billable**, "
-                            f"**{onsite_pct:.1f}% Onsite**, "
-                            f"**{offshore_pct:.1f}% Offshore**.")
-
-            col1, col2 = st.columns([1, 1])
-            with col1:
-                st.markdown(f"### 📋 MoM FTE per {groupby_col}")
-                st.dataframe(
-                    monthly_headcount.rename(columns={groupby_col: groupby_col, "FTE": "FTE (Headcount)"}),
-                    use_container_width=True
-                )
-
-            with col2:
-                st.markdown(f"### 📈 MoM FTE Trend (Top 6 by {groupby_col})")
-
-                chart_data_reset = chart_data.reset_index().melt(
-                    id_vars="Month", var_name=groupby_col, value_name="FTE"
-                )
-
-                trend_chart = (
-                    alt.Chart(chart_data_reset)
-                    .mark_line(point=True)
-                    .encode(
-                        x=alt.X("Month:T", title="Month"),
-                        y=alt.Y("FTE:Q", title="FTE (Headcount)"),
-                        color=alt.Color(f"{groupby_col}:N", legend=alt.Legend(title=groupby_col)),
-                        tooltip=["Month", groupby_col, "FTE"]
-                    )
-                    .properties(width=500, height=450, title="Monthly FTE (Trend)")
-                )
-
-                st.altair_chart(trend_chart, use_container_width=True)
-
-            st.markdown("### 📊 Headcount Composition by Month")
-
-            # Billable vs Non-Billable
-            stacked_data = df.groupby(['Month', 'Status'])['PSNo'].nunique().reset_index(name="Headcount")
-
-            billable_chart = (
-                alt.Chart(stacked_data)
-                .mark_bar()
-                .encode(
-                    x=alt.X("Month:T", title="Month"),
-                    y=alt.Y("Headcount:Q", title="Headcount"),
-                    color=alt.Color("Status:N", legend=alt.Legend(title="Status")),
-                    tooltip=["Month", "Status", "Headcount"]
-                )
-                .properties(width=300, height=450, title="Monthly Billable vs Non-Billable")
-            )
-
-            # Onsite vs Offshore
-            stacked_data2 = df.groupby(['Month', 'Onsite/Offshore'])['PSNo'].nunique().reset_index(name="Headcount")
-
-            onsite_chart = (
-                alt.Chart(stacked_data2)
-                .mark_bar()
-                .encode(
-                    x=alt.X("Month:T", title="Month"),
-                    y=alt.Y("Headcount:Q", title="Headcount"),
-                    color=alt.Color("Onsite/Offshore:N", legend=alt.Legend(title="Location")),
-                    tooltip=["Month", "Onsite/Offshore", "Headcount"]
-                )
-                .properties(width=300, height=450, title="Monthly Onsite vs Offshore")
-            )
-
-            combined_chart = alt.hconcat(
-            billable_chart,
-            onsite_chart
-            ).resolve_scale(
-            y='independent'  # so their y-scales don’t clash
-            ).configure_concat(
-            spacing=400  # <-- add gap between the charts
-            )
-
-            st.altair_chart(combined_chart, use_container_width=True)
\ No newline at end of file
+    prepared, shared = {}, {}
+
+    def rows():
+        if "df" not in prepared:
+            prepared["df"] = prepare_headcount_rows(df)
+        return prepared["df"]
+
+    def show(label):
+        # Stages of the open tab stream into its placeholders; a tab seen
+        # before (for this dataset version) is replayed from the result cache
+        groupby_col = TABS[label]
+        stages = cached_stages("q7", {"tab": groupby_col},
+                               lambda: headcount_stages(rows(), groupby_col, shared))
+        ProgressiveView(SLOTS, RENDERERS).run(stages)
+
+    lazy_tabs(list(TABS), "q7_tab", show)
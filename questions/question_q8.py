@@ -5,14 +5,40 @@ import os
 import json
 from io import BytesIO
 from dotenv import load_dotenv
+from utils.dataset_version import VersionedCache, current_version
+from kpi_engine.ut_engine import UtilizationEngine
+from utils.lazy_tabs import lazy_tabs
 
 
 load_dotenv('.env.template')
+
+_engine_cache = VersionedCache()
+
+# Filtered tables per (level, filter tuple)
+_tables_cache = VersionedCache(max_entries=64)
+
+# Tabs of the view: label -> level
+TABS = {"🏢 BU Level": "BU", "🏭 DU Level": "DU", "📊 Segment Level": "Segment"}
+
+def ut_tables(engine, level_name, filters=None):
+    """UT%, billable and available hours by level and month with a Total row, as plain data."""
+    # Ratio of summed hours per level and month; Total row is hour-weighted
+    ut_df = engine.pivot(level_name, 'month_of_year', filters).copy()
+    ut_df.loc['Total'] = engine.totals('month_of_year', filters).round(2)
+
+    b_df = engine.pivot(level_name, 'month_of_year', filters, value='TotalBillableHours').copy()
+    b_df.loc['Total'] = b_df.sum(numeric_only=True)
+
+    a_df = engine.pivot(level_name, 'month_of_year', filters, value='NetAvailableHours').copy()
+    a_df.loc['Total'] = a_df.sum(numeric_only=True)
+    return {"ut": ut_df, "billable": b_df, "available": a_df}
+
 def run(prompt=None):
     st.title("Utilization % Trends")
 
-    @st.cache_data
-    def load_data():
+    @st.cache_data(max_entries=2)
+    def load_data(dataset_version=None):
+        # dataset_version only keys the cache: a new version reloads, the old entry is evicted
         service_account_json = os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON")
         bucket_name = os.getenv("GCS_BUCKET_NAME")
 
@@ -32,78 +58,47 @@ def run(prompt=None):
             blob.download_to_file(buffer)
             buffer.seek(0)
             df = pd.read_excel(buffer)
-        df['Date_a'] = pd.to_datetime(df['Date_a'], errors='coerce')
-        df['Month_Year'] = df['Date_a'].dt.strftime('%b')
-        df['Quarter'] = df['Date_a'].dt.to_period("Q").astype(str)
-        df['Year'] = df['Date_a'].dt.year
-        df['NetAvailableHours'] = pd.to_numeric(df['NetAvailableHours'], errors='coerce')
-        df['TotalBillableHours'] = pd.to_numeric(df['TotalBillableHours'], errors='coerce')
         return df
 
-    df = load_data()
-
-    # Fix month order
-    month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    df['Month_Year'] = pd.Categorical(df['Month_Year'], categories=month_order, ordered=True)
-
-    # Sidebar filters
-    st.sidebar.header("Filters")
-    segments = st.sidebar.multiselect("Segment:", df['Segment'].dropna().unique())
-    bus = st.sidebar.multiselect("BU:", df['BusinessUnit'].dropna().unique())
-    dus = st.sidebar.multiselect("DU:", df['Delivery_Unit'].dropna().unique())
-    quarters = st.sidebar.multiselect("Quarter:", df['Quarter'].dropna().unique())
-
-    df_filtered = df.copy()
-    if segments:
-        df_filtered = df_filtered[df_filtered['Segment'].isin(segments)]
-    if bus:
-        df_filtered = df_filtered[df_filtered['BusinessUnit'].isin(bus)]
-    if dus:
-        df_filtered = df_filtered[df_filtered['Delivery_Unit'].isin(dus)]
-    if quarters:
-        df_filtered = df_filtered[df_filtered['Quarter'].isin(quarters)]
-
-    def show_tables(df, group_cols, level_name):
-        st.subheader(f"Utilization % by {level_name}")
-
-        # Group by and calculate correct UT%
-        agg = df.groupby(group_cols + ['Month_Year'])[['TotalBillableHours', 'NetAvailableHours']].sum().reset_index()
-        agg['UT%'] = (agg['TotalBillableHours'] / agg['NetAvailableHours']) * 100
-        ut_df = agg.pivot_table(index=group_cols, columns='Month_Year', values='UT%').fillna(0)
-
-        # Weighted average for Total row
-        billable_totals = df.groupby(['Month_Year'])['TotalBillableHours'].sum()
-        available_totals = df.groupby(['Month_Year'])['NetAvailableHours'].sum()
-        total_ut = (billable_totals / available_totals * 100).round(2)
-        ut_df.loc['Total'] = total_ut
-
-        st.dataframe(ut_df.style.format("{:.2f}"))
-
-        # Side-by-side raw data tables
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.markdown("🔷 **TotalBillableHours**")
-            b_pivot = df.groupby(group_cols + ['Month_Year'])['TotalBillableHours'].sum().reset_index()
-            b_df = b_pivot.pivot_table(index=group_cols, columns='Month_Year', values='TotalBillableHours').fillna(0)
-            b_df.loc['Total'] = b_df.sum(numeric_only=True)
-            st.dataframe(b_df.style.format("{:,.0f}"))
-
-        with col2:
-            st.markdown("🔷 **NetAvailableHours**")
-            a_pivot = df.groupby(group_cols + ['Month_Year'])['NetAvailableHours'].sum().reset_index()
-            a_df = a_pivot.pivot_table(index=group_cols, columns='Month_Year', values='NetAvailableHours').fillna(0)
-            a_df.loc['Total'] = a_df.sum(numeric_only=True)
-            st.dataframe(a_df.style.format("{:,.0f}"))
-
-    # Tabs: BU, DU, Segment
-    tabs = st.tabs(["🏢 BU Level", "🏭 DU Level", "📊 Segment Level"])
-
-    with tabs[0]:
-        show_tables(df_filtered, ['BusinessUnit'], "BU")
-
-    with tabs[1]:
-        show_tables(df_filtered, ['Delivery_Unit'], "DU")
-
-    with tabs[2]:
-        show_tables(df_filtered, ['Segment'], "Segment")
+    # Additive hours cube per dataset version: filters and tabs only re-slice it
+    engine = _engine_cache.get_or_compute(
+        "ut_engine", lambda: UtilizationEngine(load_data(current_version())))
+
+    # Filters and tables are one fragment: a filter change reruns this view
+    # only (no re-routing or reloading). Fragments can't place widgets in
+    # the sidebar, so the filters sit above the tables.
+    @st.fragment
+    def filtered_view():
+        with st.expander("🔍 Filters", expanded=True):
+            col1, col2, col3, col4 = st.columns(4)
+            segments = col1.multiselect("Segment:", engine.values('Segment'), key="q8_segments")
+            bus = col2.multiselect("BU:", engine.values('BU'), key="q8_bus")
+            dus = col3.multiselect("DU:", engine.values('DU'), key="q8_dus")
+            quarters = col4.multiselect("Quarter:", engine.values('CalendarQuarter'), key="q8_quarters")
+        filters = {'Segment': segments, 'BU': bus, 'DU': dus, 'CalendarQuarter': quarters}
+        filter_key = tuple((column, tuple(sorted(values))) for column, values in filters.items())
+
+        def show_tables(label):
+            level_name = TABS[label]
+            st.subheader(f"Utilization % by {level_name}")
+            # Computed once per (level, filters) and dataset version
+            tables = _tables_cache.get_or_compute((level_name, filter_key),
+                                                  lambda: ut_tables(engine, level_name, filters))
+
+            st.dataframe(tables["ut"].style.format("{:.2f}"))
+
+            # Side-by-side raw data tables
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.markdown("🔷 **TotalBillableHours**")
+                st.dataframe(tables["billable"].style.format("{:,.0f}"))
+
+            with col2:
+                st.markdown("🔷 **NetAvailableHours**")
+                st.dataframe(tables["available"].style.format("{:,.0f}"))
+
+        # Tabs: BU, DU, Segment (only the open one is computed)
+        lazy_tabs(list(TABS), "q8_tab", show_tables)
+
+    filtered_view()
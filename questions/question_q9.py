@@ -5,11 +5,18 @@ import os
 import json
 from io import BytesIO
 from dotenv import load_dotenv
+from utils.columnar import load_precomputed_table
+from utils.dataset_version import current_version
+from utils.calendar_dim import MONTH_LABELS
+from utils.result_cache import cached_result
+from utils.lazy_tabs import lazy_tabs
+from utils.table_server import serve_table
 
 load_dotenv('.env.template')
 
-@st.cache_data
-def load_data():
+@st.cache_data(max_entries=2)
+def load_data(dataset_version=None):
+    # dataset_version only keys the cache: a new version reloads, the old entry is evicted
     service_account_json = os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON")
     bucket_name = os.getenv("GCS_BUCKET_NAME")
     if not service_account_json or not bucket_name:
@@ -17,90 +24,61 @@ def load_data():
     client = storage.Client.from_service_account_info(json.loads(service_account_json))
     bucket = client.bucket(bucket_name)
 
-        # File paths within GCS
-    revenue_file = "revenue.csv"
-    headcount_file = "headcount.csv"
-    with BytesIO() as buffer:
-            blob = bucket.blob(revenue_file)
-            if not blob.exists():
-                raise FileNotFoundError(f"File not found in GCS: {revenue_file}")
-            blob.download_to_file(buffer)
-            buffer.seek(0)
-            df_revenue = pd.read_csv(buffer)
-    with BytesIO() as buffer:
-            blob = bucket.blob(headcount_file)
-            if not blob.exists():
-                raise FileNotFoundError(f"File not found in GCS: {headcount_file}")
-            blob.download_to_file(buffer)
-            buffer.seek(0)
-            df_headcount = pd.read_csv(buffer)
-
-
-    df_revenue['Revenue'] = df_revenue['Revenue'].replace('[\$,]', '', regex=True).astype(float)
-    df_headcount['Headcount'] = df_headcount['Headcount'].replace('[\$,]', '', regex=True).astype(float)
-    df_revenue['Month'] = df_revenue['Month'].astype(str).str.strip()
-    df_headcount['Month'] = df_headcount['Month'].astype(str).str.strip()
+    # Typed Parquet tables (categorical dimensions, float measures)
+    df_revenue = load_precomputed_table(bucket, "revenue")
+    df_headcount = load_precomputed_table(bucket, "headcount")
     return df_revenue, df_headcount
 
 def pivot_summary(df, value_field, index_field='FinalCustomerName'):
     df_pivot = df.pivot(index=index_field, columns='Month', values=value_field).fillna(0)
-    df_pivot = df_pivot[[m for m in ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec'] if m in df_pivot.columns]]
+    df_pivot = df_pivot[[m for m in MONTH_LABELS if m in df_pivot.columns]]
     if value_field != 'Revenue per Person':
         df_pivot = df_pivot.astype(int)
     else:
         df_pivot = df_pivot.round(2)
     return df_pivot
 
-def generate_tab_view(df_revenue, df_headcount, groupby_field, label):
-    st.subheader(f"Revenue per Person by {label}")
-    rev = df_revenue.groupby([groupby_field, 'Month'], as_index=False)['Revenue'].sum()
-    hc = df_headcount.groupby([groupby_field, 'Month'], as_index=False)['Headcount'].sum()
+def revenue_per_person_tables(df_revenue, df_headcount, groupby_field):
+    """Revenue per person, revenue and headcount pivots (group x month) of one tab."""
+    rev = df_revenue.groupby([groupby_field, 'Month'], as_index=False, observed=True)['Revenue'].sum()
+    hc = df_headcount.groupby([groupby_field, 'Month'], as_index=False, observed=True)['Headcount'].sum()
     df = pd.merge(rev, hc, on=[groupby_field, 'Month'], how='outer')
     df['Revenue'] = df['Revenue'].fillna(0)
     df['Headcount'] = df['Headcount'].fillna(0)
     df['Revenue per Person'] = df.apply(lambda row: round(row['Revenue'] / row['Headcount'], 2) if row['Headcount'] > 0 else 0, axis=1)
+    return {
+        "per_person": pivot_summary(df, 'Revenue per Person', groupby_field),
+        "revenue": pivot_summary(df, 'Revenue', groupby_field),
+        "headcount": pivot_summary(df, 'Headcount', groupby_field),
+    }
 
-    st.dataframe(pivot_summary(df, 'Revenue per Person', groupby_field))
+def render_tab_view(tables, label):
+    st.subheader(f"Revenue per Person by {label}")
+    serve_table(tables["per_person"], f"q9_{label}_per_person")
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("### 💰 Total Revenue by Month")
-        st.dataframe(pivot_summary(df, 'Revenue', groupby_field))
+        serve_table(tables["revenue"], f"q9_{label}_revenue")
     with col2:
         st.markdown("### 👥 Total Headcount by Month")
-        st.dataframe(pivot_summary(df, 'Headcount', groupby_field))
+        serve_table(tables["headcount"], f"q9_{label}_headcount")
+
+def generate_tab_view(df_revenue, df_headcount, groupby_field, label):
+    render_tab_view(revenue_per_person_tables(df_revenue, df_headcount, groupby_field), label)
+
+# Tabs of the view: label -> group field
+TABS = {"Summary": "FinalCustomerName", "Segment": "Segment", "BU": "BU", "DU": "DU"}
 
 def run(df=None, user_question=None):
     st.title("Revenue per Person by Account")
-    df_revenue, df_headcount = load_data()
+    df_revenue, df_headcount = load_data(current_version())
 
-    with st.container():
-        tabs = st.tabs(["Summary", "Segment", "BU", "DU"])
-        with tabs[0]:
-            st.subheader("Revenue per Person by FinalCustomerName")
-            merged = pd.merge(
-                df_revenue.groupby(['FinalCustomerName', 'Month'], as_index=False)['Revenue'].sum(),
-                df_headcount.groupby(['FinalCustomerName', 'Month'], as_index=False)['Headcount'].sum(),
-                on=['FinalCustomerName', 'Month'],
-                how='outer'
-            )
-            merged['Revenue'] = merged['Revenue'].fillna(0)
-            merged['Headcount'] = merged['Headcount'].fillna(0)
-            merged['Revenue per Person'] = merged.apply(
-                lambda row: round(row['Revenue'] / row['Headcount'], 2) if row['Headcount'] > 0 else 0,
-                axis=1
-            )
-            st.dataframe(pivot_summary(merged, 'Revenue per Person', 'FinalCustomerName'))
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown("### 💰 Total Revenue by Month")
-                st.dataframe(pivot_summary(merged, 'Revenue', 'FinalCustomerName'))
-            with col2:
-                st.markdown("### 👥 Total Headcount by Month")
-                st.dataframe(pivot_summary(merged, 'Headcount', 'FinalCustomerName'))
+    def show(label):
+        # Only the open tab is computed, once per dataset version
+        groupby_field = TABS[label]
+        tables = cached_result("q9", {"tab": groupby_field},
+                               lambda: revenue_per_person_tables(df_revenue, df_headcount, groupby_field))
+        render_tab_view(tables, groupby_field)
 
-        with tabs[1]:
-            generate_tab_view(df_revenue, df_headcount, 'Segment', 'Segment')
-        with tabs[2]:
-            generate_tab_view(df_revenue, df_headcount, 'BU', 'BU')
-        with tabs[3]:
-            generate_tab_view(df_revenue, df_headcount, 'DU', 'DU')
+    with st.container():
+        lazy_tabs(list(TABS), "q9_tab", show)
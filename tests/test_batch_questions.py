@@ -0,0 +1,96 @@
+# tests/test_batch_questions.py
+
+import unittest
+import numpy as np
+import pandas as pd
+from utils.batch_questions import run_batch
+from questions.question_q1 import margin_table, prepare_margin_rows
+from questions.question_q3 import cb_comparison
+from kpi_engine.pnl_hierarchy import PnlHierarchy
+from kpi_engine.margin_root_cause import MarginRootCause
+
+SEGMENTS = ['Transportation', 'Med Tech']
+
+def _keyword_matcher(calls):
+    def matcher(questions):
+        calls.append(list(questions))
+        routes = [("why", "Q2"), ("c&b", "Q3"), ("utilization", "Q8")]
+        return [next(((qid, qid, 0.9) for word, qid in routes if word in q.lower()), (None, "none", 0.1))
+                for q in questions]
+    return matcher
+
+class TestBatchQuestions(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rows = []
+        months = pd.to_datetime(['2025-01-01', '2025-02-01', '2025-04-01', '2025-05-01', '2025-06-01'])
+        for segment, growth in [('Transportation', 1.3), ('Med Tech', 0.9)]:
+            for i, month in enumerate(months):
+                for client, revenue in [('C1', 100.0), ('C2', 50.0)]:
+                    rows.append([client, segment, month, 'ONSITE', None, 'Revenue', None, revenue])
+                    rows.append([client, segment, month, 'COST - ONSITE', 'Salaries', 'Cost',
+                                 'Onsite Salaries & Allowances', 40.0 * growth ** i])
+                    rows.append([client, segment, month, 'COST - ONSITE', 'Rent', 'Cost', 'Rent', 5.0])
+        cls.pnl = pd.DataFrame(rows, columns=[
+            'FinalCustomerName', 'Segment', 'Month', 'Group1', 'Group4', 'Type', 'Group Description', 'Amount in USD'])
+        cls.pnl['Company Code'] = cls.pnl['FinalCustomerName']
+
+        rng = np.random.default_rng(5)
+        n = 2000
+        cls.ut = pd.DataFrame({
+            'Date_a': pd.to_datetime(rng.choice(['2025-04-01', '2025-05-01', '2025-06-01'], n)),
+            'Segment': rng.choice(SEGMENTS, n),
+            'BusinessUnit': rng.choice(['BU1', 'BU2'], n),
+            'Delivery_Unit': rng.choice(['DU1', 'DU2'], n),
+            'FinalCustomerName': rng.choice(['A1', 'A2'], n),
+            'TotalBillableHours': rng.uniform(0, 180, n),
+            'NetAvailableHours': rng.uniform(100, 180, n),
+        })
+
+    def test_every_segment_and_question_with_shared_loads(self):
+        questions = []
+        for segment in SEGMENTS:
+            questions += [f"Clients with margin below 40% in {segment}", f"Why did margin drop in {segment}?",
+                          f"How did C&B vary QoQ in {segment}?", f"Utilization by DU for {segment}"]
+        loads, calls = [], []
+
+        def load_pnl():
+            loads.append("pnl")
+            return self.pnl
+
+        answers = run_batch(questions, {'pnl': load_pnl, 'ut': self.ut}, matcher=_keyword_matcher(calls))
+
+        self.assertEqual(loads, ["pnl"])
+        self.assertEqual(len(calls), 1)  # one batched matcher call for the non-rule questions
+        self.assertEqual([a.qid for a in answers], ["Q1", "Q2", "Q3", "Q8"] * 2)
+        self.assertTrue(all(a.error is None for a in answers), [a.error for a in answers])
+
+        q1, q2, q3, q8 = answers[4:]
+        expected = margin_table(prepare_margin_rows(self.pnl), "Client", 40.0, None)
+        pd.testing.assert_frame_equal(q1.result["Client"]["top_10"], expected["top_10"])
+        self.assertEqual(q1.result["Client"]["low_margin_count"], expected["low_margin_count"])
+
+        self.assertEqual(q2.result["segment"], "Med Tech")
+        direct = MarginRootCause(self.pnl).lookup("Med Tech")
+        self.assertEqual(q2.result["root_cause"].segment_margin, direct.segment_margin)
+
+        direct = cb_comparison(PnlHierarchy(self.pnl), {'Segment': ['Med Tech']})
+        pd.testing.assert_frame_equal(q3.result["table"], direct["table"])
+
+        self.assertEqual(q8.result["level"], "DU")
+        june = self.ut[(self.ut['Segment'] == 'Med Tech') & (self.ut['Date_a'].dt.month == 6)]
+        self.assertAlmostEqual(q8.result["billable"].loc['Total', 'Jun'], june['TotalBillableHours'].sum())
+        self.assertAlmostEqual(q8.result["ut"].loc['Total', 'Jun'],
+                               round(june['TotalBillableHours'].sum() / june['NetAvailableHours'].sum() * 100, 2))
+
+    def test_failures_are_reported_per_question(self):
+        answers = run_batch(["Clients with margin below 30%", "Utilization by BU", "What is the weather?"],
+                            {'pnl': self.pnl}, matcher=_keyword_matcher([]))
+        self.assertIsNone(answers[0].error)
+        self.assertIn("'ut' unavailable", answers[1].error)
+        self.assertIsNone(answers[2].qid)
+        self.assertIsNotNone(answers[2].error)
+
+if __name__ == '__main__':
+    unittest.main()
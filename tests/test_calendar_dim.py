@@ -0,0 +1,51 @@
+# tests/test_calendar_dim.py
+
+import unittest
+import pandas as pd
+from utils.calendar_dim import (
+    attach_periods, period_of, month_key, resolve_relative_period, month_range_mask, FISCAL_QUARTER_BY_LABEL
+)
+
+class TestCalendarDim(unittest.TestCase):
+
+    def setUp(self):
+        self.dates = pd.Series(pd.to_datetime(
+            ['2025-01-15', '2025-03-31', '2025-04-01', '2025-06-30', None, '2024-12-01']
+        ))
+
+    def test_matches_datetime_accessors(self):
+        valid = self.dates.dropna()
+        periods = attach_periods(valid, ['CalendarQuarter', 'CalendarQuarterPeriod', 'MonthLabel', 'Year'])
+        self.assertEqual(periods['CalendarQuarter'].tolist(), valid.dt.to_period('Q').astype(str).tolist())
+        self.assertTrue((periods['CalendarQuarterPeriod'] == valid.dt.to_period('Q')).all())
+        self.assertEqual(periods['MonthLabel'].tolist(), valid.dt.strftime('%b').tolist())
+        self.assertEqual(periods['Year'].tolist(), valid.dt.year.tolist())
+
+    def test_fiscal_quarters_and_missing_dates(self):
+        fiscal = period_of(self.dates, 'FiscalQuarterLabel')
+        self.assertEqual(fiscal.iloc[0], 'FY25Q4')
+        self.assertEqual(fiscal.iloc[2], 'FY26Q1')
+        self.assertTrue(pd.isna(fiscal.iloc[4]))
+        self.assertEqual(FISCAL_QUARTER_BY_LABEL['Apr'], 'Q1')
+        self.assertEqual(FISCAL_QUARTER_BY_LABEL['Mar'], 'Q4')
+
+    def test_relative_periods(self):
+        anchor = pd.Timestamp('2025-06-01')
+        previous_quarter = resolve_relative_period("revenue vs previous quarter", anchor)
+        self.assertEqual((previous_quarter.start_key, previous_quarter.end_key),
+                         (month_key(2025, 1), month_key(2025, 3)))
+
+        last_months = resolve_relative_period("margin in the last 3 months", anchor)
+        self.assertEqual((last_months.start_key, last_months.end_key), (month_key(2025, 4), month_key(2025, 6)))
+        self.assertEqual(month_range_mask(self.dates, last_months).tolist(),
+                         [False, False, True, True, False, False])
+
+        previous_month = resolve_relative_period("previous month", anchor)
+        self.assertEqual(previous_month.start_key, month_key(2025, 5))
+
+        fiscal_quarter = resolve_relative_period("this quarter", pd.Timestamp('2025-05-01'), fiscal=True)
+        self.assertEqual(fiscal_quarter.start_key, month_key(2025, 4))
+        self.assertIsNone(resolve_relative_period("top accounts", anchor))
+
+if __name__ == '__main__':
+    unittest.main()
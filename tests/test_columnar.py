@@ -0,0 +1,45 @@
+# tests/test_columnar.py
+
+import unittest
+import os
+import tempfile
+import pandas as pd
+from utils import columnar
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "sample_data")
+
+class TestColumnar(unittest.TestCase):
+
+    def test_typed_frame_cleans_legacy_csv(self):
+        df = pd.DataFrame({
+            '\ufeffFinalCustomerName': [' A1 ', 'A2'],
+            'Segment': ['Plant Engineering', None],
+            'BU': ['BU1', 'BU2'],
+            'DU': ['DU1', 'DU2'],
+            'Month': ['Jan ', 'Feb'],
+            'Revenue': ['$1,200.50', '300'],
+        })
+        typed = columnar.to_typed_frame(df, "revenue")
+        self.assertIn('FinalCustomerName', typed.columns)
+        self.assertEqual(str(typed['Month'].dtype), 'category')
+        self.assertEqual(typed['FinalCustomerName'].iloc[0], 'A1')
+        self.assertTrue(pd.isna(typed['Segment'].iloc[1]))
+        self.assertAlmostEqual(typed['Revenue'].iloc[0], 1200.5)
+        self.assertEqual(typed['Revenue'].dtype, float)
+
+    def test_parquet_round_trip(self):
+        for name in columnar.PRECOMPUTED_TABLES:
+            df = pd.read_csv(os.path.join(SAMPLE_DIR, f"{name}.csv"), encoding="utf-8-sig")
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, columnar.parquet_object_name(name))
+                columnar.write_parquet(df, path, table_name=name)
+                result = columnar.read_parquet(path)
+
+            measure = columnar.PRECOMPUTED_TABLES[name]["measures"][0]
+            self.assertEqual(len(result), len(df))
+            self.assertEqual(str(result['Segment'].dtype), 'category')
+            self.assertEqual(result[measure].dtype, float)
+            self.assertAlmostEqual(result[measure].sum(), df[measure].sum(), places=4)
+
+if __name__ == '__main__':
+    unittest.main()
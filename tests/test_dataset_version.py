@@ -0,0 +1,108 @@
+# tests/test_dataset_version.py
+
+import unittest
+import os
+import tempfile
+import utils.dataset_version as dataset_version
+from utils.columnar import PRECOMPUTED_TABLES, parquet_object_name
+from utils.dataset_version import DatasetVersionService, LocalFileBackend, VersionedCache, current_version, \
+    WATCHED_OBJECTS
+
+class TestDatasetVersion(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "LnTPnL.xlsx")
+        with open(self.path, "w") as f:
+            f.write("v1")
+        self.service = DatasetVersionService(
+            LocalFileBackend(self.tmp.name), objects=["LnTPnL.xlsx"], poll_interval=0
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _touch(self, content):
+        with open(self.path, "w") as f:
+            f.write(content)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    def test_unchanged_source_keeps_version(self):
+        version = self.service.version
+        self.assertFalse(self.service.refresh())
+        self.assertEqual(self.service.version, version)
+
+    def test_builders_run_before_swap(self):
+        old_version = self.service.version
+        seen = []
+        self.service.register_builder("pnl", lambda token: seen.append((token, self.service.version)))
+
+        self._touch("v2 with more rows")
+        self.assertTrue(self.service.refresh())
+
+        new_version = self.service.version
+        self.assertNotEqual(new_version, old_version)
+        # Builder saw the new token while readers were still on the old one
+        self.assertEqual(seen, [(new_version, old_version)])
+
+    def test_versioned_cache_drops_stale_entries(self):
+        cache = VersionedCache(lambda: self.service.version)
+        calls = []
+        compute = lambda: calls.append(1) or len(calls)
+
+        self.assertEqual(cache.get_or_compute("index", compute), 1)
+        self.assertEqual(cache.get_or_compute("index", compute), 1)
+
+        self._touch("v3 changed")
+        self.service.refresh()
+        self.assertEqual(cache.get_or_compute("index", compute), 2)
+        self.assertEqual(len(cache), 1)
+
+    def test_versioned_cache_evicts_least_recently_used(self):
+        cache = VersionedCache(lambda: "v1", max_entries=2)
+        cache.get_or_compute("a", lambda: 1)
+        cache.get_or_compute("b", lambda: 2)
+        cache.get_or_compute("a", lambda: None)  # hit: "a" is now the most recent
+        cache.get_or_compute("c", lambda: 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get_or_compute("a", lambda: None), 1)
+        self.assertEqual(cache.get_or_compute("b", lambda: "recomputed"), "recomputed")
+
+    def test_every_precomputed_table_is_watched(self):
+        # A republished table must change the version, or its loaders keep serving the old one
+        for table_name in PRECOMPUTED_TABLES:
+            self.assertIn(parquet_object_name(table_name), WATCHED_OBJECTS)
+
+class _UnreachableBackend:
+    calls = 0
+
+    def fingerprint(self, name):
+        _UnreachableBackend.calls += 1
+        raise ConnectionError("bucket unreachable")
+
+class TestDatasetServiceStartup(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = (dataset_version.default_backend, dataset_version._service,
+                      dataset_version._service_error, dataset_version.SERVICE_RETRY_SECONDS)
+        dataset_version.default_backend = _UnreachableBackend
+        dataset_version._service = dataset_version._service_error = None
+        _UnreachableBackend.calls = 0
+
+    def tearDown(self):
+        (dataset_version.default_backend, dataset_version._service,
+         dataset_version._service_error, dataset_version.SERVICE_RETRY_SECONDS) = self.saved
+
+    def test_failed_startup_is_not_retried_on_every_call(self):
+        for _ in range(5):
+            self.assertEqual(current_version(), "unversioned")
+        self.assertEqual(_UnreachableBackend.calls, 1)
+
+        dataset_version.SERVICE_RETRY_SECONDS = 0  # backoff elapsed
+        self.assertEqual(current_version(), "unversioned")
+        self.assertEqual(_UnreachableBackend.calls, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# tests/test_encoder_service.py
+
+import time
+import threading
+import unittest
+import numpy as np
+from utils.encoder_service import EncoderService
+
+class _RecordingEncoder:
+    """Embeds a text as [len(text), id]; records the batch sizes it was called with."""
+
+    def __init__(self, delay=0.01, fail_on=None):
+        self.batches = []
+        self.delay = delay
+        self.fail_on = fail_on
+
+    def encode(self, texts):
+        self.batches.append(len(texts))
+        if self.fail_on in texts:
+            raise ValueError("bad input")
+        time.sleep(self.delay)  # one forward pass
+        return np.array([[len(t), int(t.split()[-1])] for t in texts], dtype=np.float32)
+
+def _concurrently(callers, fn):
+    results = [None] * callers
+    barrier = threading.Barrier(callers)
+
+    def call(i):
+        barrier.wait()
+        try:
+            results[i] = fn(i)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+class TestEncoderService(unittest.TestCase):
+
+    def test_concurrent_requests_share_forward_passes(self):
+        encoder = _RecordingEncoder()
+        service = EncoderService(encoder, max_batch=64, max_wait_ms=20)
+        try:
+            results = _concurrently(32, lambda i: service.encode([f"question {i}"]))
+            for i, rows in enumerate(results):
+                np.testing.assert_array_equal(rows, [[len(f"question {i}"), i]])
+            self.assertEqual(sum(encoder.batches), 32)
+            self.assertLess(len(encoder.batches), 8)
+
+            many = service.encode([f"q {i}" for i in range(5)])
+            self.assertEqual(many[:, 1].tolist(), [0, 1, 2, 3, 4])
+        finally:
+            service.close()
+
+    def test_batch_size_bound_and_errors_reach_every_caller_of_the_batch(self):
+        encoder = _RecordingEncoder(fail_on="question 3")
+        service = EncoderService(encoder, max_batch=4, max_wait_ms=50)
+        try:
+            results = _concurrently(8, lambda i: service.encode([f"question {i}"]))
+            self.assertLessEqual(max(encoder.batches), 4)
+            failed = [i for i, r in enumerate(results) if isinstance(r, ValueError)]
+            self.assertIn(3, failed)
+            self.assertLess(len(failed), 8)  # other batches still succeed
+            self.assertEqual(service.encode(["question 9"])[0, 1], 9)  # worker survives
+        finally:
+            service.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+# tests/test_encoders.py
+
+import unittest
+import warnings
+import numpy as np
+import utils.encoders as encoders
+from utils.encoders import cos_sim, get_encoder, EncoderUnavailable
+
+class _FakeEncoder:
+    name = "torch"
+
+class TestEncoders(unittest.TestCase):
+
+    def setUp(self):
+        self.build = encoders._build
+        encoders._encoders.clear()
+
+    def tearDown(self):
+        encoders._build = self.build
+        encoders._encoders.clear()
+
+    def test_cos_sim_matches_the_definition(self):
+        rng = np.random.default_rng(0)
+        a, b = rng.normal(size=(3, 8)), rng.normal(size=(5, 8))
+        expected = [[x @ y / np.linalg.norm(x) / np.linalg.norm(y) for y in b] for x in a]
+        np.testing.assert_allclose(cos_sim(a, b), expected, rtol=1e-5)
+
+    def test_missing_onnx_model_falls_back_to_torch(self):
+        built = []
+
+        def build(backend):
+            built.append(backend)
+            if backend != "torch":
+                raise EncoderUnavailable("model_int8.onnx not found")
+            return _FakeEncoder()
+
+        encoders._build = build
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            encoder = get_encoder("onnx-int8")
+        self.assertIsInstance(encoder, _FakeEncoder)
+        self.assertIn("falling back", str(caught[0].message))
+        self.assertIs(get_encoder("torch"), encoder)
+        self.assertIs(get_encoder("onnx-int8"), encoder)
+        self.assertEqual(built, ["onnx-int8", "torch"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+# tests/test_fresher_cohort.py
+
+import unittest
+import numpy as np
+import pandas as pd
+from kpi_engine.fresher_cohort import build_fresher_cohort, cohort_view
+
+class TestFresherCohort(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(7)
+        n = 3000
+        cls.df = pd.DataFrame({
+            'Date_a': pd.to_datetime(rng.choice(['2025-05-01', '2025-06-01', '2025-04-01'], n)),
+            # Fiscal month number, not the calendar month
+            'Month': 1,
+            'FresherAgeingCategory': rng.choice(['Freshers ET(0-3 Months)', 'Non Freshers', None], n),
+            'Segment': rng.choice(['Transportation', 'Med Tech'], n),
+            'Delivery_Unit': rng.choice(['DU1', 'DU2'], n),
+            'TotalBillableHours': rng.uniform(0, 180, n),
+            'NetAvailableHours': rng.choice([0, 160, 176], n),
+        })
+        cls.cohort = build_fresher_cohort(cls.df)
+
+    def test_ut_is_ratio_of_summed_hours(self):
+        rows = self.df[self.df['FresherAgeingCategory'].notna() & (self.df['NetAvailableHours'] > 0)]
+        sums = rows.groupby(['FresherAgeingCategory', 'Date_a'])[['TotalBillableHours', 'NetAvailableHours']].sum()
+        expected = (sums['TotalBillableHours'] / sums['NetAvailableHours'] * 100).unstack()
+
+        view = cohort_view(self.cohort)
+        self.assertEqual(list(view['ut'].columns), ['Apr-2025', 'May-2025', 'Jun-2025'])
+        np.testing.assert_allclose(view['ut'].to_numpy(), expected.to_numpy())
+        self.assertEqual(view['latest_month'], 'Jun-2025')
+        self.assertEqual(list(view['latest'].index), list(expected['2025-06-01'].sort_values(ascending=False).index))
+
+    def test_level_breakdown_and_filters(self):
+        view = cohort_view(self.cohort, level='DU', filters={'Segment': 'Med Tech'})
+        rows = self.df[(self.df['Segment'] == 'Med Tech') & self.df['FresherAgeingCategory'].notna()
+                       & (self.df['NetAvailableHours'] > 0)]
+        self.assertEqual(view['billable'].index.names, ['FresherAgeingCategory', 'DU'])
+        self.assertAlmostEqual(view['available'].sum().sum(), rows['NetAvailableHours'].sum())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# tests/test_groupby_kernels.py
+
+import pickle
+import unittest
+import numpy as np
+import pandas as pd
+import utils.groupby_kernels as groupby_kernels
+from utils.groupby_kernels import grouped_sum, grouped_mean, grouped_nunique, pivot_sum, group_keys, frame_fingerprint, \
+    cached_fingerprint
+
+class TestGroupbyKernels(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(1)
+        n = 5000
+        cls.df = pd.DataFrame({
+            'Segment': rng.choice(['Transportation', 'Med Tech', 'Plant Engineering', None], n),
+            'DU': pd.Categorical(rng.choice(['DU2', 'DU1'], n), categories=['DU2', 'DU1', 'DU0']),
+            'Month': pd.to_datetime(rng.choice(['2025-04-01', '2025-05-01', '2025-06-01'], n)),
+            'Type': rng.choice(['Revenue', 'Cost'], n),
+            'Amount': rng.normal(100, 30, n),
+            'PSNo': rng.integers(0, 300, n),
+        })
+        cls.df.loc[::11, 'Amount'] = np.nan
+
+    def assertMatches(self, result, expected):
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False)
+
+    def test_matches_pandas_groupby(self):
+        for keys in [['Segment'], ['Segment', 'Month'], ['DU', 'Segment']]:
+            grouped = self.df.groupby(keys, observed=True)
+            self.assertMatches(grouped_sum(self.df, keys, 'Amount'), grouped['Amount'].sum().reset_index())
+            self.assertMatches(grouped_mean(self.df, keys, 'Amount'), grouped['Amount'].mean().reset_index())
+            self.assertMatches(grouped_nunique(self.df, keys, 'PSNo'), grouped['PSNo'].nunique().reset_index())
+
+    def test_pivot_matches_unstack(self):
+        keys = ['Month', 'Segment']
+        expected = self.df.groupby(keys + ['Type'])['Amount'].sum().unstack().fillna(0)
+        self.assertMatches(pivot_sum(self.df, keys, 'Type', 'Amount'), expected)
+
+    def test_cached_keys_distinguish_filtered_frames(self):
+        first = group_keys(self.df, ['Segment'], cache_key="test")
+        self.assertIs(group_keys(self.df, ['Segment'], cache_key="test"), first)
+        subset = self.df[self.df['Month'] == '2025-04-01']
+        self.assertIsNot(group_keys(subset, ['Segment'], cache_key="test"), first)
+        self.assertIsNot(group_keys(self.df.copy(), ['Segment'], cache_key="test"), first)
+
+    def test_cached_lookup_does_not_hash_rows(self):
+        def fail(df):
+            raise AssertionError("rows hashed on a cached lookup")
+
+        original = groupby_kernels.frame_fingerprint
+        groupby_kernels.frame_fingerprint = fail
+        try:
+            first = group_keys(self.df, ['DU'], cache_key="no_hash")
+            self.assertIs(group_keys(self.df, ['DU'], cache_key="no_hash"), first)
+        finally:
+            groupby_kernels.frame_fingerprint = original
+
+    def test_fingerprint_covers_every_row(self):
+        df = pd.DataFrame({"a": np.arange(100_000), "b": np.ones(100_000)})
+        changed = df.copy()
+        changed.loc[5, "b"] = 2.0  # not a sampled row under the old scheme
+        self.assertEqual(frame_fingerprint(df), frame_fingerprint(df.copy()))
+        self.assertNotEqual(frame_fingerprint(df), frame_fingerprint(changed))
+        self.assertNotEqual(frame_fingerprint(df), frame_fingerprint(df.iloc[::-1]))
+        self.assertNotEqual(frame_fingerprint(df), frame_fingerprint(df.astype({"b": "float32"})))
+
+    def test_cached_fingerprint_hashes_a_frame_once(self):
+        calls = []
+        original = groupby_kernels.frame_fingerprint
+
+        def counting(df):
+            calls.append(len(df))
+            return original(df)
+
+        df = self.df.copy()
+        groupby_kernels.frame_fingerprint = counting
+        try:
+            fingerprint = cached_fingerprint(df)
+            self.assertEqual(cached_fingerprint(df), fingerprint)
+            self.assertEqual(cached_fingerprint(pickle.loads(pickle.dumps(df))), fingerprint)
+            self.assertEqual(len(calls), 1)
+
+            # Derived frames inherit attrs but are hashed on their own
+            for derived in [df.sort_values('Amount'), df[df['Segment'] == 'Med Tech'],
+                            df.assign(Amount=df['Amount'] * 2)]:
+                self.assertEqual(cached_fingerprint(derived), original(derived))
+            self.assertEqual(len(calls), 4)
+        finally:
+            groupby_kernels.frame_fingerprint = original
+        self.assertEqual(fingerprint, frame_fingerprint(self.df))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# tests/test_intent_classifier.py
+
+import os
+import tempfile
+import unittest
+import utils.intent_classifier as intent_classifier
+from utils.intent_classifier import IntentClassifier, train_classifier, augment
+from utils.intent_prompts import PROMPT_BANK
+
+class TestIntentClassifier(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.classifier = train_classifier()
+
+    def test_augment_swaps_synonyms(self):
+        variants = augment("Show utilization by account")
+        self.assertIn("show utilization by account", variants)
+        self.assertIn("show ut% by account", variants)
+        self.assertIn("list utilization by account", variants)
+        self.assertIn("can you show show utilization by client", variants)
+
+    def test_routes_bank_paraphrases_and_abstains_off_topic(self):
+        matches = self.classifier.matches(["Show utilisation by client",
+                                           "monthly FTE per customer",
+                                           "what is the weather today in Chennai"])
+        qids = [qid for qid, _, _ in matches]
+        self.assertEqual(qids, ["Q8", "Q7", None])
+        qid, prompt, score = matches[0]
+        self.assertIn(prompt, PROMPT_BANK["Q8"])
+        self.assertGreaterEqual(score, 0.72)
+
+    def test_artifact_round_trip_and_stale_artifact_is_retrained(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.classifier.save(os.path.join(tmp, "router.joblib"))
+            loaded = IntentClassifier.load(path)
+            question = ["Which cost item triggered the margin decline?"]
+            self.assertEqual(loaded.matches(question), self.classifier.matches(question))
+
+            stale = train_classifier(prompts=PROMPT_BANK["Q6"] + PROMPT_BANK["Q9"], qids=["Q6"] * 4 + ["Q9"] * 2)
+            stale.save(path)
+            saved = (intent_classifier.INTENT_CLASSIFIER_PATH, intent_classifier._classifier)
+            intent_classifier.INTENT_CLASSIFIER_PATH, intent_classifier._classifier = path, None
+            try:
+                served = intent_classifier.get_intent_classifier()
+            finally:
+                intent_classifier.INTENT_CLASSIFIER_PATH, intent_classifier._classifier = saved
+            self.assertEqual(served.fingerprint, self.classifier.fingerprint)
+            self.assertEqual(IntentClassifier.load(path).fingerprint, self.classifier.fingerprint)
+
+    def test_unreadable_artifact_is_retrained(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "router.joblib")
+            with open(path, "wb") as f:
+                f.write(b"not a joblib file")
+            saved = (intent_classifier.INTENT_CLASSIFIER_PATH, intent_classifier._classifier)
+            intent_classifier.INTENT_CLASSIFIER_PATH, intent_classifier._classifier = path, None
+            try:
+                served = intent_classifier.get_intent_classifier()
+            finally:
+                intent_classifier.INTENT_CLASSIFIER_PATH, intent_classifier._classifier = saved
+            self.assertEqual(served.fingerprint, self.classifier.fingerprint)
+            self.assertEqual(IntentClassifier.load(path).fingerprint, self.classifier.fingerprint)
+
+    def test_one_word_intent_swap_is_not_routed_confidently(self):
+        qid, _, score = self.classifier.matches(["Which accounts had revenue below 30 last quarter"])[0]
+        self.assertIsNone(qid)
+        self.assertLess(score, 0.72)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# tests/test_lazy_tabs.py
+
+import os
+import sys
+import unittest
+import tempfile
+from streamlit.testing.v1 import AppTest
+import utils.result_cache as result_cache
+from utils.result_cache import ResultCache, cached_stages
+
+def _three_tabs():
+    import streamlit as st
+    from utils.lazy_tabs import lazy_tabs
+
+    def show(label):
+        st.session_state.setdefault("computed", []).append(label)
+        st.markdown(f"content of {label}")
+
+    lazy_tabs(["A", "B", "C"], "tab", show)
+
+class TestLazyTabs(unittest.TestCase):
+
+    def setUp(self):
+        # AppTest installs the script as __main__; spawn-based tests need the real one back
+        self.main = sys.modules["__main__"]
+
+    def tearDown(self):
+        sys.modules["__main__"] = self.main
+
+    def test_only_the_open_tab_is_computed(self):
+        app = AppTest.from_function(_three_tabs).run(timeout=30)
+        self.assertFalse(app.exception)
+        self.assertEqual(app.session_state["computed"], ["A"])
+        self.assertEqual([m.value for m in app.markdown], ["content of A"])
+
+        app.session_state["tab"] = "C"
+        app.run(timeout=30)
+        self.assertEqual(app.session_state["computed"], ["A", "C"])
+        self.assertEqual([m.value for m in app.markdown], ["content of C"])
+
+class TestCachedStages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.previous = result_cache._cache
+        result_cache._cache = ResultCache(os.path.join(self.tmp.name, "results.sqlite"))
+
+    def tearDown(self):
+        result_cache._cache = self.previous
+        self.tmp.cleanup()
+
+    def test_stages_stream_once_then_replay(self):
+        calls = []
+
+        def make_stages():
+            calls.append(1)
+            yield "headline", 1
+            yield "table", [1, 2]
+
+        first = cached_stages("qx", {"tab": "A"}, make_stages, version="v1")
+        self.assertEqual(next(first), ("headline", 1))
+        self.assertEqual(len(calls), 1)  # streaming: computed lazily
+        self.assertEqual(list(first), [("table", [1, 2])])
+
+        replay = list(cached_stages("qx", {"tab": "A"}, make_stages, version="v1"))
+        self.assertEqual(replay, [("headline", 1), ("table", [1, 2])])
+        self.assertEqual(len(calls), 1)
+
+    def test_abandoned_stages_are_not_stored(self):
+        stages = cached_stages("qx", {"tab": "B"}, lambda: iter([("headline", 1), ("table", 2)]), version="v1")
+        next(stages)
+        stages.close()  # e.g. the run was cancelled between stages
+        self.assertIsNone(result_cache._cache.get("qx", {"tab": "B"}, version="v1"))
+
+if __name__ == '__main__':
+    unittest.main()
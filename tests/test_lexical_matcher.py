@@ -0,0 +1,48 @@
+# tests/test_lexical_matcher.py
+
+import unittest
+import utils.semantic_matcher as semantic_matcher
+from utils.intent_prompts import SUGGESTED_PROMPTS
+from utils.lexical_matcher import LexicalMatcher
+
+class TestLexicalMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = LexicalMatcher(threshold=0.85)
+
+    def test_suggested_prompts_and_keywords_take_the_fast_path(self):
+        for prompt, qid in SUGGESTED_PROMPTS.items():
+            matched_qid, matched_prompt, score = self.matcher.match(prompt)
+            self.assertEqual((matched_qid, matched_prompt.lower(), score), (qid, prompt.lower(), 1.0))
+        self.assertEqual(self.matcher.match("Show utilization by acount")[0], "Q8")
+        self.assertEqual(self.matcher.match("Realized rate drop for BFSI")[0], "Q6")
+        self.assertEqual(self.matcher.match("How are freshers utilized?")[0], "Q10")
+
+    def test_ambiguous_questions_are_deferred(self):
+        for question in ["Why did margin drop in Transportation last month?",
+                         "Which accounts had revenue below 30 last quarter",  # Q1 prompt, one word swapped
+                         "fresher realized rate",  # keywords of two intents
+                         "What is the weather in Chennai?"]:
+            self.assertIsNone(self.matcher.match(question), question)
+        stats = self.matcher.stats()
+        self.assertEqual((stats["fast"], stats["deferred"], stats["share"]), (0, 4, 0.0))
+
+    def test_router_sends_only_deferred_questions_to_the_embeddings(self):
+        embedded = []
+
+        def embedding_matches(queries):
+            embedded.extend(queries)
+            return [("Q2", "What caused margin drop in Transportation?", 0.8)] * len(queries)
+
+        original = semantic_matcher.embedding_matches
+        semantic_matcher.embedding_matches = embedding_matches
+        try:
+            matches = semantic_matcher.find_best_matching_qids(
+                ["revenue per person", "Why did margin drop in Transportation last month?"])
+        finally:
+            semantic_matcher.embedding_matches = original
+        self.assertEqual([qid for qid, _, _ in matches], ["Q9", "Q2"])
+        self.assertEqual(embedded, ["Why did margin drop in Transportation last month?"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# tests/test_margin_root_cause.py
+
+import unittest
+import pandas as pd
+from kpi_engine.margin_root_cause import MarginRootCause
+
+class TestMarginRootCause(unittest.TestCase):
+
+    def setUp(self):
+        months = pd.to_datetime(['2025-04-01', '2025-05-01', '2025-06-01'])
+        rows = []
+        for segment, growth in [('Transportation', 2.0), ('Med Tech', 0.5)]:
+            for i, month in enumerate(months):
+                for client, revenue in [('C1', 100.0), ('C2', 50.0)]:
+                    rows.append([client, segment, month, 'ONSITE', None, None, revenue])
+                    rows.append([client, segment, month, 'X', 'Cost', 'Rent', 10.0 * growth ** i])
+                    rows.append([client, segment, month, 'X', 'Cost', 'Travel', 5.0])
+        self.df = pd.DataFrame(rows, columns=[
+            'Company Code', 'Segment', 'Month', 'Group1', 'Type', 'Group4', 'Amount in USD'])
+        self.engine = MarginRootCause(self.df)
+
+    def test_does_not_mutate_input(self):
+        before = self.df.copy()
+        MarginRootCause(self.df)
+        pd.testing.assert_frame_equal(self.df, before)
+
+    def test_lookup_any_segment_and_month(self):
+        latest = self.engine.lookup('Transportation')
+        self.assertEqual(latest.latest_month, pd.Timestamp('2025-06-01'))
+        self.assertEqual(latest.client_margin, (2, 2))
+        self.assertEqual(latest.group4['Group4'].tolist(), ['Rent'])
+        self.assertAlmostEqual(latest.group4['abs_change'].iloc[0], 2 * (40.0 - 20.0))
+        self.assertAlmostEqual(latest.group4['% Change'].iloc[0], 100.0)
+
+        earlier = self.engine.lookup('Med Tech', month='2025-05-01')
+        self.assertLess(earlier.segment_margin[0], earlier.segment_margin[1])
+        self.assertTrue(earlier.group4.empty)
+
+    def test_cached_engine_follows_the_frame(self):
+        from questions.question_q2 import get_root_cause_engine
+        other = self.df[self.df['Segment'] == 'Med Tech']
+        self.assertIs(get_root_cause_engine(self.df), get_root_cause_engine(self.df.copy()))
+        self.assertEqual(get_root_cause_engine(other).segments, ['Med Tech'])
+
+    def test_missing_previous_month(self):
+        result = self.engine.lookup('Transportation', month='2025-04-01')
+        self.assertIsNone(result.segment_margin)
+        self.assertTrue(result.group4.empty)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# tests/test_parallel_agg.py
+
+import unittest
+import numpy as np
+import pandas as pd
+from utils import parallel_agg
+from utils.parallel_agg import parallel_aggregate
+
+class TestParallelAgg(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(3)
+        n = 20000
+        cls.df = pd.DataFrame({
+            'Date_a': pd.Timestamp('2024-04-01') + pd.to_timedelta(rng.integers(0, 420, n), unit='D'),
+            'Segment': rng.choice(['Transportation', 'Med Tech', 'Plant Engineering'], n),
+            'PSNo': rng.integers(0, 2000, n),
+            'NetAvailableHours': rng.uniform(0, 9, n),
+        })
+        cls.df['Month'] = cls.df['Date_a'].dt.to_period('M').astype(str)
+        cls.aggs = {
+            'Headcount': ('PSNo', 'nunique'),
+            'Hours': ('NetAvailableHours', 'sum'),
+            'AvgHours': ('NetAvailableHours', 'mean'),
+            'Rows': ('NetAvailableHours', 'size'),
+        }
+        cls.min_rows = parallel_agg.PARALLEL_MIN_ROWS
+        parallel_agg.PARALLEL_MIN_ROWS = 0
+
+    @classmethod
+    def tearDownClass(cls):
+        parallel_agg.PARALLEL_MIN_ROWS = cls.min_rows
+
+    def expected(self, keys):
+        return self.df.groupby(keys).agg(
+            Headcount=('PSNo', 'nunique'), Hours=('NetAvailableHours', 'sum'),
+            AvgHours=('NetAvailableHours', 'mean'), Rows=('NetAvailableHours', 'size'),
+        ).reset_index()
+
+    def test_partitions_merge_to_groupby_result(self):
+        cases = [
+            ('month', 'Date_a', ['Segment']),   # distinct counts span partitions
+            ('month', 'Month', ['Segment', 'Month']),
+            ('hash', 'Date_a', ['Segment']),
+        ]
+        for partition_by, month_col, keys in cases:
+            for workers in (1, 3):
+                result = parallel_aggregate(self.df, keys, self.aggs, partition_by=partition_by,
+                                            month_col=month_col, workers=workers)
+                pd.testing.assert_frame_equal(result, self.expected(keys), check_dtype=False)
+
+    def test_rows_without_a_month_are_kept(self):
+        df = self.df.copy()
+        df.loc[df.index % 10 == 0, 'Date_a'] = pd.NaT
+        expected = df.groupby(['Segment']).agg(Hours=('NetAvailableHours', 'sum'),
+                                               Rows=('NetAvailableHours', 'size')).reset_index()
+        aggs = {'Hours': ('NetAvailableHours', 'sum'), 'Rows': ('NetAvailableHours', 'size')}
+        result = parallel_aggregate(df, ['Segment'], aggs, partition_by='month', workers=3)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    def test_rejects_unknown_aggregation(self):
+        with self.assertRaises(ValueError):
+            parallel_aggregate(self.df, ['Segment'], {'x': ('PSNo', 'median')})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# tests/test_param_extractor.py
+
+import unittest
+import pandas as pd
+from utils.param_extractor import extract_params, get_extractor
+
+SEGMENTS = {'Segment': ['Transportation', 'Med Tech', 'Media & Technology', 'Plant Engineering']}
+
+class TestParamExtractor(unittest.TestCase):
+
+    def test_threshold_month_and_year(self):
+        params = extract_params("Clients with margin below 25% in June 2025")
+        self.assertEqual((params.threshold, params.comparison), (25.0, 'below'))
+        self.assertEqual((params.month, params.year), (6, 2025))
+        self.assertEqual(params.month_start, pd.Timestamp(2025, 6, 1))
+
+        self.assertEqual(extract_params("margin<30 for jan").threshold, 30.0)
+        self.assertEqual(extract_params("accounts with margin of 22%").threshold, 22.0)
+        # Thousands separators belong to the number
+        params = extract_params("revenue over 1,000")
+        self.assertEqual((params.threshold, params.comparison), (1000.0, 'above'))
+        self.assertEqual(extract_params("revenue below 2,500,000.5").threshold, 2500000.5)
+        self.assertEqual(extract_params("margin below 30, 2025").threshold, 30.0)
+        # An explicit "month year" wins over an earlier bare month
+        params = extract_params("compare may with sept 2024")
+        self.assertEqual((params.month, params.year), (9, 2024))
+        self.assertIsNone(extract_params("margin trend").month_start)
+
+    def test_vocabulary_relative_periods_and_flags(self):
+        params = extract_params("How did C&B vary QoQ for media & technology, not Med Tech?", SEGMENTS)
+        self.assertEqual(params.segments, ('Media & Technology', 'Med Tech'))
+        self.assertEqual(params.first('Segment'), 'Media & Technology')
+        self.assertEqual(params.relative, 'qoq')
+        self.assertEqual(params.metrics, ('c&b',))
+        # Word boundaries: "Med Tech" is not found inside "Med Technology"
+        self.assertIsNone(extract_params("Med Technology revenue", {'Segment': ['Med Tech']}).first('Segment'))
+
+        params = extract_params("non-billable headcount onsite over the last 3 months")
+        self.assertIs(params.billable, False)
+        self.assertEqual(params.location, 'onsite')
+        self.assertEqual(params.relative, 'last 3 months')
+        self.assertIsNone(params.threshold)
+        self.assertIs(extract_params("billable hours").billable, True)
+
+    def test_extractor_is_compiled_once_per_vocabulary(self):
+        first = get_extractor(SEGMENTS)
+        self.assertIs(get_extractor({'Segment': list(reversed(SEGMENTS['Segment']))}), first)
+        self.assertIsNot(get_extractor({'Segment': ['Transportation']}), first)
+
+if __name__ == '__main__':
+    unittest.main()
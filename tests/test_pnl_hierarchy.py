@@ -0,0 +1,54 @@
+# tests/test_pnl_hierarchy.py
+
+import unittest
+import numpy as np
+import pandas as pd
+from kpi_engine.pnl_hierarchy import PnlHierarchy, pnl_hierarchy, CB_DESCRIPTIONS, REVENUE_GROUP1
+
+class TestPnlHierarchy(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(11)
+        n = 3000
+        cls.df = pd.DataFrame({
+            'Month': pd.to_datetime(rng.choice(['2025-01-01', '2025-03-01', '2025-04-01', '2025-06-01', None], n)),
+            'Segment': rng.choice(['Transportation', 'Med Tech'], n),
+            'Exec DU': rng.choice(['DU1', 'DU2'], n),
+            'Type': rng.choice(['Revenue', 'Cost', 'Indirect Revenue'], n),
+            'Group1': rng.choice(REVENUE_GROUP1 + ['COST - ONSITE', None], n),
+            'Group4': rng.choice(['Salaries', 'Travel'], n),
+            'Group Description': rng.choice(CB_DESCRIPTIONS + ['Other'], n),
+            'Amount in USD': rng.normal(1000, 300, n),
+        }).rename(columns={'Exec DU': 'DU'})
+        cls.tree = PnlHierarchy(cls.df)
+
+    def test_totals_match_filtered_sums(self):
+        df = self.df
+        self.assertAlmostEqual(self.tree.total(), df['Amount in USD'].sum())
+        self.assertAlmostEqual(self.tree.total({'Group1': 'COST - ONSITE'}),
+                               df.loc[df['Group1'] == 'COST - ONSITE', 'Amount in USD'].sum())
+        self.assertAlmostEqual(self.tree.total({'Group Description': CB_DESCRIPTIONS}, {'Type': 'cost'}),
+                               df.loc[df['Group Description'].isin(CB_DESCRIPTIONS) & (df['Type'] == 'Cost'),
+                                      'Amount in USD'].sum())
+
+    def test_breakdowns_by_dimension_period_and_node(self):
+        df = self.df.dropna(subset=['Month'])
+        revenue = df[df['Group1'].isin(REVENUE_GROUP1)]
+        expected = revenue.groupby(['DU', revenue['Month'].dt.to_period('Q')])['Amount in USD'].sum()
+        result = self.tree.amounts('DU', 'quarter', node={'Group1': REVENUE_GROUP1})
+        np.testing.assert_allclose(result.to_numpy(), expected.to_numpy())
+
+        nodes = self.tree.node_amounts('Group4', filters={'Segment': 'Med Tech'})
+        med = self.df[self.df['Segment'] == 'Med Tech']
+        expected = med.groupby(['Group1', 'Group4'])['Amount in USD'].sum()
+        np.testing.assert_allclose(nodes.to_numpy(), expected.to_numpy())
+        self.assertEqual(self.tree.latest_month(), pd.Timestamp('2025-06-01'))
+
+    def test_cached_per_frame(self):
+        self.assertIs(pnl_hierarchy(self.df), pnl_hierarchy(self.df))
+        other = self.df.assign(**{'Amount in USD': self.df['Amount in USD'] * 2})
+        self.assertAlmostEqual(pnl_hierarchy(other).total(), 2 * self.df['Amount in USD'].sum())
+
+if __name__ == '__main__':
+    unittest.main()
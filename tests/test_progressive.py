@@ -0,0 +1,94 @@
+# tests/test_progressive.py
+
+import unittest
+import numpy as np
+import pandas as pd
+from utils.progressive import ProgressiveView
+from questions.question_q7 import headcount_stages, SLOTS
+from questions.question_q1 import portfolio_margin, prepare_margin_rows
+
+class _Placeholder:
+    """Records what an st.empty() slot currently shows."""
+
+    def __init__(self):
+        self.content = None
+
+    def empty(self):
+        self.content = None
+
+    def caption(self, text):
+        self.content = text
+
+    def container(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class _Page:
+    def __init__(self):
+        self.log = []
+        self.slots = []
+
+    def empty(self):
+        self.slots.append(_Placeholder())
+        return self.slots[-1]
+
+class TestProgressiveRendering(unittest.TestCase):
+
+    def test_slots_fill_as_stages_complete_and_unused_slots_are_cleared(self):
+        page = _Page()
+        renderers = {slot: (lambda payload, slot=slot: page.log.append((slot, payload)))
+                     for slot in ["headline", "chart", "table"]}
+        view = ProgressiveView(["headline", "chart", "table"], renderers, parent=page)
+        self.assertEqual([p.content for p in page.slots], ["⏳ Loading…"] * 3)
+
+        def stages():
+            # Computed cheapest first, laid out in slot order
+            yield "headline", 1
+            self.assertEqual(page.log, [("headline", 1)])
+            yield "table", 2
+
+        view.run(stages())
+        self.assertEqual(page.log, [("headline", 1), ("table", 2)])
+        self.assertIsNone(page.slots[1].content)  # "chart" was never yielded
+
+    def test_q7_stages_are_cheapest_first_and_share_frame_level_work(self):
+        rng = np.random.default_rng(2)
+        n = 600
+        df = pd.DataFrame({
+            'PSNo': rng.integers(0, 150, n),
+            'FinalCustomerName': rng.choice(['A', 'B', 'C'], n),
+            'Segment': rng.choice(['S1', 'S2'], n),
+            'Status': rng.choice(['Billable', 'Non Billable'], n),
+            'Onsite/Offshore': rng.choice(['Onsite', 'Offshore'], n),
+            'Month': rng.choice(['2025-04', '2025-05', '2025-06'], n),
+        })
+        shared = {}
+        first = list(headcount_stages(df, 'FinalCustomerName', shared))
+        self.assertEqual([slot for slot, _ in first], ['breakdown', 'summary', 'fte', 'composition'])
+        self.assertEqual(set(SLOTS), {slot for slot, _ in first})
+        self.assertAlmostEqual(first[0][1]['billable'],
+                               df.loc[df['Status'] == 'Billable', 'PSNo'].nunique() / df['PSNo'].nunique() * 100)
+
+        second = dict(headcount_stages(df, 'Segment', shared))
+        self.assertIs(second['composition'], first[3][1])
+        self.assertEqual(second['fte'][1]['FTE'].sum(), df.groupby(['Segment', 'Month'])['PSNo'].nunique().sum())
+
+    def test_q1_headline_is_overall_margin_of_the_period(self):
+        df = pd.DataFrame({
+            'Month': pd.to_datetime(['2025-01-01', '2025-05-01', '2025-06-01', '2025-06-01']),
+            'Type': ['Revenue', 'Revenue', 'Revenue', 'Cost'],
+            'Amount in USD': [1e6, 2e6, 2e6, 1e6],
+            'Segment': 'S1', 'FinalCustomerName': 'C1',
+        })
+        result = portfolio_margin(prepare_margin_rows(df), None)
+        self.assertEqual(result['time_label'], 'the last quarter')
+        self.assertAlmostEqual(result['margin'], 75.0)
+        self.assertAlmostEqual(result['revenue_mn'], 4.0)
+
+if __name__ == '__main__':
+    unittest.main()
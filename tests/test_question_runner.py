@@ -0,0 +1,117 @@
+# tests/test_question_runner.py
+
+import time
+import threading
+import unittest
+from streamlit.runtime.scriptrunner_utils.script_run_context import (get_script_run_ctx,
+                                                                    SCRIPT_RUN_CONTEXT_ATTR_NAME)
+from utils.question_runner import (QuestionRunner, QuestionTimeout, QuestionCancelled, checkpoint,
+                                   get_question_runner, get_fallback_runner)
+
+def _cooperative(stages, started=None, stopped=None):
+    if started is not None:
+        started.set()
+    try:
+        for _ in range(stages):
+            checkpoint()
+            time.sleep(0.02)
+        return "done"
+    except QuestionCancelled:
+        if stopped is not None:
+            stopped.set()
+        raise
+
+class _FakeScriptRunContext:
+    """Records what a run would send to the page."""
+
+    session_id = "s1"
+
+    def __init__(self):
+        self.messages = []
+
+    def enqueue(self, msg):
+        self.messages.append(msg)
+
+def _renders_without_checkpoints(steps):
+    # Like Q1-Q6: computes and writes to the page, never calls checkpoint()
+    for i in range(steps):
+        time.sleep(0.02)
+        get_script_run_ctx().enqueue(i)
+    return "done"
+
+class TestQuestionRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = QuestionRunner(max_workers=2)
+
+    def test_result_and_worker_thread(self):
+        run = self.runner.submit("s1", lambda: (threading.current_thread().name, 42), qid="Q1")
+        name, value = self.runner.wait(run, timeout=5)
+        self.assertEqual(value, 42)
+        self.assertTrue(name.startswith("question"))
+        checkpoint()  # no-op outside a run
+
+    def test_timeout_cancels_the_run(self):
+        stopped = threading.Event()
+        run = self.runner.submit("s1", _cooperative, 500, stopped=stopped, qid="Q7")
+        with self.assertRaises(QuestionTimeout):
+            self.runner.wait(run, timeout=0.2)
+        self.assertTrue(stopped.wait(2))
+        self.assertTrue(run.token.cancelled)
+
+    def test_timed_out_run_stops_writing_to_the_page(self):
+        ctx = _FakeScriptRunContext()
+        thread = threading.current_thread()
+        setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, ctx)
+        try:
+            run = self.runner.submit("s1", _renders_without_checkpoints, 500, qid="Q1")
+        finally:
+            setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+        with self.assertRaisesRegex(QuestionTimeout, "exceeded its 0.2s budget"):
+            self.runner.wait(run, timeout=0.2)
+        with self.assertRaises(QuestionCancelled):
+            run.future.result(timeout=2)  # stopped at its next write
+        written = len(ctx.messages)
+        time.sleep(0.1)
+        self.assertEqual(len(ctx.messages), written)
+        self.assertLess(written, 20)
+
+    def test_fallback_does_not_queue_behind_timed_out_runs(self):
+        questions, fallback = get_question_runner(), get_fallback_runner()
+        self.assertIsNot(questions, fallback)
+        self.assertIs(get_fallback_runner(), fallback)
+
+        busy = QuestionRunner(max_workers=1)
+        run = busy.submit("s1", time.sleep, 1.0)  # no checkpoint, no st.* call
+        with self.assertRaises(QuestionTimeout):
+            busy.wait(run, timeout=0.1)
+        started = time.monotonic()
+        self.assertEqual(fallback.wait(fallback.submit("s1:fallback", lambda: "approx"), timeout=5), "approx")
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_newer_question_supersedes_the_session_run(self):
+        started, stopped = threading.Event(), threading.Event()
+        ticks = []
+        old = self.runner.submit("s1", _cooperative, 500, started, stopped, qid="Q10")
+        self.assertTrue(started.wait(2))
+        other = self.runner.submit("s2", _cooperative, 3)
+        new = self.runner.submit("s1", _cooperative, 3, qid="Q1")
+
+        self.assertTrue(stopped.wait(2))
+        with self.assertRaises(QuestionCancelled):
+            old.future.result(timeout=2)
+        self.assertEqual(self.runner.wait(new, timeout=5, on_tick=ticks.append), "done")
+        self.assertEqual(self.runner.wait(other, timeout=5), "done")
+
+    def test_interrupted_wait_cancels_the_run(self):
+        stopped = threading.Event()
+        run = self.runner.submit("s1", _cooperative, 500, stopped=stopped)
+
+        def rerun(elapsed):
+            raise KeyboardInterrupt  # stands in for Streamlit's RerunException
+        with self.assertRaises(KeyboardInterrupt):
+            self.runner.wait(run, timeout=5, on_tick=rerun)
+        self.assertTrue(stopped.wait(2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# tests/test_realized_rate_matrix.py
+
+import unittest
+import os
+import numpy as np
+import pandas as pd
+from utils import columnar
+from kpi_engine.realized_rate import calculate_realized_rate_quarterly
+from kpi_engine.realized_rate_matrix import RealizedRateDropMatrix
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "sample_data")
+
+class TestRealizedRateMatrix(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        revenue = pd.read_csv(os.path.join(SAMPLE_DIR, "revenue.csv"), encoding="utf-8-sig")
+        hours = pd.read_csv(os.path.join(SAMPLE_DIR, "netavailablehours.csv"), encoding="utf-8-sig")
+        # Sample revenue covers Apr–Jun only; add Jan–Mar (fiscal Q4) with scaled amounts
+        rng = np.random.default_rng(7)
+        q4 = revenue.assign(
+            Month=revenue['Month'].map({'Apr': 'Jan', 'May': 'Feb', 'Jun': 'Mar'}),
+            Revenue=revenue['Revenue'] * rng.uniform(0.5, 1.5, len(revenue)),
+        )
+        revenue = pd.concat([revenue, q4], ignore_index=True)
+        cls.matrix = RealizedRateDropMatrix.build(
+            columnar.to_typed_frame(revenue, "revenue"), columnar.to_typed_frame(hours, "netavailablehours"))
+
+    def test_drops_are_computed(self):
+        self.assertGreater(len(self.matrix.drops), 0)
+        self.assertGreater(self.matrix.count_above(0.0), 0)
+
+    def test_query_matches_full_scan(self):
+        drops = self.matrix.drops
+        for threshold in [-1e9, 0.0, 3.0, 25.0]:
+            for segment in ["All"] + sorted(drops['Segment'].dropna().unique()):
+                expected = drops[drops['RateDrop'] > threshold]
+                if segment != "All":
+                    expected = expected[expected['Segment'] == segment]
+                result = self.matrix.query(threshold, segment=segment)
+                self.assertEqual(len(result), len(expected))
+                self.assertEqual(self.matrix.count_above(threshold, segment), len(expected))
+                self.assertTrue(result['RateDrop'].is_monotonic_decreasing)
+
+    def test_rate_bounds_and_unknown_segment(self):
+        result = self.matrix.query(0.0, min_rate=10, max_rate=50)
+        self.assertTrue(result['RealizedRate'].between(10, 50).all())
+        self.assertTrue(self.matrix.query(0.0, segment="No Such Segment").empty)
+
+    def test_fiscal_q4_comes_before_next_q1(self):
+        # Jan–Jun: FY Q4 (rate 10) then the next fiscal year's Q1 (rate 5)
+        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun']
+        keys = {'FinalCustomerName': 'A', 'Segment': 'S1', 'BU': 'B1', 'DU': 'D1'}
+        revenue = pd.DataFrame([dict(keys, Month=m, Revenue=1000.0 if i < 3 else 500.0) for i, m in enumerate(months)])
+        hours = pd.DataFrame([dict(keys, Month=m, NetAvailableHours=100.0) for m in months])
+        matrix = RealizedRateDropMatrix.build(
+            columnar.to_typed_frame(revenue, "revenue"), columnar.to_typed_frame(hours, "netavailablehours"))
+
+        result = matrix.query(3.0)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result['Quarter'].iloc[0], 'Q1')
+        self.assertAlmostEqual(result['PrevRealizedRate'].iloc[0], 10.0)
+        self.assertAlmostEqual(result['RateDrop'].iloc[0], 5.0)
+
+    def test_quarterly_does_not_mutate_inputs(self):
+        pnl_df = pd.DataFrame({
+            'FinalCustomerName': ['A', 'A', None],
+            'Month': ['2025-01-01', '2025-04-01', '2025-04-01'],
+            'Group1': ['ONSITE', 'ONSITE', 'ONSITE'],
+            'Type': ['Revenue', 'Revenue', 'Revenue'],
+            'Segment': ['S1', 'S1', 'S1'],
+            'Amount in USD': [1000.0, 500.0, 10.0],
+        })
+        ut_df = pd.DataFrame({
+            'FinalCustomerName': ['A', 'A'],
+            'Month': ['2025-01-01', '2025-04-01'],
+            'NetAvailableHours': [100.0, 100.0],
+        })
+        pnl_before, ut_before = pnl_df.copy(), ut_df.copy()
+        result = calculate_realized_rate_quarterly(pnl_df, ut_df, drop_threshold=3.0)
+
+        pd.testing.assert_frame_equal(pnl_df, pnl_before)
+        pd.testing.assert_frame_equal(ut_df, ut_before)
+        self.assertEqual(len(result), 1)
+        self.assertAlmostEqual(result['RateDrop'].iloc[0], 5.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# tests/test_result_cache.py
+
+import os
+import unittest
+import tempfile
+import multiprocessing
+import numpy as np
+import pandas as pd
+from utils.result_cache import ResultCache
+
+def _store_from_other_process(path):
+    ResultCache(path).put("q1", {"threshold": 30}, {"rows": 3}, version="v1")
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "results.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_with_normalized_parameters(self):
+        cache = ResultCache(self.path)
+        table = pd.DataFrame({"Client": ["A", "B"], "Margin %": [12.5, 28.0]})
+        cache.put("q1", {"group": "Client", "threshold": 30.0}, {"top_10": table}, version="v1")
+
+        hit = cache.get("q1", {"threshold": 30, "group": " client "}, version="v1")
+        pd.testing.assert_frame_equal(hit["top_10"], table)
+        self.assertIsNone(cache.get("q1", {"group": "Client", "threshold": 30}, version="v2"))
+        self.assertIsNone(cache.get("q2", {"group": "Client", "threshold": 30}, version="v1"))
+
+        calls = []
+        compute = lambda: calls.append(1) or "fresh"
+        self.assertEqual(cache.get_or_compute("q3", {}, compute, version="v1"), "fresh")
+        self.assertEqual(cache.get_or_compute("q3", {}, compute, version="v1"), "fresh")
+        self.assertEqual(len(calls), 1)
+
+    def test_size_bound_evicts_other_versions_then_lru(self):
+        rng = np.random.default_rng(0)
+        blob = lambda: rng.bytes(40_000)  # incompressible
+        cache = ResultCache(self.path, max_bytes=130_000)
+        cache.put("q1", {"n": 0}, blob(), version="old")
+        cache.put("q1", {"n": 1}, blob(), version="new")
+        cache.put("q1", {"n": 2}, blob(), version="new")
+        cache.get("q1", {"n": 1}, version="new")
+        cache.put("q1", {"n": 3}, blob(), version="new")
+        cache.put("q1", {"n": 4}, blob(), version="new")
+
+        self.assertLessEqual(cache.size_bytes(), 130_000)
+        self.assertIsNone(cache.get("q1", {"n": 0}, version="old"))
+        self.assertIsNone(cache.get("q1", {"n": 2}, version="new"))
+        self.assertIsNotNone(cache.get("q1", {"n": 1}, version="new"))
+        self.assertIsNotNone(cache.get("q1", {"n": 4}, version="new"))
+
+    def test_unversioned_results_are_not_persisted(self):
+        cache = ResultCache(self.path)
+        cache.put("q7", {"tab": "fte"}, "stale after a data change", version="unversioned")
+        self.assertEqual(len(cache), 0)
+        calls = []
+        for _ in range(2):
+            cache.get_or_compute("q7", {"tab": "fte"}, lambda: calls.append(1), version="unversioned")
+        self.assertEqual(len(calls), 2)
+
+    @unittest.skipUnless(hasattr(os, "getuid"), "POSIX permissions")
+    def test_refuses_a_directory_others_can_write(self):
+        shared = os.path.join(self.tmp.name, "shared")
+        os.mkdir(shared)
+        os.chmod(shared, 0o777)
+        with self.assertRaises(PermissionError):
+            ResultCache(os.path.join(shared, "results.sqlite"))
+
+        private = os.path.join(self.tmp.name, "new", "results.sqlite")
+        ResultCache(private)
+        self.assertEqual(os.stat(os.path.dirname(private)).st_mode & 0o777, 0o700)
+
+    def test_shared_across_processes(self):
+        process = multiprocessing.get_context("spawn").Process(target=_store_from_other_process, args=(self.path,))
+        process.start()
+        process.join(60)
+        self.assertEqual(ResultCache(self.path).get("q1", {"threshold": 30}, version="v1"), {"rows": 3})
+
+if __name__ == '__main__':
+    unittest.main()
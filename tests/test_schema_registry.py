@@ -0,0 +1,62 @@
+# tests/test_schema_registry.py
+
+import unittest
+import pandas as pd
+from utils import schema_registry
+
+class TestSchemaRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.pnl = pd.DataFrame({
+            ' Company Code ': ['C1', 'C2'],
+            'Amount in USD': ['100', '250.5'],
+            'Month': ['2025-04-01', '2025-05-01'],
+            'Type': ['Cost', 'Cost'],
+            'Exec DG': ['BU1', 'BU2'],
+            'Exec DU': ['DU1', 'DU2'],
+        })
+
+    def test_pnl_aliases_and_dtypes(self):
+        df = schema_registry.apply_schema(self.pnl, "pnl", version="test")
+        self.assertIn('Client', df.columns)
+        self.assertIn('Amount', df.columns)
+        self.assertNotIn('Amount in USD', df.columns)
+        # copy-mode aliases keep the source column
+        self.assertListEqual(df['BU'].tolist(), ['BU1', 'BU2'])
+        self.assertIn('Exec DG', df.columns)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['Month']))
+        self.assertAlmostEqual(df['Amount'].sum(), 350.5)
+        self.assertTrue(schema_registry.is_resolved(df, "pnl"))
+        # input frame is left untouched
+        self.assertIn(' Company Code ', self.pnl.columns)
+
+    def test_apply_is_idempotent(self):
+        df = schema_registry.apply_schema(self.pnl, "pnl", version="test")
+        self.assertIs(schema_registry.apply_schema(df, "pnl", version="test"), df)
+
+    def test_ut_aliases_and_derived_calendar(self):
+        ut = pd.DataFrame({
+            'date_a': ['2025-06-01', '2025-07-01'],
+            'Delivery_Unit': ['DU1', 'DU2'],
+            'BusinessUnit': ['BU1', 'BU2'],
+            'NetAvailableHours': ['160', '170'],
+        })
+        df = schema_registry.apply_schema(ut, "ut", version="test")
+        self.assertListEqual(df['DU'].tolist(), ['DU1', 'DU2'])
+        self.assertListEqual(df['BU'].tolist(), ['BU1', 'BU2'])
+        self.assertListEqual(df['MonthName'].tolist(), ['Jun', 'Jul'])
+        self.assertEqual(df['NetAvailableHours'].dtype, float)
+
+    def test_mapping_is_cached_per_version(self):
+        cols = ('Company_Code', 'Amount')
+        first = schema_registry.resolve_mapping("pnl", cols, version="v1")
+        self.assertIs(schema_registry.resolve_mapping("pnl", cols, version="v1"), first)
+        self.assertEqual(first['Client'], 'Company_Code')
+        self.assertIsNot(schema_registry.resolve_mapping("pnl", cols, version="v2"), first)
+
+    def test_missing_required_column(self):
+        with self.assertRaises(ValueError):
+            schema_registry.apply_schema(pd.DataFrame({'Type': ['Cost']}), "pnl", version="test")
+
+if __name__ == '__main__':
+    unittest.main()
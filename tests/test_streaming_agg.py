@@ -0,0 +1,86 @@
+# tests/test_streaming_agg.py
+
+import unittest
+import os
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from utils import streaming_agg
+from kpi_engine.net_available_hours_aggregated import aggregate_net_available_hours
+from kpi_engine.headcount_aggregated import account_headcount
+from kpi_engine.ut_engine import UtilizationEngine
+
+MEMORY_CAP_MB = 32
+
+def make_ut_chunks(rows, chunk_rows, seed=5):
+    rng = np.random.default_rng(seed)
+    customers = np.array([f"Customer {i:03d}" for i in range(300)], dtype=object)
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        # Every employee works for one account
+        psno = rng.integers(0, 5000, n)
+        account = psno % 300
+        yield pd.DataFrame({
+            'Date_a': pd.Timestamp('2024-04-01') + pd.to_timedelta(rng.integers(0, 450, n), unit='D'),
+            'Month': rng.integers(1, 13, n),
+            'PSNo': psno,
+            'FinalCustomerName': customers[account],
+            'Segment': np.array(['Transportation', 'Med Tech', 'Plant Engineering'], dtype=object)[account % 3],
+            'BU': np.array([f"BU {i}" for i in range(6)], dtype=object)[account % 6],
+            'DU': np.array([f"DU {i}" for i in range(12)], dtype=object)[account % 12],
+            'TotalBillableHours': rng.uniform(0, 8, n),
+            'NetAvailableHours': rng.uniform(1, 9, n),
+        })
+
+class TestStreamingAgg(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, streaming_agg.fact_object_name("LNTData.xlsx"))
+        cls.rows = streaming_agg.write_fact_parquet(make_ut_chunks(250_000, 50_000), cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def full_frame(self):
+        return pd.concat(make_ut_chunks(250_000, 50_000), ignore_index=True)
+
+    def test_matches_in_memory_builders(self):
+        expected = aggregate_net_available_hours(self.full_frame())
+        result = streaming_agg.stream_net_available_hours(self.path, memory_mb=MEMORY_CAP_MB)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+        expected = account_headcount(self.full_frame())
+        result = streaming_agg.stream_headcount(self.path, memory_mb=MEMORY_CAP_MB)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+        expected = UtilizationEngine(self.full_frame())
+        result = streaming_agg.stream_ut_engine(self.path, memory_mb=MEMORY_CAP_MB)
+        for grain in ["month", "quarter"]:
+            pd.testing.assert_frame_equal(result.trend("DU", grain), expected.trend("DU", grain))
+
+    def test_peak_memory_stays_under_cap(self):
+        # The extract itself would not fit the budget
+        self.assertGreater(self.full_frame().memory_usage(deep=True).sum(), MEMORY_CAP_MB * 1024 * 1024)
+        tracemalloc.start()
+        try:
+            streaming_agg.stream_net_available_hours(self.path, memory_mb=MEMORY_CAP_MB)
+            streaming_agg.stream_headcount(self.path, memory_mb=MEMORY_CAP_MB)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, MEMORY_CAP_MB * 1024 * 1024)
+
+    def test_state_over_budget_raises(self):
+        # One group per row: the state grows with the input and must be refused
+        aggregator = streaming_agg.StreamingAggregator(['PSNo', 'Date_a'], {'Hours': ('NetAvailableHours', 'sum')},
+                                                       memory_mb=1)
+        with self.assertRaises(streaming_agg.MemoryCapExceeded):
+            for chunk in streaming_agg.iter_frames(self.path, memory_mb=1):
+                aggregator.add(chunk)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# tests/test_table_server.py
+
+import sys
+import unittest
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+import utils.table_server as table_server
+from utils.table_server import query_table
+
+def _large_table():
+    import streamlit as st
+    import pandas as pd
+    from utils.table_server import serve_table
+
+    accounts = pd.DataFrame({"Account": [f"acct{i:03d}" for i in range(230)], "Revenue": range(230)})
+    serve_table(accounts, "accounts")
+
+class TestTableServer(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Revenue': np.arange(120, dtype=float)[::-1],
+            'Segment': ['Transportation', 'Med Tech', 'Hi-Tech'] * 40,
+        }, index=pd.Index([f"acct{i:03d}" for i in range(120)], name='FinalCustomerName'))
+
+    def test_pages_are_sorted_and_filtered_over_the_whole_table(self):
+        page = query_table(self.df, 'Revenue', True, None, page=2, page_size=50)
+        self.assertEqual((page.total_rows, page.page, page.pages), (120, 2, 3))
+        self.assertEqual(page.rows['Revenue'].tolist(), list(range(50, 100)))
+        self.assertEqual(page.rows.index.name, 'FinalCustomerName')
+
+        page = query_table(self.df, 'FinalCustomerName', False, "med", page=9, page_size=25)
+        self.assertEqual((page.total_rows, page.page, page.pages), (40, 2, 2))  # page clamped to the last one
+        self.assertEqual(page.rows.index[0], 'acct043')
+        self.assertTrue((page.rows['Segment'] == 'Med Tech').all())
+
+    def test_sort_order_is_computed_once_per_query(self):
+        calls = []
+        original = table_server._row_order
+        table_server._orders.clear()
+        try:
+            table_server._row_order = lambda *args: calls.append(1) or original(*args)
+            for page in [1, 2, 3]:
+                query_table(self.df, 'Revenue', False, None, page=page, page_size=50)
+        finally:
+            table_server._row_order = original
+        self.assertEqual(len(calls), 1)
+
+    def test_browser_gets_one_page(self):
+        main = sys.modules["__main__"]
+        try:
+            app = AppTest.from_function(_large_table).run(timeout=30)
+            self.assertFalse(app.exception)
+            self.assertEqual(len(app.dataframe[0].value), 50)
+            self.assertIn("of 230 (page 1 of 5)", app.caption[0].value)
+
+            app.text_input[0].input("acct1")
+            app.number_input[0].set_value(2)
+            app.run(timeout=30)
+            self.assertEqual(app.dataframe[0].value['Account'].iloc[0], "acct150")
+        finally:
+            # AppTest installs the script as __main__; spawn-based tests need the real one back
+            sys.modules["__main__"] = main
+
+if __name__ == '__main__':
+    unittest.main()
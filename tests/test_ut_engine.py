@@ -0,0 +1,50 @@
+# tests/test_ut_engine.py
+
+import unittest
+import numpy as np
+import pandas as pd
+from kpi_engine.ut_engine import UtilizationEngine
+
+class TestUtEngine(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(3)
+        n = 4000
+        cls.df = pd.DataFrame({
+            'Date_a': pd.to_datetime(rng.choice(['2025-01-01', '2025-02-01', '2025-04-01', '2025-06-01'], n)),
+            'Segment': rng.choice(['Transportation', 'Med Tech'], n),
+            'BusinessUnit': rng.choice(['BU1', 'BU2'], n),
+            'Delivery_Unit': rng.choice(['DU1', 'DU2', 'DU3'], n),
+            'FinalCustomerName': rng.choice(['A1', 'A2', 'A3', 'A4'], n),
+            'TotalBillableHours': rng.uniform(0, 180, n),
+            'NetAvailableHours': rng.uniform(100, 180, n),
+        })
+        cls.engine = UtilizationEngine(cls.df)
+
+    def test_ratio_of_sums_per_level_and_grain(self):
+        df = self.df.assign(Quarter=self.df['Date_a'].dt.to_period('Q').astype(str))
+        sums = df.groupby(['Delivery_Unit', 'Quarter'])[['TotalBillableHours', 'NetAvailableHours']].sum()
+        expected = (sums['TotalBillableHours'] / sums['NetAvailableHours'] * 100).unstack()
+        result = self.engine.pivot('DU', 'quarter')
+        np.testing.assert_allclose(result.to_numpy(), expected.to_numpy())
+        self.assertEqual(list(result.columns), ['2025Q1', '2025Q2'])
+
+    def test_filters_and_weighted_totals(self):
+        subset = self.df[self.df['Segment'] == 'Med Tech']
+        by_month = subset.groupby(subset['Date_a'].dt.strftime('%b'))[['TotalBillableHours', 'NetAvailableHours']].sum()
+        expected = by_month['TotalBillableHours'] / by_month['NetAvailableHours'] * 100
+        totals = self.engine.totals('month_of_year', {'Segment': ['Med Tech'], 'BU': []})
+        self.assertEqual(list(totals.index), ['Jan', 'Feb', 'Apr', 'Jun'])
+        np.testing.assert_allclose(totals.to_numpy(), expected.reindex(totals.index).to_numpy())
+
+        hours = self.engine.pivot('Account', 'month', {'Segment': 'Med Tech'}, value='NetAvailableHours')
+        self.assertAlmostEqual(hours.to_numpy().sum(), subset['NetAvailableHours'].sum())
+
+    def test_views_are_memoized(self):
+        first = self.engine.pivot('BU', 'year', {'DU': ['DU2', 'DU1']})
+        self.assertIs(self.engine.pivot('BU', 'year', {'DU': ['DU1', 'DU2']}), first)
+        self.assertIsNot(self.engine.pivot('BU', 'year', {'DU': ['DU1']}), first)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# tests/test_visuals.py
+
+import base64
+import unittest
+import pandas as pd
+from utils import visuals
+from utils.visuals import top_n_with_other, generate_bar_chart, cached_spec
+
+class TestVisuals(unittest.TestCase):
+
+    def setUp(self):
+        visuals._chart_cache.clear()
+
+    def test_top_n_with_other_keeps_totals(self):
+        df = pd.DataFrame({
+            'Month': ['Apr', 'May'] * 5,
+            'Client': ['A', 'A', 'B', 'B', 'C', 'C', 'D', 'D', 'E', 'E'],
+            'FTE': [50, 60, 40, 30, 5, 6, 3, 2, 1, 1],
+        })
+        reduced = top_n_with_other(df, 'Client', 'FTE', n=3, by='Month')
+        self.assertEqual(sorted(reduced['Client'].unique()), ['A', 'B', 'Other'])
+        other = reduced[reduced['Client'] == 'Other'].set_index('Month')['FTE']
+        self.assertEqual(other.to_dict(), {'Apr': 9, 'May': 9})
+        self.assertEqual(reduced['FTE'].sum(), df['FTE'].sum())
+        self.assertIs(top_n_with_other(df, 'Client', 'FTE', n=5), df)
+
+    def test_bar_chart_is_rendered_once_per_data(self):
+        df = pd.DataFrame({'Account': [f"acct{i}" for i in range(40)], 'Revenue': range(40)})
+        chart = generate_bar_chart(df, 'Account', 'Revenue', "Revenue by account")
+        self.assertEqual(chart["type"], "image")
+        self.assertTrue(base64.b64decode(chart["image_base64"]).startswith(b"\x89PNG"))
+        self.assertIs(generate_bar_chart(df.copy(), 'Account', 'Revenue', "Revenue by account"), chart)
+        self.assertIsNot(generate_bar_chart(df.head(10), 'Account', 'Revenue', "Revenue by account"), chart)
+
+    def test_spec_is_built_once_per_data_and_kind(self):
+        builds = []
+
+        class Chart:
+            def to_dict(self):
+                return {"mark": "line"}
+
+        build = lambda data: builds.append(len(data)) or Chart()
+        df = pd.DataFrame({'Month': ['Apr', 'May'], 'FTE': [1, 2]})
+        self.assertEqual(cached_spec("trend", df, build, "Client"), {"mark": "line"})
+        cached_spec("trend", df.copy(), build, "Client")
+        cached_spec("trend", (df, df), build, "Client")
+        cached_spec("trend", df, build, "Segment")
+        self.assertEqual(builds, [2, 2, 2])
+
+if __name__ == '__main__':
+    unittest.main()
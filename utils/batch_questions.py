@@ -0,0 +1,218 @@
+# utils/batch_questions.py
+
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from utils.intent_rules import rule_override
+from utils.param_extractor import extract_params
+
+# Threads shared by dataset loads, engine builds and grain aggregations
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(min(8, (os.cpu_count() or 1) + 2))))
+
+BatchAnswer = namedtuple("BatchAnswer", ["question", "qid", "matched_prompt", "score", "params", "result", "error"])
+
+# How a question id is answered without rendering:
+#   dataset     frame it reads ('pnl' or 'ut')
+#   state       name of the engine/table built once per dataset and shared
+#   build       build(df) -> state
+#   vocabulary  vocabulary(state) -> {column: values} for the parameter extractor
+#   grains      grains(params) -> hashable aggregation keys the question needs
+#   aggregate   aggregate(state, grain) -> shared result, computed once per batch
+#   answer      answer(state, {grain: aggregate}, params) -> structured result
+QuestionSpec = namedtuple("QuestionSpec", ["dataset", "state", "build", "vocabulary", "grains", "aggregate", "answer"])
+
+Q1_GROUPS = ["Client", "Segment", "BU", "DU"]
+
+
+def _no_vocabulary(state):
+    return {}
+
+
+def _no_grains(params):
+    return []
+
+
+# ---- Q1: low-margin entities per tab -------------------------------------
+def _q1_build(df):
+    from questions.question_q1 import prepare_margin_rows
+    return prepare_margin_rows(df)
+
+
+def _q1_aggregate(rows, group_field):
+    # Monthly Revenue/Cost pivot of one tab; every threshold/month reuses it
+    from questions.question_q1 import compute_margin
+    return compute_margin(rows, [group_field])
+
+
+def _q1_answer(rows, aggregates, params):
+    from questions.question_q1 import summarize_margin
+    threshold = 30 if params.threshold is None else params.threshold
+    return {group: summarize_margin(aggregates[group], group, threshold, params.month_start) for group in Q1_GROUPS}
+
+
+# ---- Q2: margin-drop root cause for a segment ----------------------------
+def _q2_build(df):
+    from questions.question_q2 import get_root_cause_engine
+    return get_root_cause_engine(df)
+
+
+def _q2_answer(engine, aggregates, params):
+    segment = params.first('Segment') or "Transportation"
+    return {"segment": segment, "root_cause": engine.lookup(segment)}
+
+
+# ---- Q3: C&B vs revenue over the last two quarters -----------------------
+def _q3_build(df):
+    from utils.schema_registry import apply_schema
+    from kpi_engine.pnl_hierarchy import pnl_hierarchy
+    return pnl_hierarchy(apply_schema(df, "pnl"))
+
+
+def _q3_answer(tree, aggregates, params):
+    from questions.question_q3 import cb_comparison
+    segment = params.first('Segment')
+    return cb_comparison(tree, {'Segment': [segment]} if segment is not None else {})
+
+
+# ---- Q8: UT% by level and month --------------------------------------------
+def _q8_build(df):
+    from kpi_engine.ut_engine import ut_engine
+    return ut_engine(df)
+
+
+def _q8_vocabulary(engine):
+    return {column: engine.values(column) for column in ['Segment', 'BU', 'DU']}
+
+
+def _q8_grains(params):
+    filters = tuple((column, params.entities[column]) for column in ['Segment', 'BU', 'DU'] if column in params.entities)
+    return [(params.level or "BU", filters)]
+
+
+def _q8_aggregate(engine, grain):
+    from questions.question_q8 import ut_tables
+    level, filters = grain
+    return ut_tables(engine, level, {column: list(values) for column, values in filters})
+
+
+def _q8_answer(engine, aggregates, params):
+    (grain,) = _q8_grains(params)
+    return dict(aggregates[grain], level=grain[0])
+
+
+QUESTION_SPECS = {
+    "Q1": QuestionSpec("pnl", "margin_rows", _q1_build, _no_vocabulary,
+                       lambda params: list(Q1_GROUPS), _q1_aggregate, _q1_answer),
+    "Q2": QuestionSpec("pnl", "margin_root_cause", _q2_build,
+                       lambda engine: {'Segment': engine.segments}, _no_grains, None, _q2_answer),
+    "Q3": QuestionSpec("pnl", "pnl_hierarchy", _q3_build,
+                       lambda tree: {'Segment': tree.values('Segment')}, _no_grains, None, _q3_answer),
+    "Q8": QuestionSpec("ut", "ut_engine", _q8_build, _q8_vocabulary, _q8_grains, _q8_aggregate, _q8_answer),
+}
+
+
+def resolve_intents(questions, matcher=None):
+    """
+    (qid, matched_prompt, score) per question: rule overrides first, then one
+    batched matcher call for the rest. `matcher` takes a list of questions
+    (default: semantic_matcher.find_best_matching_qids).
+    """
+    intents = [rule_override(q) for q in questions]
+    pending = [i for i, intent in enumerate(intents) if intent is None]
+    if pending:
+        if matcher is None:
+            from utils.semantic_matcher import find_best_matching_qids as matcher
+        for i, match in zip(pending, matcher([questions[i] for i in pending])):
+            intents[i] = tuple(match)
+    return intents
+
+
+def _run_all(pool, tasks: dict) -> dict:
+    """Run {key: fn} on the pool; returns {key: (value, error)}."""
+    futures = {key: pool.submit(fn) for key, fn in tasks.items()}
+    results = {}
+    for key, future in futures.items():
+        try:
+            results[key] = (future.result(), None)
+        except Exception as e:
+            results[key] = (None, e)
+    return results
+
+
+def _load(source):
+    if source is None:
+        raise ValueError("not provided")
+    return source() if callable(source) else source
+
+
+def run_batch(questions, datasets: dict, matcher=None, max_workers: int = None) -> list:
+    """
+    Answer many questions with shared work, e.g. every segment x Q1/Q2/Q3/Q8
+    for a scheduled report. Returns one BatchAnswer per question, in order.
+
+    `datasets` maps 'pnl' / 'ut' to a DataFrame or a zero-argument loader.
+    Intents are resolved in one batched matcher call. Each dataset is loaded,
+    each engine built and each (engine, grain) aggregation computed once,
+    concurrently, so the batch takes about as long as its slowest question.
+    Failures are reported per question in BatchAnswer.error.
+    """
+    questions = list(questions)
+    intents = resolve_intents(questions, matcher)
+    specs = [QUESTION_SPECS.get(qid) for qid, _, _ in intents]
+
+    with ThreadPoolExecutor(max_workers=max_workers or BATCH_WORKERS) as pool:
+        # 1) datasets, then 2) one shared engine per (dataset, state)
+        needed = {spec.dataset for spec in specs if spec}
+        frames = _run_all(pool, {name: (lambda source=datasets.get(name): _load(source)) for name in needed})
+        state_tasks = {}
+        for spec in specs:
+            if spec and (spec.dataset, spec.state) not in state_tasks:
+                frame, error = frames[spec.dataset]
+                if error is not None:
+                    continue
+                state_tasks[(spec.dataset, spec.state)] = lambda build=spec.build, df=frame: build(df)
+        states = _run_all(pool, state_tasks)
+
+        # 3) parameters against each engine's vocabulary, 4) one aggregation per (engine, grain)
+        params, aggregate_tasks = [], {}
+        for question, spec in zip(questions, specs):
+            state = states.get((spec.dataset, spec.state), (None, None))[0] if spec else None
+            if spec is None or state is None:
+                params.append(extract_params(question))
+                continue
+            question_params = extract_params(question, spec.vocabulary(state))
+            params.append(question_params)
+            for grain in spec.grains(question_params):
+                key = (spec.dataset, spec.state, grain)
+                if key not in aggregate_tasks:
+                    aggregate_tasks[key] = lambda fn=spec.aggregate, state=state, grain=grain: fn(state, grain)
+        aggregates = _run_all(pool, aggregate_tasks)
+
+    # 5) per-question answers from the shared results (cheap)
+    answers = []
+    for question, (qid, prompt, score), spec, question_params in zip(questions, intents, specs, params):
+        result, error = None, None
+        if qid is None:
+            error = "No matching question for this prompt."
+        elif spec is None:
+            error = f"{qid} is not available in batch mode."
+        elif frames[spec.dataset][1] is not None:
+            error = f"Dataset '{spec.dataset}' unavailable: {frames[spec.dataset][1]}"
+        elif states[(spec.dataset, spec.state)][1] is not None:
+            error = str(states[(spec.dataset, spec.state)][1])
+        else:
+            state = states[(spec.dataset, spec.state)][0]
+            shared = {}
+            for grain in spec.grains(question_params):
+                value, grain_error = aggregates[(spec.dataset, spec.state, grain)]
+                if grain_error is not None:
+                    error = str(grain_error)
+                    break
+                shared[grain] = value
+            if error is None:
+                try:
+                    result = spec.answer(state, shared, question_params)
+                except Exception as e:
+                    error = str(e)
+        answers.append(BatchAnswer(question, qid, prompt, score, question_params, result, error))
+    return answers
@@ -0,0 +1,193 @@
+# utils/calendar_dim.py
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# Fiscal year runs Apr–Mar (Apr–Jun = Q1); FY is named after the year it ends in
+FISCAL_YEAR_START_MONTH = 4
+
+MONTH_LABELS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+MONTH_NUMBER_BY_LABEL = {label: i + 1 for i, label in enumerate(MONTH_LABELS)}
+
+
+def _fiscal_quarter(month_num: int) -> str:
+    return f"Q{((month_num - FISCAL_YEAR_START_MONTH) % 12) // 3 + 1}"
+
+
+# Fiscal quarter for label-only data (e.g. the precomputed 'Jan'..'Dec' tables)
+FISCAL_QUARTER_BY_LABEL = {label: _fiscal_quarter(num) for label, num in MONTH_NUMBER_BY_LABEL.items()}
+
+DEFAULT_START_YEAR = 2000
+DEFAULT_END_YEAR = 2050
+
+
+def month_key(year: int, month: int) -> int:
+    """Integer month key: consecutive months have consecutive keys."""
+    return int(year) * 12 + int(month) - 1
+
+
+def fiscal_quarter_key(keys):
+    """
+    Integer fiscal-quarter key of month keys (scalar or array): consecutive
+    fiscal quarters have consecutive keys, across fiscal years.
+    """
+    return (keys - (FISCAL_YEAR_START_MONTH - 1)) // 3
+
+
+def month_key_of(ts) -> int:
+    ts = pd.Timestamp(ts)
+    return month_key(ts.year, ts.month)
+
+
+@lru_cache(maxsize=8)
+def build_calendar(start_year: int = DEFAULT_START_YEAR, end_year: int = DEFAULT_END_YEAR) -> pd.DataFrame:
+    """
+    Calendar dimension with one row per month, indexed by month key.
+
+    Columns: MonthStart, Year, MonthNum, MonthLabel, MonthPeriod,
+    CalendarQuarter ('2025Q2'), CalendarQuarterPeriod, YearPeriod,
+    FiscalYear ('FY26'), FiscalQuarter ('Q1'), FiscalQuarterLabel
+    ('FY26Q1'), FiscalMonthOrder (Apr = 1) and SortOrder.
+    """
+    starts = pd.date_range(f"{start_year}-01-01", f"{end_year}-12-01", freq="MS")
+    months = starts.month.to_numpy()
+    years = starts.year.to_numpy()
+    fiscal_year = years + (months >= FISCAL_YEAR_START_MONTH).astype(int)
+    fiscal_quarter = np.array([_fiscal_quarter(m) for m in range(1, 13)])[months - 1]
+    fiscal_year_label = np.char.add("FY", np.char.zfill((fiscal_year % 100).astype(str), 2))
+
+    keys = years * 12 + months - 1
+    calendar = pd.DataFrame({
+        "MonthStart": starts,
+        "Year": years,
+        "MonthNum": months,
+        "MonthLabel": np.array(MONTH_LABELS)[months - 1],
+        "MonthPeriod": starts.to_period("M"),
+        "CalendarQuarter": starts.to_period("Q").astype(str),
+        "CalendarQuarterPeriod": starts.to_period("Q"),
+        "YearPeriod": starts.to_period("Y"),
+        "FiscalYear": fiscal_year_label,
+        "FiscalQuarter": fiscal_quarter,
+        "FiscalQuarterLabel": np.char.add(fiscal_year_label, fiscal_quarter),
+        "FiscalMonthOrder": (months - FISCAL_YEAR_START_MONTH) % 12 + 1,
+        "SortOrder": keys,
+    }, index=pd.Index(keys, name="MonthKey"))
+    return calendar
+
+
+def month_keys(dates) -> np.ndarray:
+    """
+    Month keys for a datetime-like sequence (-1 for NaT). Datetime work is
+    done once per distinct value, not per row.
+    """
+    codes, uniques = pd.factorize(pd.Series(dates), use_na_sentinel=True)
+    uniques = pd.DatetimeIndex(uniques)
+    unique_keys = (uniques.year * 12 + uniques.month - 1).to_numpy(dtype=np.int64)
+    keys = np.full(len(codes), -1, dtype=np.int64)
+    valid = codes >= 0
+    keys[valid] = unique_keys[codes[valid]]
+    return keys
+
+
+def _calendar_for(keys: np.ndarray) -> pd.DataFrame:
+    valid = keys[keys >= 0]
+    start, end = DEFAULT_START_YEAR, DEFAULT_END_YEAR
+    if len(valid):
+        start = min(start, int(valid.min()) // 12)
+        end = max(end, int(valid.max()) // 12)
+    return build_calendar(start, end)
+
+
+def attach_periods(dates, fields) -> pd.DataFrame:
+    """
+    Look up calendar fields for each date by integer month key.
+    Returns a frame aligned with `dates` (missing dates give NA).
+    """
+    index = dates.index if isinstance(dates, pd.Series) else None
+    keys = month_keys(dates)
+    calendar = _calendar_for(keys)
+    positions = np.where(keys >= 0, keys - calendar.index[0], -1)
+
+    out = {}
+    for field in ([fields] if isinstance(fields, str) else fields):
+        # take() with allow_fill maps -1 (NaT) to the field's NA value
+        out[field] = calendar[field].array.take(positions, allow_fill=True)
+    return pd.DataFrame(out, index=index)
+
+
+def period_of(dates, field: str) -> pd.Series:
+    """Single calendar field for each date, e.g. period_of(df['Month'], 'CalendarQuarter')."""
+    return attach_periods(dates, [field])[field]
+
+
+def period_at(key: int, field: str):
+    """Calendar field of a single month key."""
+    return _calendar_for(np.array([key]))[field].loc[key]
+
+
+# ---------------------------------------------------------------------
+# Relative periods ("last quarter", "previous month", "last 3 months").
+#
+# The anchor is the latest reported month. In the P&L/UT extracts that
+# month *is* "last month" / "this quarter" in business usage, so
+# this/current/latest/last all resolve to the period containing the
+# anchor, and previous/prior to the one before it.
+# ---------------------------------------------------------------------
+PeriodRange = namedtuple("PeriodRange", ["start_key", "end_key", "grain", "label"])
+
+_RELATIVE_RE = re.compile(
+    r"\b(?:(this|current|latest|last|previous|prior)\s+(?:(\d+)\s+)?(month|quarter|year)s?|(mom|qoq|yoy))\b",
+    re.IGNORECASE,
+)
+_GRAIN_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+
+
+def _period_start(key: int, grain: str, fiscal: bool) -> int:
+    if grain == "month":
+        return key
+    month_index = key % 12
+    if fiscal:
+        month_index = (month_index - (FISCAL_YEAR_START_MONTH - 1)) % 12
+    span = _GRAIN_MONTHS[grain]
+    return key - month_index % span
+
+
+def resolve_relative_period(text: str, anchor, fiscal: bool = False):
+    """
+    Resolve the first relative period in `text` against `anchor` (the latest
+    reported month). Returns a PeriodRange of month keys, or None.
+    """
+    match = _RELATIVE_RE.search(text or "")
+    if not match:
+        return None
+    anchor_key = anchor if isinstance(anchor, (int, np.integer)) else month_key_of(anchor)
+    word, count, grain, shorthand = match.groups()
+    if shorthand:
+        # "MoM/QoQ/YoY" compare the latest period with the previous one
+        grain = {"mom": "month", "qoq": "quarter", "yoy": "year"}[shorthand.lower()]
+        word, count = "last", "2"
+    grain = grain.lower()
+    span = _GRAIN_MONTHS[grain]
+
+    current_start = _period_start(anchor_key, grain, fiscal)
+    if count:
+        # "last 3 months": N periods ending with the anchor's period
+        start = current_start - (int(count) - 1) * span
+        end = current_start + span - 1
+    elif word.lower() in ("previous", "prior"):
+        start = current_start - span
+        end = current_start - 1
+    else:
+        start = current_start
+        end = current_start + span - 1
+    end = min(end, anchor_key)
+    return PeriodRange(int(start), int(end), grain, match.group(0))
+
+
+def month_range_mask(dates, period: PeriodRange) -> np.ndarray:
+    """Boolean mask of the dates falling inside a resolved PeriodRange."""
+    keys = month_keys(dates)
+    return (keys >= period.start_key) & (keys <= period.end_key)
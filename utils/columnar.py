@@ -0,0 +1,114 @@
+# utils/columnar.py
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from io import BytesIO
+
+# Layout of the precomputed KPI tables: string dimensions are stored as
+# dictionary-encoded (categorical) columns, measures as float64.
+PRECOMPUTED_TABLES = {
+    "revenue": {
+        "dimensions": ["FinalCustomerName", "Segment", "BU", "DU", "Month"],
+        "measures": ["Revenue"],
+    },
+    "netavailablehours": {
+        "dimensions": ["FinalCustomerName", "Segment", "BU", "DU", "Month"],
+        "measures": ["NetAvailableHours"],
+    },
+    "headcount": {
+        "dimensions": ["FinalCustomerName", "Segment", "BU", "DU", "Month"],
+        "measures": ["Headcount"],
+    },
+    # MonthKey (year * 12 + month - 1) is kept as an integer column
+    "fresher_cohort": {
+        "dimensions": ["FresherAgeingCategory", "Segment", "BU", "DU"],
+        "measures": ["TotalBillableHours", "NetAvailableHours"],
+    },
+}
+
+PARQUET_COMPRESSION = "zstd"
+
+
+def parquet_object_name(table_name: str) -> str:
+    """GCS object / file name of a precomputed table in Parquet form."""
+    return f"{table_name}.parquet"
+
+
+def csv_object_name(table_name: str) -> str:
+    """Legacy CSV object / file name of a precomputed table."""
+    return f"{table_name}.csv"
+
+
+def _clean_measure(series: pd.Series) -> pd.Series:
+    # Legacy CSV exports may carry '$' and thousands separators
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    cleaned = series.astype(str).str.replace(r"[\$,]", "", regex=True).str.strip()
+    return pd.to_numeric(cleaned, errors="coerce")
+
+
+def to_typed_frame(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """
+    Normalize a precomputed KPI table to its typed layout:
+    stripped column names (including a UTF-8 BOM), categorical dimensions
+    and float measures. Unknown extra columns are kept untouched.
+    """
+    layout = PRECOMPUTED_TABLES[table_name]
+    df = df.copy()
+    df.columns = [str(c).replace("\ufeff", "").strip() for c in df.columns]
+
+    for col in layout["dimensions"]:
+        if col in df.columns:
+            values = df[col]
+            df[col] = values.where(values.isna(), values.astype(str).str.strip()).astype("category")
+
+    for col in layout["measures"]:
+        if col in df.columns:
+            df[col] = _clean_measure(df[col])
+
+    return df
+
+
+def write_parquet(df: pd.DataFrame, destination, table_name: str = None) -> None:
+    """
+    Write a DataFrame as compressed Parquet. If `table_name` is given the
+    frame is first converted to the typed layout of that table.
+    """
+    if table_name is not None:
+        df = to_typed_frame(df, table_name)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, destination, compression=PARQUET_COMPRESSION)
+
+
+def read_parquet(source, columns: list = None) -> pd.DataFrame:
+    """
+    Read a Parquet file/buffer with pyarrow's multithreaded reader.
+    Dictionary-encoded columns come back as pandas categoricals.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    table = pq.read_table(source, columns=columns, use_threads=True)
+    return table.to_pandas()
+
+
+def load_precomputed_table(bucket, table_name: str) -> pd.DataFrame:
+    """
+    Load a precomputed KPI table from a GCS bucket.
+
+    Reads `<table_name>.parquet` when present; otherwise falls back to the
+    legacy `<table_name>.csv` and converts it to the same typed layout.
+    """
+    blob = bucket.blob(parquet_object_name(table_name))
+    if blob.exists():
+        return read_parquet(blob.download_as_bytes())
+
+    csv_file = csv_object_name(table_name)
+    blob = bucket.blob(csv_file)
+    if not blob.exists():
+        raise FileNotFoundError(f"File not found in GCS: {csv_file}")
+    with BytesIO() as buffer:
+        blob.download_to_file(buffer)
+        buffer.seek(0)
+        df = pd.read_csv(buffer, encoding="utf-8-sig")
+    return to_typed_frame(df, table_name)
@@ -0,0 +1,237 @@
+# utils/dataset_version.py
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from google.cloud import storage
+from dotenv import load_dotenv
+
+load_dotenv('.env.template')
+
+# Objects whose metadata defines the current dataset version
+WATCHED_OBJECTS = [
+    "LnTPnL.xlsx",
+    "LNTData.xlsx",
+    "revenue.parquet",
+    "netavailablehours.parquet",
+    "headcount.parquet",
+    "fresher_cohort.parquet",
+]
+
+# Version token served when the source metadata is unreachable
+UNVERSIONED = "unversioned"
+
+POLL_INTERVAL_SECONDS = float(os.getenv("DATASET_POLL_SECONDS", "300"))
+
+# After the version service fails to start (metadata unreachable), how long
+# callers get the cached error before it is constructed again
+SERVICE_RETRY_SECONDS = float(os.getenv("DATASET_RETRY_SECONDS", "300"))
+
+
+class GCSMetadataBackend:
+    """Fingerprints bucket objects from their metadata (no download)."""
+
+    def __init__(self, bucket=None):
+        self._bucket = bucket
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            client = storage.Client.from_service_account_info(
+                json.loads(os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON")))
+            self._bucket = client.bucket(os.getenv("GCS_BUCKET_NAME"))
+        return self._bucket
+
+    def fingerprint(self, name):
+        blob = self.bucket.get_blob(name)
+        if blob is None:
+            return None
+        return f"{blob.generation}:{blob.etag}"
+
+
+class LocalFileBackend:
+    """Fingerprints files of a local directory standing in for the bucket."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def fingerprint(self, name):
+        try:
+            stat = os.stat(os.path.join(self.root, name))
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def default_backend():
+    """GCS metadata backend unless DATASET_BACKEND=local is configured."""
+    if os.getenv("DATASET_BACKEND", "gcs").lower() == "local":
+        return LocalFileBackend(os.getenv("LOCAL_DATA_DIR", "sample_data"))
+    return GCSMetadataBackend()
+
+
+class DatasetVersionService:
+    """
+    Tracks the version of the source datasets.
+
+    The version token is a hash of the watched objects' metadata. When it
+    changes, every registered builder is run with the new token first (in
+    the calling/background thread) and only then is the token swapped in,
+    so readers never see a version whose data is not built yet. Caches
+    keyed on the token drop stale derived state lazily.
+    """
+
+    def __init__(self, backend, objects=None, poll_interval=POLL_INTERVAL_SECONDS):
+        self.backend = backend
+        self.objects = list(objects or WATCHED_OBJECTS)
+        self.poll_interval = poll_interval
+        self._builders = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._fingerprints = self._read_fingerprints()
+        self._version = self._token(self._fingerprints)
+
+    @property
+    def version(self) -> str:
+        with self._lock:
+            return self._version
+
+    def register_builder(self, name, fn):
+        """Register (or replace) a builder called as fn(new_version) before a swap."""
+        self._builders[name] = fn
+
+    def _read_fingerprints(self):
+        return {name: self.backend.fingerprint(name) for name in self.objects}
+
+    @staticmethod
+    def _token(fingerprints):
+        payload = json.dumps(fingerprints, sort_keys=True).encode()
+        return hashlib.sha1(payload).hexdigest()[:12]
+
+    def refresh(self) -> bool:
+        """Check the metadata once; build and swap in a new version if it changed."""
+        with self._refresh_lock:
+            fingerprints = self._read_fingerprints()
+            token = self._token(fingerprints)
+            if token == self.version:
+                return False
+
+            for builder in list(self._builders.values()):
+                builder(token)
+
+            with self._lock:
+                self._fingerprints = fingerprints
+                self._version = token
+            return True
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the current version; retry on the next poll
+                continue
+
+    def start(self):
+        if self.poll_interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll, name="dataset-version-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+class VersionedCache:
+    """
+    In-process cache for derived state (indexes, cubes, question results)
+    keyed on the dataset version. Entries built for an older version are
+    dropped the first time the cache is touched after a swap. With
+    `max_entries`, the least recently used entries are evicted beyond it.
+    """
+
+    def __init__(self, version_fn=None, max_entries: int = None):
+        self._version_fn = version_fn or current_version
+        self._version = None
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def _sync_version(self):
+        version = self._version_fn()
+        if version != self._version:
+            self._entries = OrderedDict()
+            self._version = version
+        return version
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            version = self._sync_version()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = compute()
+        with self._lock:
+            # Don't store a value computed against a version swapped out meanwhile
+            if self._sync_version() == version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                if self._max_entries is not None:
+                    while len(self._entries) > self._max_entries:
+                        self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+
+    def __len__(self):
+        with self._lock:
+            self._sync_version()
+            return len(self._entries)
+
+
+_service = None
+_service_error = None
+_service_failed_at = 0.0
+_service_lock = threading.Lock()
+
+
+def get_dataset_service() -> DatasetVersionService:
+    """
+    Process-wide version service, shared by all Streamlit sessions. A failed
+    construction is remembered for SERVICE_RETRY_SECONDS: current_version()
+    runs on every cache access and must not block on an unreachable bucket
+    each time.
+    """
+    global _service, _service_error, _service_failed_at
+    with _service_lock:
+        if _service is None:
+            if _service_error is not None and time.monotonic() - _service_failed_at < SERVICE_RETRY_SECONDS:
+                # A fresh error each time: re-raising one instance would grow its
+                # traceback, and keep every caller's frame alive, on each call
+                raise RuntimeError(f"Dataset version service unavailable: {_service_error}")
+            try:
+                _service = DatasetVersionService(default_backend())
+            except Exception as e:
+                _service_error, _service_failed_at = repr(e), time.monotonic()
+                raise
+            _service_error = None
+            _service.start()
+        return _service
+
+
+def current_version() -> str:
+    """Current dataset version token (UNVERSIONED if metadata is unreachable)."""
+    try:
+        return get_dataset_service().version
+    except Exception:
+        return UNVERSIONED
@@ -0,0 +1,102 @@
+# utils/encoder_service.py
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+import numpy as np
+
+# Texts encoded in one forward pass at most
+ENCODER_MAX_BATCH = int(os.getenv("ENCODER_MAX_BATCH", "64"))
+
+# How long the first request of a batch waits for others to join it
+ENCODER_MAX_WAIT_MS = float(os.getenv("ENCODER_MAX_WAIT_MS", "3"))
+
+_STOP = object()
+
+
+class _Request:
+    def __init__(self, texts):
+        self.texts = texts
+        self.future = Future()
+
+
+class EncoderService:
+    """
+    In-process micro-batching in front of an encoder. Concurrent encode()
+    calls (one per session routing a question) are queued. A single worker
+    thread collects them for up to `max_wait_ms` or `max_batch` texts,
+    encodes them in one forward pass, and hands each caller its rows. That
+    is one batched pass instead of one pass per query, and no contention
+    between sessions for the model's intra-op threads.
+    """
+
+    def __init__(self, encoder, max_batch: int = None, max_wait_ms: float = None):
+        self.encoder = encoder
+        self.max_batch = max_batch or ENCODER_MAX_BATCH
+        self.max_wait_s = (ENCODER_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._loop, name="encoder-service", daemon=True)
+        self._worker.start()
+
+    def encode(self, texts) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return self.encoder.encode(texts)
+        request = _Request(texts)
+        self._queue.put(request)
+        return request.future.result()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def _collect(self, first):
+        """(`first` plus the requests that join it within the wait/size budget, whether to stop)."""
+        batch, size = [first], len(first.texts)
+        deadline = time.monotonic() + self.max_wait_s
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                # Past the deadline, requests already queued still join
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            batch.append(request)
+            size += len(request.texts)
+        return batch, False
+
+    def _loop(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            try:
+                embeddings = self.encoder.encode([text for request in batch for text in request.texts])
+            except BaseException as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            start = 0
+            for request in batch:
+                request.future.set_result(embeddings[start:start + len(request.texts)])
+                start += len(request.texts)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_encoder_service() -> EncoderService:
+    """Process-wide service over utils.encoders.get_encoder(), shared by all sessions."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            from utils.encoders import get_encoder
+            _service = EncoderService(get_encoder())
+        return _service
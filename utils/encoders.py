@@ -0,0 +1,159 @@
+# utils/encoders.py
+
+import os
+import threading
+import warnings
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+HF_MODEL_ID = f"sentence-transformers/{MODEL_NAME}"
+
+# "torch" (sentence-transformers), "onnx" (fp32 ONNX export) or
+# "onnx-int8" (the export with dynamically int8-quantized weights)
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch").lower()
+
+# Exported model files: model.onnx, model_int8.onnx and tokenizer.json (see export_onnx)
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models", MODEL_NAME))
+
+# Intra-op threads of the model (torch or onnxruntime); 0 keeps the library default
+ENCODER_THREADS = int(os.getenv("ENCODER_THREADS", "0"))
+
+# Token limit of all-MiniLM-L6-v2
+MAX_SEQ_LENGTH = 256
+
+
+class EncoderUnavailable(RuntimeError):
+    """The packages or model files of an encoder backend are missing."""
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    return embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+
+def cos_sim(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Cosine similarity matrix of two embedding batches (numpy, no torch)."""
+    return normalize(np.asarray(a, dtype=np.float32)) @ normalize(np.asarray(b, dtype=np.float32)).T
+
+
+class TorchEncoder:
+    """The full-precision sentence-transformers model."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str = MODEL_NAME, threads: int = None):
+        # Imported here rather than at module level: the ONNX backends never load torch
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise EncoderUnavailable(f"torch encoder needs sentence-transformers: {e}") from e
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, texts) -> np.ndarray:
+        return self.model.encode(list(texts), convert_to_numpy=True, normalize_embeddings=True)
+
+
+class OnnxEncoder:
+    """
+    The same model exported to ONNX and run by onnxruntime on CPU. It uses
+    the sentence-transformers pipeline (tokenizer, transformer, mean
+    pooling over the attention mask, L2 normalization) without torch.
+    """
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, quantized: bool = False, threads: int = None):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise EncoderUnavailable(f"ONNX encoder needs onnxruntime and tokenizers: {e}") from e
+
+        path = os.path.join(model_dir, "model_int8.onnx" if quantized else "model.onnx")
+        if not os.path.exists(path):
+            raise EncoderUnavailable(f"{path} not found; export it with benchmarks/bench_encoders.py --export")
+        self.name = "onnx-int8" if quantized else "onnx"
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+    def encode(self, texts) -> np.ndarray:
+        batch = self.tokenizer.encode_batch(list(texts))
+        mask = np.array([e.attention_mask for e in batch], dtype=np.int64)
+        feeds = {"input_ids": np.array([e.ids for e in batch], dtype=np.int64), "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in batch], dtype=np.int64)
+
+        hidden = self.session.run(None, feeds)[0]  # (batch, tokens, dim)
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return normalize(pooled)
+
+
+def export_onnx(out_dir: str = ONNX_MODEL_DIR, model_id: str = HF_MODEL_ID, quantize: bool = True) -> str:
+    """
+    Export the transformer to `out_dir`/model.onnx (plus model_int8.onnx,
+    weights dynamically quantized to int8) with its tokenizer.json. A build
+    step: it needs torch, transformers and onnxruntime, serving only the last.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModel.from_pretrained(model_id).eval()
+
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    sample = tokenizer(["Which accounts had margin below 30%?"], return_tensors="pt")
+    dynamic_axes = {name: {0: "batch", 1: "tokens"} for name in names + ["last_hidden_state"]}
+    path = os.path.join(out_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in names), path, input_names=names,
+                          output_names=["last_hidden_state"], dynamic_axes=dynamic_axes, opset_version=14)
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, "tokenizer.json"))
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(path, os.path.join(out_dir, "model_int8.onnx"), weight_type=QuantType.QInt8)
+    return out_dir
+
+
+def _build(backend: str):
+    threads = ENCODER_THREADS or None
+    if backend == "torch":
+        return TorchEncoder(threads=threads)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEncoder(quantized=backend == "onnx-int8", threads=threads)
+    raise ValueError(f"Unknown encoder backend {backend!r} (expected torch, onnx or onnx-int8)")
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_encoder(backend: str = None):
+    """
+    Process-wide encoder of `backend` (default ENCODER_BACKEND). A missing
+    ONNX model falls back to the torch encoder with a warning, so routing
+    keeps working on a node without the exported files.
+    """
+    backend = (backend or ENCODER_BACKEND).lower()
+    with _encoders_lock:
+        if backend not in _encoders:
+            try:
+                _encoders[backend] = _build(backend)
+            except EncoderUnavailable as e:
+                if backend == "torch":
+                    raise
+                warnings.warn(f"{e}; falling back to the torch encoder.")
+                _encoders[backend] = _encoders.get("torch") or _build("torch")
+                _encoders.setdefault("torch", _encoders[backend])
+        return _encoders[backend]
@@ -1,12 +1,13 @@
 import pandas as pd
+from utils.calendar_dim import period_of
 
 def extract_latest_quarters(date_series, n=2):
-    qtrs = pd.PeriodIndex(date_series.dt.to_period("Q")).unique()
+    qtrs = pd.PeriodIndex(period_of(date_series, "CalendarQuarterPeriod").dropna()).unique()
     qtrs = sorted(qtrs)[-n:]
     return [str(q) for q in qtrs]
 
 def extract_relevant_quarters(df, quarters):
-    df['Quarter'] = df['Date'].dt.to_period('Q').astype(str)
+    df['Quarter'] = period_of(df['Date'], 'CalendarQuarter')
     return df[df['Quarter'].isin(quarters)].copy()
 
 def format_in_inr_cr(value):
@@ -0,0 +1,213 @@
+# utils/intent_classifier.py
+
+import os
+import re
+import hashlib
+import threading
+import warnings
+import joblib
+import numpy as np
+import sklearn
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GroupKFold
+from sklearn.pipeline import make_pipeline, make_union
+from utils.intent_prompts import PROMPTS, PROMPT_QIDS
+
+# Trained router artifact (see train_classifier / benchmarks/bench_router.py --train)
+INTENT_CLASSIFIER_PATH = os.getenv(
+    "INTENT_CLASSIFIER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models", "intent_classifier.joblib"))
+
+# Bumped when the model or its training changes, so that older artifacts are retrained
+MODEL_REVISION = 2
+
+# Folds of the probability calibration; each holds out whole bank prompts
+CALIBRATION_FOLDS = 5
+
+# Label of the out-of-scope class, never routed to
+OUT_OF_SCOPE = "none"
+
+# Interchangeable spellings of the finance vocabulary, used to paraphrase the bank
+SYNONYMS = [
+    ["accounts", "clients", "customers"],
+    ["account", "client", "customer"],
+    ["margin", "cm%", "contribution margin", "gm"],
+    ["headcount", "hc", "fte", "head count"],
+    ["utilization", "ut", "utilisation", "ut%"],
+    ["month over month", "mom", "monthly", "m-o-m"],
+    ["quarter over quarter", "qoq", "quarterly"],
+    ["year over year", "yoy", "yearly"],
+    ["trend", "trends", "movement", "over time"],
+    ["c&b", "c and b", "compensation and benefits"],
+    ["drop", "decline", "fall", "dip"],
+    ["show", "list", "give me", "display"],
+    ["compare", "comparison of", "contrast"],
+    ["below", "less than", "under"],
+    ["segment", "vertical", "industry"],
+    ["cost", "expense", "spend"],
+    ["du", "delivery unit", "bu", "business unit"],
+    ["realized rate", "realised rate", "billing rate"],
+    ["revenue per person", "revenue per head", "revenue per fte"],
+    ["fresher", "freshers", "new joiners", "graduates"],
+]
+
+PREFIXES = ["", "can you show ", "i want to see ", "please tell me "]
+
+# Questions outside every intent, so that off-topic text is predicted as such
+# rather than as its least-unlikely intent
+OUT_OF_SCOPE_EXAMPLES = [
+    "what is the weather today", "hello", "hi there", "thanks", "who are you",
+    "tell me a joke", "export this to excel", "send the report by email",
+    "who is the account manager", "what time is it", "reset my password",
+    "how do i upload a file", "open the dashboard settings", "translate this to french",
+    "what can you do", "summarize this document", "book a meeting room",
+    "where is the office", "what is the holiday list", "restart the app",
+]
+
+
+def _clean(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9%&-]+", str(text).lower()))
+
+
+def augment(prompt: str):
+    """The prompt and rule-based paraphrases: one synonym swapped at a time, with question prefixes."""
+    base = _clean(prompt)
+    variants = {base}
+    for group in SYNONYMS:
+        for term in group:
+            pattern = re.compile(rf"(?<![\w&%-]){re.escape(term)}(?![\w&%-])")
+            if pattern.search(base):
+                variants.update(pattern.sub(other, base) for other in group if other != term)
+    return sorted(prefix + v for v in variants for prefix in PREFIXES)
+
+
+def training_set(prompts=PROMPTS, qids=PROMPT_QIDS):
+    """(texts, labels, groups): a text's group is the bank prompt (or out-of-scope example) it derives from."""
+    texts, labels, groups = [], [], []
+    for group, (prompt, qid) in enumerate(zip(prompts, qids)):
+        for text in augment(prompt):
+            texts.append(text)
+            labels.append(qid)
+            groups.append(group)
+    for group, text in enumerate(OUT_OF_SCOPE_EXAMPLES, start=len(prompts)):
+        texts.append(text)
+        labels.append(OUT_OF_SCOPE)
+        groups.append(group)
+    return texts, labels, groups
+
+
+def training_fingerprint(prompts=PROMPTS, qids=PROMPT_QIDS) -> str:
+    """Identifies the training (data, model revision, scikit-learn version) an artifact came from."""
+    texts, labels, _ = training_set(prompts, qids)
+    payload = "\n".join([f"revision {MODEL_REVISION}", f"sklearn {sklearn.__version__}"] +
+                        [f"{l}\t{t}" for t, l in zip(texts, labels)])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class IntentClassifier:
+    """
+    Router trained on the prompt bank: TF-IDF character 2-5-grams plus word
+    1-2-grams into a logistic regression over the intents (and an
+    out-of-scope class). No sentence-transformer at serving time; the
+    artifact is well under 1 MB of sparse weights and loads in milliseconds.
+    The score is the predicted probability of the intent, abstained on
+    below `threshold` like the embedding matcher's cosine. The probabilities
+    are calibrated on held-out bank prompts: a raw logistic regression fit
+    on paraphrases of its own training prompts is confident (0.9+) even on
+    one-word intent swaps it gets wrong.
+    """
+
+    def __init__(self, pipeline, prompts, qids, fingerprint: str, threshold: float = 0.72):
+        self.pipeline = pipeline
+        self.prompts = list(prompts)
+        self.qids = list(qids)
+        self.fingerprint = fingerprint
+        self.threshold = threshold
+        # Bank prompts in the classifier's feature space, to report the closest one
+        self.prompt_vectors = pipeline[0].transform([_clean(p) for p in self.prompts])
+
+    def matches(self, user_queries):
+        """(qid, matched_prompt, score) of each query; qid None when abstaining."""
+        if not user_queries:
+            return []
+        texts = [_clean(q) for q in user_queries]
+        features = self.pipeline[0].transform(texts)
+        probabilities = self.pipeline[-1].predict_proba(features)
+        # Best intent; probability mass on the out-of-scope class lowers its score
+        intents = [i for i, c in enumerate(self.pipeline[-1].classes_) if c != OUT_OF_SCOPE]
+        classes = [str(self.pipeline[-1].classes_[i]) for i in intents]
+        probabilities = probabilities[:, intents]
+        similarities = (features @ self.prompt_vectors.T).toarray()
+
+        matches = []
+        for row, best in enumerate(probabilities.argmax(axis=1)):
+            qid, score = classes[best], float(probabilities[row, best])
+            in_class = [i for i, q in enumerate(self.qids) if q == qid]
+            prompt_idx = in_class[int(similarities[row, in_class].argmax())]
+            # Apply threshold: if below, treat as no match
+            matches.append((qid if score >= self.threshold else None, self.prompts[prompt_idx], score))
+        return matches
+
+    def save(self, path: str = INTENT_CLASSIFIER_PATH) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        joblib.dump({"pipeline": self.pipeline, "prompts": self.prompts, "qids": self.qids,
+                     "fingerprint": self.fingerprint}, path, compress=3)
+        return path
+
+    @classmethod
+    def load(cls, path: str = INTENT_CLASSIFIER_PATH, threshold: float = 0.72):
+        artifact = joblib.load(path)
+        return cls(artifact["pipeline"], artifact["prompts"], artifact["qids"], artifact["fingerprint"],
+                   threshold=threshold)
+
+
+def train_classifier(prompts=PROMPTS, qids=PROMPT_QIDS, threshold: float = 0.72) -> IntentClassifier:
+    texts, labels, groups = training_set(prompts, qids)
+    features = make_union(
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 5), sublinear_tf=True),
+        TfidfVectorizer(analyzer="word", ngram_range=(1, 2), token_pattern=r"[a-z0-9%&-]+", sublinear_tf=True),
+    )
+    # Sigmoid calibration on folds that hold out whole prompts with all their
+    # paraphrases: a paraphrase of a training prompt would calibrate nothing
+    folds = list(GroupKFold(n_splits=min(CALIBRATION_FOLDS, len(set(groups)))).split(texts, labels, groups))
+    model = CalibratedClassifierCV(LogisticRegression(C=5, max_iter=3000), method="sigmoid", cv=folds)
+    pipeline = make_pipeline(features, model)
+    pipeline.fit(texts, np.array(labels))
+    return IntentClassifier(pipeline, prompts, qids, training_fingerprint(prompts, qids), threshold=threshold)
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier(threshold: float = 0.72) -> IntentClassifier:
+    """
+    Process-wide classifier from INTENT_CLASSIFIER_PATH. A missing,
+    unreadable or stale artifact (other prompt bank, augmentation, model
+    revision or scikit-learn version) is retrained in process and saved,
+    which takes a few seconds.
+    """
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            classifier = None
+            if os.path.exists(INTENT_CLASSIFIER_PATH):
+                try:
+                    with warnings.catch_warnings():
+                        # Pickles of other scikit-learn versions warn; the fingerprint rejects them
+                        warnings.simplefilter("ignore")
+                        classifier = IntentClassifier.load(INTENT_CLASSIFIER_PATH, threshold=threshold)
+                except Exception:
+                    classifier = None  # corrupt or incompatible artifact
+                if classifier is not None and classifier.fingerprint != training_fingerprint():
+                    classifier = None
+            if classifier is None:
+                classifier = train_classifier(threshold=threshold)
+                try:
+                    classifier.save(INTENT_CLASSIFIER_PATH)
+                except OSError:
+                    pass  # read-only deployment: serve the in-memory model
+            _classifier = classifier
+        return _classifier
@@ -0,0 +1,45 @@
+# utils/intent_rules.py
+
+import re
+
+# Rule overrides applied before the matcher's score threshold, shared by
+# the Streamlit router and the batch entry point
+
+# Q1 — "margin % below <N>"
+_Q1_PATTERNS = [
+    r"\b(?:margin|gm|cm)\s*%?\s*<\s*\d+\s*%?",
+    r"\b(?:margin|gm|cm)\s*(?:%|percent|percentage)?\s*(?:less than|below|under)\s*\d+\s*%?",
+    r"\b(?:less than|below|under)\s*\d+\s*%?\s*(?:margin|gm|cm)\b",
+]
+
+# Q3 — "C&B quarter-over-quarter change"
+_Q3_PATTERNS = [
+    r"\bc\s*&\s*b\b.*\b(var(?:y|ied)|change|delta|diff(?:erence)?)\b.*\bquarter\b",
+    r"\bc\s*and\s*b\b.*\b(var(?:y|ied)|change|delta|diff(?:erence)?)\b.*\bquarter\b",
+    r"\bc&b\b.*\bqoq\b",
+    r"\bqoq\b.*\bc&b\b",
+    r"\bcompare\b.*\bc&b\b.*\bquarter\b",
+]
+
+
+def is_q1_margin_below_intent(q: str | None) -> bool:
+    if not q:
+        return False
+    ql = q.lower()
+    return any(re.search(p, ql) for p in _Q1_PATTERNS)
+
+
+def is_q3_cb_variance_intent(q: str | None) -> bool:
+    if not q:
+        return False
+    ql = q.lower()
+    return any(re.search(p, ql) for p in _Q3_PATTERNS)
+
+
+def rule_override(q: str | None):
+    """(qid, matched_prompt, score) of an explicit rule match, else None."""
+    if is_q1_margin_below_intent(q):
+        return "Q1", "Margin % below threshold", 1.0
+    if is_q3_cb_variance_intent(q):
+        return "Q3", "C&B QoQ variation", 1.0
+    return None
@@ -0,0 +1,38 @@
+# utils/lazy_tabs.py
+
+
+def selected_tab(labels, key: str, default: int = 0) -> str:
+    """
+    Label of the tab the user has open, kept in session state under `key`
+    so it survives reruns.
+    """
+    import streamlit as st
+
+    last_key = f"{key}_last"
+    selected = st.segmented_control("View", labels, default=labels[default], key=key,
+                                    label_visibility="collapsed")
+    if selected is None:
+        # Clicking the open tab again deselects it; keep showing that tab
+        selected = st.session_state.get(last_key, labels[default])
+    st.session_state[last_key] = selected
+    return selected
+
+
+def lazy_tabs(labels, key: str, show, default: int = 0):
+    """
+    Tab strip that computes only the open tab.
+
+    st.tabs() runs the code of every tab on every rerun (the browser only
+    hides the inactive ones). Here the open tab is an explicit selection
+    and `show(label)` runs for that tab alone. The strip is a fragment:
+    switching tabs reruns just the strip, not the script (no re-routing,
+    reloading, or recomputing the rest of the view). `show` memoizes its
+    results, e.g. with cached_result() keyed on the tab and parameters.
+    """
+    import streamlit as st
+
+    @st.fragment
+    def strip():
+        show(selected_tab(labels, key, default))
+
+    strip()
@@ -0,0 +1,129 @@
+# utils/lexical_matcher.py
+
+import os
+import re
+import threading
+from rapidfuzz import fuzz, process
+from sklearn.feature_extraction.text import TfidfVectorizer
+from utils.intent_prompts import PROMPTS, PROMPT_QIDS, SUGGESTED_PROMPTS
+
+# Confidence a lexical match needs to skip the embedding model. Calibrated with
+# benchmarks/bench_lexical_matcher.py: no wrong route from 0.75 up on its
+# labelled set; the default keeps a margin above that
+LEXICAL_THRESHOLD = float(os.getenv("LEXICAL_THRESHOLD", "0.85"))
+
+# Confidence of a keyword hit
+KEYWORD_SCORE = 0.95
+
+# Phrases that decide the intent on their own: (pattern, qid, prompt reported as matched)
+KEYWORD_INTENTS = [
+    (r"\brealized rate", "Q6", "Realized Rate"),
+    (r"\brevenue per (person|head|fte)\b", "Q9", "Revenue Per Person"),
+    (r"\bfreshers?\b", "Q10", "fresher ut trend"),
+]
+
+# The bank plus the app's suggested prompts, which users submit verbatim
+_PROMPTS = PROMPTS + [p for p in SUGGESTED_PROMPTS if p not in PROMPTS]
+_QIDS = PROMPT_QIDS + [SUGGESTED_PROMPTS[p] for p in _PROMPTS[len(PROMPTS):]]
+
+
+def normalize_text(text: str) -> str:
+    """Lower-cased words; % and & kept (UT%, C&B), other punctuation dropped."""
+    return " ".join(re.findall(r"[a-z0-9%&]+", str(text).lower()))
+
+
+class LexicalMatcher:
+    """
+    First routing stage over the prompt bank. A query is answered here when
+    it is a (near-)copy of a bank prompt, which the "Try asking" buttons
+    produce, or contains a keyword of exactly one intent. Anything else
+    returns None and goes to the embedding model.
+
+    Near-copies are scored by two views of the text: the RapidFuzz
+    token-sort ratio to the closest prompt and the TF-IDF cosine of
+    character 3-5-grams (robust to typos and word forms). Both must pick
+    the same intent; the confidence is then the higher of the two. Swapping
+    one word can change the intent ("revenue" for "margin" in a Q1 prompt)
+    while barely moving either score, so a query using a bank word that
+    none of the intent's prompts use is deferred.
+    """
+
+    def __init__(self, prompts=_PROMPTS, qids=_QIDS, threshold: float = None,
+                 keywords=KEYWORD_INTENTS):
+        self.prompts = list(prompts)
+        self.qids = list(qids)
+        self.threshold = LEXICAL_THRESHOLD if threshold is None else threshold
+        self.keywords = [(re.compile(pattern), qid, prompt) for pattern, qid, prompt in keywords]
+
+        self.normalized = [normalize_text(p) for p in self.prompts]
+        self.exact = {}
+        for i, text in enumerate(self.normalized):
+            self.exact.setdefault(text, i)
+        self.vocabulary = {}
+        for qid, text in zip(self.qids, self.normalized):
+            self.vocabulary.setdefault(qid, set()).update(text.split())
+        self.terms = set().union(*self.vocabulary.values())
+        self.vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True)
+        self.prompt_vectors = self.vectorizer.fit_transform(self.normalized)
+
+        self._lock = threading.Lock()
+        self.fast = 0
+        self.deferred = 0
+
+    def score(self, query: str):
+        """(qid, matched_prompt, confidence) of the best lexical match, whatever the threshold."""
+        text = normalize_text(query)
+        if text in self.exact:
+            i = self.exact[text]
+            return self.qids[i], self.prompts[i], 1.0
+
+        hits = {(qid, prompt) for pattern, qid, prompt in self.keywords if pattern.search(text)}
+        if len({qid for qid, _ in hits}) == 1:
+            qid, prompt = hits.pop()
+            return qid, prompt, KEYWORD_SCORE
+
+        _, fuzzy, fuzzy_idx = process.extractOne(text, self.normalized, scorer=fuzz.token_sort_ratio)
+        similarities = (self.prompt_vectors @ self.vectorizer.transform([text]).T).toarray().ravel()
+        tfidf_idx = int(similarities.argmax())
+        qid = self.qids[tfidf_idx]
+        foreign = (set(text.split()) & self.terms) - self.vocabulary[qid]
+        if self.qids[fuzzy_idx] != qid or foreign:
+            return qid, self.prompts[tfidf_idx], 0.0
+        if fuzzy / 100 >= similarities[tfidf_idx]:
+            return self.qids[fuzzy_idx], self.prompts[fuzzy_idx], fuzzy / 100
+        return self.qids[tfidf_idx], self.prompts[tfidf_idx], float(similarities[tfidf_idx])
+
+    def match(self, query: str):
+        """(qid, matched_prompt, confidence) when confident, else None (defer to the embeddings)."""
+        qid, prompt, confidence = self.score(query)
+        confident = confidence >= self.threshold
+        with self._lock:
+            if confident:
+                self.fast += 1
+            else:
+                self.deferred += 1
+        return (qid, prompt, confidence) if confident else None
+
+    def stats(self) -> dict:
+        """Queries answered here vs deferred since start, and the fast-path share."""
+        with self._lock:
+            total = self.fast + self.deferred
+            return {"fast": self.fast, "deferred": self.deferred,
+                    "share": self.fast / total if total else 0.0}
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_lexical_matcher() -> LexicalMatcher:
+    """Process-wide matcher over the intent prompt bank."""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = LexicalMatcher()
+        return _matcher
+
+
+def fast_path_stats() -> dict:
+    return get_lexical_matcher().stats()
@@ -0,0 +1,172 @@
+# utils/parallel_agg.py
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils.calendar_dim import month_keys
+from utils.groupby_kernels import GroupKeys, group_keys
+
+# Worker processes for partitioned aggregation (KPI_WORKERS=1 disables the pool)
+KPI_WORKERS = int(os.getenv("KPI_WORKERS", os.cpu_count() or 1))
+
+# Below this many rows, partitioning and pickling cost more than they save
+PARALLEL_MIN_ROWS = int(os.getenv("KPI_PARALLEL_MIN_ROWS", "500000"))
+
+SUPPORTED_AGGS = ("sum", "count", "size", "mean", "nunique")
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool shared by all aggregations (recreated if the size changes)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def partition_by_month(df: pd.DataFrame, month_col: str, n_partitions: int):
+    """
+    Row positions per partition; every month lands in exactly one partition.
+    `month_col` is a datetime column or an already derived month label/period.
+    Rows without a month (NaT, unparseable) go to the first partition: they
+    still count towards groups that don't key on the month.
+    """
+    if pd.api.types.is_datetime64_any_dtype(df[month_col]):
+        codes = month_keys(df[month_col])
+    else:
+        codes = pd.factorize(df[month_col])[0]
+    months = np.unique(codes[codes >= 0])
+    # Spread months round-robin so multi-year extracts balance across workers
+    slot = np.zeros(len(df), dtype=np.int64)
+    slot[codes >= 0] = np.searchsorted(months, codes[codes >= 0]) % n_partitions
+    return [np.flatnonzero(slot == i) for i in range(min(n_partitions, len(months)))]
+
+
+def partition_by_hash(df: pd.DataFrame, column: str, n_partitions: int):
+    """Row positions per partition; every value of `column` lands in exactly one partition."""
+    hashes = pd.util.hash_pandas_object(df[column], index=False).to_numpy()
+    slot = (hashes % np.uint64(n_partitions)).astype(np.int64)
+    return [np.flatnonzero(slot == i) for i in range(n_partitions)]
+
+
+def partial_aggregate(part: pd.DataFrame, keys, aggs, additive_nunique, grouper=None):
+    """
+    Mergeable partial results for one partition (or chunk).
+
+    sum/count/size/mean become sums and counts; nunique becomes a per-group
+    count when partitions can't share a value, otherwise the distinct
+    (keys, value) pairs themselves.
+    """
+    grouper = grouper or GroupKeys(part, keys)
+    partial = grouper.index_frame()
+    pairs = {}
+    for name, (column, how) in aggs.items():
+        if how == "sum":
+            partial[name] = grouper.sum(part[column])
+        elif how == "count":
+            partial[name] = grouper.count(part[column])
+        elif how == "size":
+            partial[name] = grouper.size()
+        elif how == "mean":
+            partial[f"{name}__sum"] = grouper.sum(part[column])
+            partial[f"{name}__count"] = grouper.count(part[column])
+        elif how == "nunique" and column in additive_nunique:
+            partial[name] = grouper.nunique(part[column])
+        else:
+            pairs[name] = part[keys + [column]].dropna().drop_duplicates()
+    return partial, pairs
+
+
+def combine_partials(partials, keys, aggs, additive_nunique):
+    """Fold several partial results into one partial result (same shape)."""
+    combined = pd.concat([p for p, _ in partials], ignore_index=True)
+    grouper = GroupKeys(combined, keys)
+    partial = grouper.index_frame()
+    for column in combined.columns.difference(keys, sort=False):
+        partial[column] = grouper.sum(combined[column])
+
+    pairs = {}
+    for name, (column, how) in aggs.items():
+        if how == "nunique" and column not in additive_nunique:
+            pairs[name] = pd.concat([p[name] for _, p in partials], ignore_index=True).drop_duplicates()
+    return partial, pairs
+
+
+def finalize_partials(partial_result, keys, aggs, additive_nunique) -> pd.DataFrame:
+    """Turn one (combined) partial result into the final aggregate."""
+    partial, pairs = partial_result
+    result = partial[keys].copy()
+    for name, (column, how) in aggs.items():
+        if how == "sum":
+            result[name] = partial[name]
+        elif how in ("count", "size"):
+            result[name] = partial[name].astype(np.int64)
+        elif how == "mean":
+            total, count = partial[f"{name}__sum"], partial[f"{name}__count"]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result[name] = np.where(count > 0, total / count, np.nan)
+        elif column in additive_nunique:
+            result[name] = partial[name].astype(np.int64)
+        else:
+            counts = GroupKeys(pairs[name], keys)
+            counted = counts.index_frame()
+            counted[name] = counts.size()
+            result = result.merge(counted, on=keys, how="left")
+            result[name] = result[name].fillna(0).astype(np.int64)
+    return result
+
+
+def _merge(partials, keys, aggs, additive_nunique):
+    return finalize_partials(combine_partials(partials, keys, aggs, additive_nunique), keys, aggs, additive_nunique)
+
+
+def parallel_aggregate(df: pd.DataFrame, keys, aggs: dict, partition_by: str = "month",
+                       month_col: str = "Date_a", hash_col: str = "PSNo", workers: int = None,
+                       cache_key=None) -> pd.DataFrame:
+    """
+    Grouped aggregation of `df` split into partitions that run in a process pool.
+
+    `aggs` maps output column -> (input column, how) with how in SUPPORTED_AGGS,
+    e.g. {"Headcount": ("PSNo", "nunique")}. `partition_by` is "month" (on
+    `month_col`) or "hash" (on `hash_col`). The result matches
+    df.groupby(keys).agg(...).reset_index(). Small frames are aggregated inline,
+    reusing factorized keys cached under `cache_key` (see group_keys).
+    """
+    keys = list(keys)
+    for name, (column, how) in aggs.items():
+        if how not in SUPPORTED_AGGS:
+            raise ValueError(f"Unsupported aggregation '{how}' for {name}.")
+
+    workers = KPI_WORKERS if workers is None else workers
+    if partition_by == "month":
+        partitions = partition_by_month(df, month_col, workers) if workers > 1 else []
+        # Month-disjoint partitions only keep distinct counts additive when the month is a key
+        additive = {c for c, how in aggs.values() if how == "nunique" and month_col in keys}
+    elif partition_by == "hash":
+        partitions = partition_by_hash(df, hash_col, workers) if workers > 1 else []
+        additive = {hash_col} if any(c == hash_col and how == "nunique" for c, how in aggs.values()) else set()
+    else:
+        raise ValueError(f"Unknown partitioning '{partition_by}'; use 'month' or 'hash'.")
+
+    columns = list(dict.fromkeys(keys + [c for c, _ in aggs.values()]))
+    if workers <= 1 or len(df) < PARALLEL_MIN_ROWS or len(partitions) <= 1:
+        # A single partition: every distinct count is final as computed
+        inline = {c for c, how in aggs.values() if how == "nunique"}
+        grouper = group_keys(df, keys, cache_key)
+        partials = [partial_aggregate(df, keys, aggs, inline, grouper)]
+        return _merge(partials, keys, aggs, inline)
+
+    pool = get_pool(workers)
+    futures = [pool.submit(partial_aggregate, df[columns].iloc[rows], keys, aggs, additive)
+               for rows in partitions if len(rows)]
+    partials = [f.result() for f in futures]
+    return _merge(partials, keys, aggs, additive)
@@ -0,0 +1,185 @@
+# utils/param_extractor.py
+
+import re
+import pandas as pd
+from dataclasses import dataclass, field
+from utils.calendar_dim import _RELATIVE_RE
+from utils.dataset_version import VersionedCache
+
+MONTH_ALIASES = {
+    "jan": 1, "january": 1,
+    "feb": 2, "february": 2,
+    "mar": 3, "march": 3,
+    "apr": 4, "april": 4,
+    "may": 5,
+    "jun": 6, "june": 6,
+    "jul": 7, "july": 7,
+    "aug": 8, "august": 8,
+    "sep": 9, "sept": 9, "september": 9,
+    "oct": 10, "october": 10,
+    "nov": 11, "november": 11,
+    "dec": 12, "december": 12
+}
+
+BELOW_WORDS = ["less than", "lower than", "below", "under"]
+ABOVE_WORDS = ["greater than", "higher than", "more than", "above", "over"]
+LEVEL_WORDS = {"du": "DU", "bu": "BU", "segment": "Segment",
+               "account": "Account", "client": "Account", "customer": "Account"}
+METRIC_WORDS = ["margin", "gm", "cm", "revenue", "cost", "c&b", "c & b", "c and b", "ut", "utilization", "utilisation"]
+
+# Compiled extractors kept per vocabulary for the current dataset version
+_extractor_cache = VersionedCache()
+
+
+@dataclass
+class QuestionParams:
+    """Parameters found in one question. Unset fields are None / empty."""
+    threshold: float = None          # first "below N" / "above N" (or "margin ... N%")
+    comparison: str = None           # 'below' or 'above'
+    month: int = None                # first month mentioned (a "month year" pair wins)
+    year: int = None                 # year of that month, else the first year mentioned
+    months: tuple = ()               # every (month, year or None) in order of appearance
+    relative: str = None             # first relative period, e.g. "last 3 months" or "QoQ"
+    entities: dict = field(default_factory=dict)   # column -> matched values, in order
+    metrics: tuple = ()              # KPI words, e.g. ('margin',)
+    billable: bool = None            # True for "billable", False for "non-billable"
+    location: str = None             # 'onsite' or 'offshore'
+    level: str = None                # breakdown asked for: 'DU', 'BU', 'Segment' or 'Account'
+
+    def first(self, column: str):
+        """First matched value of a vocabulary column (None if there is none)."""
+        values = self.entities.get(column)
+        return values[0] if values else None
+
+    @property
+    def segments(self) -> tuple:
+        return tuple(self.entities.get("Segment", ()))
+
+    @property
+    def month_start(self):
+        """Timestamp of an explicit "month year" mention, e.g. "June 2025"."""
+        for month, year in self.months:
+            if year is not None:
+                return pd.Timestamp(year=year, month=month, day=1)
+        return None
+
+
+def _alternation(words) -> str:
+    # Longest first so "september" wins over "sep"; spaces match any whitespace
+    words = sorted(set(words), key=lambda w: (-len(w), w))
+    return "|".join(r"\s+".join(map(re.escape, w.split())) for w in words)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def _to_float(number: str) -> float:
+    return float(number.replace(",", ""))
+
+
+class ParamExtractor:
+    """
+    One compiled pattern for every parameter a question can carry: months
+    and years, relative periods, thresholds, KPI words, billable/onsite
+    flags, the breakdown level and the values of a vocabulary (e.g. {'Segment': [...]}).
+
+    extract() lowercases the question once and walks it with a single
+    finditer; alternatives are ordered so the most specific one wins at
+    each position (vocabulary values, then "month year", then months).
+    """
+
+    def __init__(self, vocabulary: dict = None):
+        self._values = {}
+        for column, values in (vocabulary or {}).items():
+            for value in values:
+                key = _normalize(value)
+                if key:
+                    self._values.setdefault(key, (column, value))
+        # Thousands separators ("1,000") only in groups of three digits
+        number = r"(?:\d{1,3}(?:,\d{3})+(?!\d)|\d+)(?:\.\d+)?"
+        months = _alternation(MONTH_ALIASES)
+        parts = []
+        if self._values:
+            parts.append(rf"(?P<entity>{_alternation(self._values)})(?!\w)")
+        parts += [
+            rf"(?P<my_month>{months})[\s,'\-]*(?P<my_year>(?:19|20)\d{{2}})(?!\d)",
+            rf"(?P<month>{months})(?!\w)",
+            rf"(?P<relative>{_RELATIVE_RE.pattern})",
+            rf"(?:(?:{_alternation(BELOW_WORDS)})|<)\s*(?P<below>{number})",
+            rf"(?:(?:{_alternation(ABOVE_WORDS)})|>)\s*(?P<above>{number})",
+            rf"(?P<percent>{number})\s*%",
+            rf"(?:fy\s*)?(?P<year>(?:19|20)\d{{2}})(?!\d)",
+            rf"(?P<billable>non[\s\-]?billable|billable)(?!\w)",
+            rf"(?P<location>onsite|offshore)(?!\w)",
+            rf"(?P<metric>{_alternation(METRIC_WORDS)})(?!\w)",
+            rf"(?P<level>{_alternation(LEVEL_WORDS)})s?(?!\w)",
+        ]
+        # Every parameter starts at a word start (or at "<" / ">"), so positions
+        # inside a word are rejected once instead of once per alternative
+        self.pattern = re.compile(r"(?:(?<!\w)|(?=[<>]))(?:" + "|".join(parts) + ")", re.IGNORECASE)
+
+    def extract(self, question: str) -> QuestionParams:
+        params = QuestionParams()
+        text = (question or "").lower()
+        if not text:
+            return params
+        months, years, entities, metrics = [], [], {}, []
+        margin_percent = None
+        for match in self.pattern.finditer(text):
+            kind = match.lastgroup
+            if match.group("my_month") is not None:
+                months.append((MONTH_ALIASES[match.group("my_month")], int(match.group("my_year"))))
+            elif kind == "entity":
+                column, value = self._values[_normalize(match.group("entity"))]
+                if value not in entities.setdefault(column, []):
+                    entities[column].append(value)
+            elif kind == "month":
+                months.append((MONTH_ALIASES[match.group("month")], None))
+            elif match.group("relative") is not None:
+                params.relative = params.relative or match.group("relative")
+            elif kind in ("below", "above"):
+                if params.threshold is None:
+                    params.threshold, params.comparison = _to_float(match.group(kind)), kind
+            elif kind == "percent":
+                # "margin of 25%": only a fallback to an explicit below/above
+                if margin_percent is None and "margin" in metrics:
+                    margin_percent = _to_float(match.group("percent"))
+            elif kind == "year":
+                years.append(int(match.group("year")))
+            elif kind == "billable":
+                if params.billable is None:
+                    params.billable = not match.group("billable").startswith("non")
+            elif kind == "location":
+                params.location = params.location or match.group("location")
+            elif kind == "level":
+                params.level = params.level or LEVEL_WORDS[match.group("level")]
+            elif kind == "metric":
+                metric = _normalize(match.group("metric")).replace("c and b", "c&b").replace("c & b", "c&b")
+                if metric not in metrics:
+                    metrics.append(metric)
+
+        if params.threshold is None and margin_percent is not None:
+            params.threshold = margin_percent
+        # An explicit "month year" beats a bare month anywhere in the question
+        dated = [m for m in months if m[1] is not None]
+        if dated or months:
+            params.month, params.year = (dated or months)[0]
+        if params.year is None and years:
+            params.year = years[0]
+        params.months = tuple(months)
+        params.entities = {column: tuple(values) for column, values in entities.items()}
+        params.metrics = tuple(metrics)
+        return params
+
+
+def get_extractor(vocabulary: dict = None) -> ParamExtractor:
+    """Compiled extractor for a vocabulary, reused for the current dataset version."""
+    key = tuple(sorted((column, tuple(sorted(map(str, values))))
+                       for column, values in (vocabulary or {}).items()))
+    return _extractor_cache.get_or_compute(("param_extractor", key), lambda: ParamExtractor(vocabulary))
+
+
+def extract_params(question: str, vocabulary: dict = None) -> QuestionParams:
+    """Parameters of a question, matching entity values from `vocabulary` (column -> values)."""
+    return get_extractor(vocabulary).extract(question)
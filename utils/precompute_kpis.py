@@ -12,12 +12,16 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # Load environment variables (assumes .env or .env.template exists)
 load_dotenv('.env.template')
 
-# Import functions that now expect a DataFrame directly
+# Import KPI builders
 from kpi_engine.revenue_aggregated import get_revenue_aggregated
 from kpi_engine.net_available_hours_aggregated import get_net_available_hours_aggregated
-from kpi_engine.headcount import get_headcount_data
-from kpi_engine.realized_rate import get_realized_rate_data
-from kpi_engine.revenue_per_person import get_revenue_per_person_data
+from kpi_engine.headcount_aggregated import account_headcount
+from kpi_engine.fresher_cohort import build_fresher_cohort
+from utils.columnar import write_parquet, parquet_object_name
+from utils import streaming_agg
+
+# KPI_STREAMING=1 builds the tables out of core (see utils/streaming_agg.py)
+KPI_STREAMING = os.getenv("KPI_STREAMING", "0") == "1"
 
 # GCS file paths (object names)
 gcs_pnl_file = "LnTPnL.xlsx"
@@ -54,35 +58,67 @@ def load_excel_from_gcs(file_path):
     except Exception as e:
         raise RuntimeError(f"Failed to load data from GCS: {e}")
 
-# Load data from GCS
-print("⏳ Loading data from Google Cloud Storage...")
-df_pnl = load_excel_from_gcs(gcs_pnl_file)
-df_ut = load_excel_from_gcs(gcs_ut_file)
-print("✅ Data loaded successfully from GCS.")
-
-# Precompute and save revenue
-df_revenue = get_revenue_aggregated(df_pnl, df_ut)
-df_revenue.to_csv(os.path.join(precomputed_dir, "revenue.csv"), index=False)
-print("✅ Precomputed revenue.csv saved.")
-
-# Precompute and save net available hours
-df_net_hours = get_net_available_hours_aggregated(df_ut)
-df_net_hours.to_csv(os.path.join(precomputed_dir, "netavailablehours.csv"), index=False)
-print("✅ Precomputed netavailablehours.csv saved.")
-
-# Precompute and save headcount
-df_headcount = get_headcount_data(df_ut)
-df_headcount.to_csv(os.path.join(precomputed_dir, "headcount.csv"), index=False)
-print("✅ Precomputed headcount.csv saved.")
-
-# Precompute and save realized rate
-df_realized = get_realized_rate_data(df_pnl, df_ut)
-df_realized.to_csv(os.path.join(precomputed_dir, "realized_rate.csv"), index=False)
-print("✅ Precomputed realized_rate.csv saved.")
-
-# Precompute and save revenue per person
-df_rpp = get_revenue_per_person_data(df_pnl, df_ut)
-df_rpp.to_csv(os.path.join(precomputed_dir, "revenue_per_person.csv"), index=False)
-print("✅ Precomputed revenue_per_person.csv saved.")
+def download_from_gcs(file_path, destination):
+    """Downloads a GCS object to a local file without loading it into memory."""
+    try:
+        service_account_json = os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON")
+        bucket_name = os.getenv("GCS_BUCKET_NAME")
+
+        if not service_account_json or not bucket_name:
+            raise ValueError("Missing GOOGLE_APPLICATION_CREDENTIALS_JSON or GCS_BUCKET_NAME.")
+
+        client = storage.Client.from_service_account_info(json.loads(service_account_json))
+        blob = client.bucket(bucket_name).blob(file_path)
+
+        if not blob.exists():
+            raise FileNotFoundError(f"File not found in GCS: {file_path}")
+
+        blob.download_to_filename(destination)
+        return destination
+
+    except Exception as e:
+        raise RuntimeError(f"Failed to download data from GCS: {e}")
+
+def build_fact_cache(file_path):
+    """Streams a GCS workbook into a chunked Parquet fact table next to the precomputed tables."""
+    workbook = download_from_gcs(file_path, os.path.join(precomputed_dir, file_path))
+    fact_path = os.path.join(precomputed_dir, streaming_agg.fact_object_name(file_path))
+    rows = streaming_agg.write_fact_parquet(streaming_agg.iter_excel_chunks(workbook), fact_path)
+    os.remove(workbook)
+    print(f"✅ Cached {rows:,} rows of {file_path} as {os.path.basename(fact_path)}.")
+    return fact_path
+
+def save_precomputed(df, table_name):
+    """Writes a precomputed KPI table as typed, zstd-compressed Parquet."""
+    path = os.path.join(precomputed_dir, parquet_object_name(table_name))
+    write_parquet(df, path, table_name=table_name)
+    print(f"✅ Precomputed {parquet_object_name(table_name)} saved.")
+
+if KPI_STREAMING:
+    # Out-of-core mode: bounded memory (STREAM_MEMORY_MB) regardless of extract size
+    print(f"⏳ Streaming KPI builds within {streaming_agg.STREAM_MEMORY_MB} MB...")
+    pnl_fact = build_fact_cache(gcs_pnl_file)
+    ut_fact = build_fact_cache(gcs_ut_file)
+    save_precomputed(streaming_agg.stream_revenue(pnl_fact), "revenue")
+    save_precomputed(streaming_agg.stream_net_available_hours(ut_fact), "netavailablehours")
+    save_precomputed(streaming_agg.stream_headcount(ut_fact), "headcount")
+    save_precomputed(streaming_agg.stream_fresher_cohort(ut_fact), "fresher_cohort")
+else:
+    # Load data from GCS
+    print("⏳ Loading data from Google Cloud Storage...")
+    df_ut = load_excel_from_gcs(gcs_ut_file)
+    print("✅ Data loaded successfully from GCS.")
+
+    # Precompute and save revenue
+    save_precomputed(get_revenue_aggregated(gcs_pnl_file), "revenue")
+
+    # Precompute and save net available hours
+    save_precomputed(get_net_available_hours_aggregated(gcs_ut_file), "netavailablehours")
+
+    # Precompute and save headcount (distinct PSNo per account/segment/BU/DU/month)
+    save_precomputed(account_headcount(df_ut), "headcount")
+
+    # Precompute and save fresher cohort hours (bucket/segment/BU/DU/month) for Q10
+    save_precomputed(build_fresher_cohort(df_ut), "fresher_cohort")
 
 print("🎉 All KPI precomputations completed successfully.")
@@ -0,0 +1,46 @@
+# utils/progressive.py
+
+from utils.question_runner import checkpoint
+
+
+class ProgressiveView:
+    """
+    Placeholders for the parts of a question view, laid out up front in
+    display order and filled as each stage of the computation completes.
+
+    Stages come from a generator of (slot, payload) pairs, cheapest first
+    (headline metric, then tables, then charts); `renderers[slot](payload)`
+    draws a payload into its slot. Every fill is sent to the browser
+    immediately, so the first insight appears after the cheapest aggregate
+    instead of after the whole view.
+    """
+
+    def __init__(self, slots, renderers: dict, parent=None, pending: str = "⏳ Loading…"):
+        import streamlit as st
+
+        self.renderers = renderers
+        self._slots = {}
+        for slot in slots:
+            # A slot is a name, or (name, container) to place it e.g. inside a tab
+            name, container = slot if isinstance(slot, tuple) else (slot, parent or st)
+            self._slots[name] = container.empty()
+            if pending:
+                self._slots[name].caption(pending)
+
+    def fill(self, slot: str, payload):
+        with self._slots[slot].container():
+            self.renderers[slot](payload)
+
+    def clear(self, slot: str):
+        self._slots[slot].empty()
+
+    def run(self, stages):
+        """Fill slots from a stage generator; slots it never yields are cleared."""
+        filled = set()
+        for slot, payload in stages:
+            self.fill(slot, payload)
+            filled.add(slot)
+            # Between stages: stop if the question was superseded or timed out
+            checkpoint()
+        for slot in self._slots.keys() - filled:
+            self.clear(slot)
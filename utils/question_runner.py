@@ -0,0 +1,229 @@
+# utils/question_runner.py
+
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# Questions executing at once across all sessions of this process
+QUESTION_WORKERS = int(os.getenv("QUESTION_WORKERS", "4"))
+
+# Time budget (seconds) per question id; others get QUESTION_TIMEOUT_S
+QUESTION_TIMEOUT_S = float(os.getenv("QUESTION_TIMEOUT_S", "60"))
+QUESTION_BUDGETS = {"Q7": 90.0, "Q10": 90.0}
+
+# Workers of the separate pool for fallback answers, so that runs still
+# winding down after a timeout can't starve them
+FALLBACK_WORKERS = int(os.getenv("FALLBACK_WORKERS", "2"))
+
+# How often the waiting script thread wakes up (to report progress and
+# to notice that the user has asked something else)
+POLL_INTERVAL_S = 0.25
+
+_current_token = contextvars.ContextVar("question_cancel_token", default=None)
+
+
+class QuestionCancelled(RuntimeError):
+    """The run was superseded by a newer question or ran out of time."""
+
+
+class QuestionTimeout(RuntimeError):
+    """The run did not finish within its time budget (it has been cancelled)."""
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise QuestionCancelled("Question run was cancelled.")
+
+
+def checkpoint():
+    """
+    Cooperative cancellation point for question code: raises
+    QuestionCancelled if the run executing here has been superseded or
+    timed out. A no-op outside the runner.
+    """
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def current_session_id() -> str:
+    """Streamlit session of the calling script thread ('default' outside Streamlit)."""
+    ctx = _script_run_ctx()
+    return ctx.session_id if ctx is not None else "default"
+
+
+def budget_for(qid: str) -> float:
+    return QUESTION_BUDGETS.get(qid, QUESTION_TIMEOUT_S)
+
+
+class QuestionRun:
+    def __init__(self, future, token: CancelToken, qid: str = None):
+        self.future = future
+        self.token = token
+        self.qid = qid
+        self.started = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def cancel(self):
+        self.token.cancel()
+        self.future.cancel()
+
+
+def _script_run_ctx():
+    try:
+        from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+    except ImportError:
+        return None
+    return get_script_run_ctx(suppress_warning=True)
+
+
+class _CancellableContext:
+    """
+    A run's view of the session's ScriptRunContext: everything is delegated,
+    but a message enqueued after the run was cancelled raises
+    QuestionCancelled instead of reaching the page. Every st.* call of
+    question code is thereby a checkpoint, and a superseded or timed-out run
+    can't write into the page after the approximate answer or the next
+    question.
+    """
+
+    def __init__(self, ctx, token: CancelToken):
+        object.__setattr__(self, "_ctx", ctx)
+        object.__setattr__(self, "_token", token)
+
+    def enqueue(self, msg):
+        self._token.check()
+        self._ctx.enqueue(msg)
+
+    def __getattr__(self, name):
+        return getattr(self._ctx, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._ctx, name, value)
+
+
+def _attach_script_run_ctx(ctx):
+    from streamlit.runtime.scriptrunner_utils.script_run_context import add_script_run_ctx
+    add_script_run_ctx(threading.current_thread(), ctx)
+
+
+def _detach_script_run_ctx():
+    # add_script_run_ctx(thread, None) would copy the current context, not clear it
+    from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+    setattr(threading.current_thread(), SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+
+
+class QuestionRunner:
+    """
+    Bounded worker pool for question execution.
+
+    submit() runs a question off the script thread with the caller's
+    Streamlit context attached, so its st.* calls still render into the
+    page. A newer submit() for the same session cancels the previous run;
+    question code observes that at checkpoint() calls and at its next st.*
+    call (see _CancellableContext). wait() enforces the time budget and
+    cancels runs that exceed it.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or QUESTION_WORKERS,
+                                        thread_name_prefix="question")
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, session_id, fn, *args, qid: str = None, **kwargs) -> QuestionRun:
+        token = CancelToken()
+        ctx = _script_run_ctx()
+
+        def execute():
+            token.check()
+            if ctx is not None:
+                _attach_script_run_ctx(_CancellableContext(ctx, token))
+            reset = _current_token.set(token)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current_token.reset(reset)
+                # Pool threads are reused by other sessions
+                if ctx is not None:
+                    _detach_script_run_ctx()
+
+        with self._lock:
+            previous = self._runs.get(session_id)
+            if previous is not None:
+                previous.cancel()
+            # Copy the context so the token (a ContextVar) is per run
+            run = QuestionRun(self._pool.submit(contextvars.copy_context().run, execute), token, qid)
+            self._runs[session_id] = run
+        run.future.add_done_callback(lambda _: self._forget(session_id, run))
+        return run
+
+    def _forget(self, session_id, run):
+        with self._lock:
+            if self._runs.get(session_id) is run:
+                del self._runs[session_id]
+
+    def cancel(self, session_id):
+        with self._lock:
+            run = self._runs.pop(session_id, None)
+        if run is not None:
+            run.cancel()
+
+    def wait(self, run: QuestionRun, timeout: float = None, on_tick=None):
+        """
+        Result of `run`, waiting at most `timeout` seconds from its start
+        (default: the budget of its question id). `on_tick(elapsed)` is called
+        while waiting; in Streamlit any st.* call there is a yield point, so a
+        rerun raised from it cancels the run before propagating.
+        """
+        timeout = budget_for(run.qid) if timeout is None else timeout
+        try:
+            while True:
+                remaining = timeout - run.elapsed()
+                if remaining <= 0:
+                    run.cancel()
+                    raise QuestionTimeout(f"{run.qid or 'Question'} exceeded its {timeout:.1f}s budget.")
+                try:
+                    return run.future.result(timeout=min(POLL_INTERVAL_S, remaining))
+                except FutureTimeout:
+                    if on_tick is not None:
+                        on_tick(run.elapsed())
+        except BaseException:
+            if not run.future.done():
+                run.cancel()
+            raise
+
+
+_runners = {}
+_runners_lock = threading.Lock()
+
+
+def get_question_runner() -> QuestionRunner:
+    """Process-wide runner shared by all Streamlit sessions."""
+    with _runners_lock:
+        if "questions" not in _runners:
+            _runners["questions"] = QuestionRunner()
+        return _runners["questions"]
+
+
+def get_fallback_runner() -> QuestionRunner:
+    """Process-wide runner of fallback answers, on FALLBACK_WORKERS threads of its own."""
+    with _runners_lock:
+        if "fallback" not in _runners:
+            _runners["fallback"] = QuestionRunner(max_workers=FALLBACK_WORKERS)
+        return _runners["fallback"]
@@ -0,0 +1,248 @@
+# utils/result_cache.py
+
+import os
+import json
+import time
+import zlib
+import pickle
+import sqlite3
+import hashlib
+import threading
+from filelock import FileLock
+
+# One cache file per node, shared by every Streamlit worker process of the
+# app's user. Payloads are pickles, so the directory must be private to that
+# user (see _ensure_private_dir): not a shared temp directory.
+RESULT_CACHE_PATH = os.getenv(
+    "RESULT_CACHE_PATH",
+    os.path.join(os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+                 "kpi_result_cache", "results.sqlite"))
+
+# Size bound of the stored payloads; least recently used entries go first
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "256"))
+
+# RESULT_CACHE=0 turns the cache off (every lookup misses, nothing is stored)
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE", "1") != "0"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    qid TEXT NOT NULL,
+    version TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+)
+"""
+
+
+def _normalize(value):
+    # Order-insensitive, JSON-friendly form of extracted parameters
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (set, frozenset)):
+        return sorted((_normalize(v) for v in value), key=str)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return value.strip().lower()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return str(value)
+
+
+def _ensure_private_dir(path: str):
+    """
+    Create `path` (mode 0700) or check an existing one: it must belong to
+    this user and not be writable by anyone else, since whoever can write
+    the cache file can make get() unpickle arbitrary code.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        return  # no POSIX ownership to check
+    stat = os.stat(path)
+    if stat.st_uid != os.getuid() or stat.st_mode & 0o022:
+        raise PermissionError(f"Result cache directory {path} is not private to this user; refusing to use it.")
+
+
+def result_key(qid: str, params: dict, version: str) -> str:
+    """Cache key of a question result: (question id, normalized parameters, dataset version)."""
+    payload = json.dumps({"qid": qid, "params": _normalize(params or {}), "version": version}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Disk-backed cache of question results shared across processes.
+
+    Results are pickled, zlib-compressed and stored in SQLite keyed on
+    result_key(). Writes and evictions are serialized across processes
+    with a file lock; reads go straight to SQLite. When the payloads
+    exceed `max_bytes`, entries of other dataset versions and then the
+    least recently used ones are evicted. Nothing is stored or served
+    under the UNVERSIONED token: without version metadata a data change
+    would never invalidate the entry, and the file outlives the process.
+    """
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, max_bytes: int = None, version_fn=None):
+        self.path = path
+        self.max_bytes = int(RESULT_CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        self._version_fn = version_fn
+        self._lock = FileLock(path + ".lock")
+        self._local = threading.local()
+        _ensure_private_dir(os.path.dirname(os.path.abspath(path)))
+        with self._lock:
+            self._connection().execute(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _version(self, version):
+        if version is not None:
+            return version
+        if self._version_fn is None:
+            from utils.dataset_version import current_version
+            self._version_fn = current_version
+        return self._version_fn()
+
+    @staticmethod
+    def _persistent(version) -> bool:
+        from utils.dataset_version import UNVERSIONED
+        return version != UNVERSIONED
+
+    def get(self, qid: str, params: dict = None, version: str = None, default=None):
+        """Stored result for (qid, params, version), or `default`."""
+        version = self._version(version)
+        if not RESULT_CACHE_ENABLED or not self._persistent(version):
+            return default
+        key = result_key(qid, params, version)
+        connection = self._connection()
+        row = connection.execute("SELECT payload FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return default
+        connection.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def put(self, qid: str, params: dict, value, version: str = None):
+        """Store a result; evicts old entries if the cache grows past its size bound."""
+        version = self._version(version)
+        if not RESULT_CACHE_ENABLED or not self._persistent(version):
+            return
+        payload = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO results (key, qid, version, payload, size, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (result_key(qid, params, version), qid, version, payload, len(payload), time.time()))
+            self._evict(connection, version)
+
+    def get_or_compute(self, qid: str, params: dict, compute, version: str = None):
+        """Cached result, or compute() stored under (qid, params, version)."""
+        version = self._version(version)
+        missing = object()
+        value = self.get(qid, params, version, default=missing)
+        if value is missing:
+            value = compute()
+            self.put(qid, params, value, version)
+        return value
+
+    def _evict(self, connection, version):
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Other dataset versions first, then least recently used
+        rows = connection.execute(
+            "SELECT key, size FROM results ORDER BY (version = ?), last_access", (version,)).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def size_bytes(self) -> int:
+        return self._connection().execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM results")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Process-wide result cache (the file itself is shared by all processes)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def _lookup(qid: str, params: dict, version: str, missing):
+    """(cache, version, value) of the shared cache; cache is None if it can't be used."""
+    try:
+        cache = get_result_cache()
+        version = cache._version(version)
+        return cache, version, cache.get(qid, params, version, default=missing)
+    except (OSError, sqlite3.Error, pickle.UnpicklingError, zlib.error):
+        return None, version, missing
+
+
+def _store(cache, qid: str, params: dict, value, version: str):
+    if cache is None:
+        return
+    try:
+        cache.put(qid, params, value, version)
+    except (OSError, sqlite3.Error):
+        pass
+
+
+def cached_result(qid: str, params: dict, compute, version: str = None):
+    """
+    get_or_compute on the shared cache. A cache that can't be opened or
+    read (disk full, read-only volume, corrupt file) only costs the
+    recomputation, never the answer.
+    """
+    missing = object()
+    cache, version, value = _lookup(qid, params, version, missing)
+    if value is not missing:
+        return value
+    value = compute()
+    _store(cache, qid, params, value, version)
+    return value
+
+
+def cached_stages(qid: str, params: dict, make_stages, version: str = None):
+    """
+    cached_result() for a stage generator (see utils.progressive): a hit
+    replays the stored stages, a miss streams make_stages() and stores its
+    stages once the generator has run to the end.
+    """
+    missing = object()
+    cache, version, stages = _lookup(qid, params, version, missing)
+    if stages is not missing:
+        yield from stages
+        return
+    stages = []
+    for stage in make_stages():
+        stages.append(stage)
+        yield stage
+    _store(cache, qid, params, stages, version)
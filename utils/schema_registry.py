@@ -0,0 +1,171 @@
+# utils/schema_registry.py
+
+import threading
+import pandas as pd
+from utils.calendar_dim import attach_periods, MONTH_LABELS
+
+# ---------------------------------------------------------------------
+# Declarative dataset schemas.
+#
+# Each canonical column lists its accepted source names in priority order;
+# the canonical name itself is tried first unless it appears in the list.
+# `mode` decides what happens to the source column:
+#   - "rename": the source is renamed to the canonical name
+#   - "copy":   the canonical column is added and the source is kept
+#     (used where other code still reads the source name, e.g. 'Exec DG')
+# `dtype` is one of "datetime", "float" or None (leave as is).
+# ---------------------------------------------------------------------
+SCHEMAS = {
+    "pnl": {
+        "columns": {
+            "Client": {"aliases": ["Company Code", "Company_Code"], "mode": "rename"},
+            "Amount": {"aliases": ["Amount in USD", "AmountInUSD", "Amount"], "mode": "rename", "dtype": "float"},
+            "Month": {"aliases": [], "dtype": "datetime"},
+            "Type": {"aliases": []},
+            "Segment": {"aliases": []},
+            "Group1": {"aliases": []},
+            "Group4": {"aliases": []},
+            "Group Description": {"aliases": ["Group_Description"]},
+            "FinalCustomerName": {"aliases": ["Final Customer Name", "Final_Customer_Name"]},
+            "BU": {"aliases": ["Exec DG"], "mode": "copy"},
+            "DU": {"aliases": ["Exec DU"], "mode": "copy"},
+        },
+        "required": ["Month"],
+    },
+    "ut": {
+        "columns": {
+            "Date_a": {"aliases": ["date_a", "Date_A"], "mode": "rename", "dtype": "datetime"},
+            "PSNo": {"aliases": ["PS No", "PS_No"]},
+            "FinalCustomerName": {"aliases": ["Final Customer Name", "Final_Customer_Name"]},
+            "Segment": {"aliases": []},
+            "BU": {"aliases": ["BusinessUnit", "Business_Unit", "Exec DG"], "mode": "copy"},
+            "DU": {"aliases": ["Delivery_Unit", "DeliveryUnit", "Exec DU"], "mode": "copy"},
+            "TotalBillableHours": {"aliases": ["Total Billable Hours"], "dtype": "float"},
+            "NetAvailableHours": {"aliases": ["Net Available Hours"], "dtype": "float"},
+            "Status": {"aliases": []},
+            "FresherAgeingCategory": {"aliases": ["Fresher Ageing Category"]},
+        },
+        "required": [],
+    },
+}
+
+
+def _derive_ut_calendar(df):
+    # Calendar parts used by the UT views and fallbacks
+    if "Date_a" in df.columns:
+        periods = attach_periods(df["Date_a"], ["Year", "MonthNum", "MonthLabel"])
+        df["Date_a_dt"] = df["Date_a"]
+        df["Year"] = periods["Year"]
+        df["MonthNum"] = periods["MonthNum"]
+        df["MonthName"] = periods["MonthLabel"]
+    elif "Month" in df.columns and pd.api.types.is_numeric_dtype(df["Month"]):
+        df["MonthNum"] = df["Month"]
+        df["MonthName"] = df["Month"].map(dict(enumerate(MONTH_LABELS, start=1)))
+    return df
+
+
+DERIVED_COLUMNS = {
+    "pnl": [],
+    "ut": [_derive_ut_calendar],
+}
+
+_mapping_cache = {}
+_mapping_lock = threading.Lock()
+
+
+def _dataset_version():
+    # Imported lazily: the registry itself has no storage dependency
+    from utils.dataset_version import current_version
+    return current_version()
+
+
+def resolve_mapping(dataset: str, columns, version: str = None) -> dict:
+    """
+    Resolve canonical column -> source column for a set of (stripped)
+    source columns. Results are cached per (dataset, version, columns).
+    """
+    columns = tuple(columns)
+    if version is None:
+        version = _dataset_version()
+    key = (dataset, version, columns)
+    with _mapping_lock:
+        if key in _mapping_cache:
+            return _mapping_cache[key]
+
+    present = set(columns)
+    mapping = {}
+    for canonical, spec in SCHEMAS[dataset]["columns"].items():
+        candidates = spec["aliases"] if canonical in spec["aliases"] else [canonical] + spec["aliases"]
+        for candidate in candidates:
+            if candidate in present:
+                mapping[canonical] = candidate
+                break
+
+    with _mapping_lock:
+        # Keep only mappings of the current version
+        for stale in [k for k in _mapping_cache if k[1] != version]:
+            del _mapping_cache[stale]
+        _mapping_cache[key] = mapping
+    return mapping
+
+
+def resolve_column(df: pd.DataFrame, dataset: str, canonical: str):
+    """Return the column of `df` that holds `canonical`, or None."""
+    if canonical in df.columns:
+        return canonical
+    return resolve_mapping(dataset, [str(c).strip() for c in df.columns]).get(canonical)
+
+
+def is_resolved(df: pd.DataFrame, dataset: str) -> bool:
+    """True if `df` already went through apply_schema for `dataset`."""
+    return isinstance(df, pd.DataFrame) and df.attrs.get("schema") == dataset
+
+
+def apply_schema(df: pd.DataFrame, dataset: str, version: str = None, derive: bool = True) -> pd.DataFrame:
+    """
+    Normalize a freshly loaded frame once at ingestion: strip column names,
+    resolve aliases, coerce dtypes and add derived columns. Downstream code
+    can rely on the canonical names and skip its own renames/conversions.
+    Pass derive=False to keep source columns that derivations would overwrite
+    (e.g. the fiscal 'Year' of the UT extract).
+    """
+    if is_resolved(df, dataset):
+        return df
+
+    schema = SCHEMAS[dataset]
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    mapping = resolve_mapping(dataset, df.columns, version)
+
+    renames = {}
+    for canonical, source in mapping.items():
+        if source == canonical:
+            continue
+        if schema["columns"][canonical].get("mode", "rename") == "copy":
+            df[canonical] = df[source]
+        else:
+            renames[source] = canonical
+    if renames:
+        # A preferred alias replaces a lower-priority column of the canonical name
+        df = df.drop(columns=[c for c in renames.values() if c in df.columns])
+        df = df.rename(columns=renames)
+
+    missing = [c for c in schema["required"] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Required column(s) {', '.join(missing)} not found in the {dataset} dataset.")
+
+    for canonical, spec in schema["columns"].items():
+        dtype = spec.get("dtype")
+        if canonical not in df.columns or dtype is None:
+            continue
+        if dtype == "datetime" and not pd.api.types.is_datetime64_any_dtype(df[canonical]):
+            df[canonical] = pd.to_datetime(df[canonical], errors="coerce")
+        elif dtype == "float" and not pd.api.types.is_float_dtype(df[canonical]):
+            df[canonical] = pd.to_numeric(df[canonical], errors="coerce").astype(float)
+
+    if derive:
+        for derive_fn in DERIVED_COLUMNS[dataset]:
+            df = derive_fn(df)
+
+    df.attrs["schema"] = dataset
+    return df
@@ -1,117 +1,74 @@
 import os
-import pandas as pd
-from sentence_transformers import SentenceTransformer, util
+import threading
+from utils.encoders import get_encoder, cos_sim
+from utils.encoder_service import get_encoder_service
+from utils.intent_prompts import PROMPT_BANK, PROMPTS as questions, PROMPT_QIDS as qids
+from utils.lexical_matcher import get_lexical_matcher, fast_path_stats
+from utils.intent_classifier import get_intent_classifier
 
-# Load the model
-model = SentenceTransformer('all-MiniLM-L6-v2')
+SIM_THRESHOLD = 0.72  # similarity threshold for fallback
 
-# Updated PROMPT BANK with dynamic Q2 and extended Q4 intents
-PROMPT_BANK = {
-    "Q1": [
-        "Which accounts had CM% < 30 in the last quarter?",
-        "Clients with less than 30% margin last quarter",
-        "Which accounts had margins below 30 percent",
-        "Show me accounts with less than 40% margin",
-        "List clients with margin below threshold"
-    ],
-    "Q2": [
-        "Which cost caused margin drop last month?",
-        "Which cost increased last month vs previous month?",
-        "What caused margin drop in Transportation?",
-        "Which cost item triggered margin decline last month?",
-        "Why did margin fall last month in Manufacturing?",
-        "Last month's margin dropped — what cost increased?",
-        "Find clients with higher costs and lower margin this month",
-        "Margin dropped in Automotive — which cost increased?",
-        "Identify cost buckets responsible for margin drop",
-        "Segment-wise cost increase that led to margin decline"
-    ],
-    "Q3": [
-        "Compare C&B cost by segment over two quarters",
-        "Which segments had highest C&B change",
-        "Show C&B cost trend by segment",
-        "C&B cost comparison Q1 vs Q2 by segment",
-        "Segment wise change in C&B cost"
-    ],
-    "Q4": [
-        "What is the MoM trend of C&B cost?",
-        "C&B vs revenue monthly trend",
-        "Month over month comparison of C&B with revenue",
-        "C&B cost as percentage of revenue trend",
-        "Compare C&B cost % with revenue monthly",
-        "What is the YoY, QoQ, MoM revenue trend?",
-        "YoY revenue trend by account",
-        "How has revenue changed quarter over quarter",
-        "Monthly revenue comparison by client",
-        "Revenue trends for each BU or DU",
-        "Revenue trend analysis by DU or BU",
-        "Show revenue trend without time filter",
-        "Client wise revenue change trends",
-        "Trend of revenue growth",
-        "Compare revenue over time"
-    ],
-    "Q7": [
-        "What is M-o-M HC for an account",
-        "Show monthly headcount trend per client",
-        "FTE trend over months",
-        "Client wise MoM headcount movement",
-        "Monthly total billable hours per account",
-        "MoM FTE for customers",
-        "Headcount trend month over month",
-        "Month-wise headcount per client"
-    ],
-    "Q8": [
-        "What is the UT trend for last 2 quarters for a DU/BU/account?",
-        "Show utilization by account",
-        "How is utilization % trending?",
-        "Compare utilization quarter over quarter",
-        "What is total UT% by BU this year?",
-        "Utilization YoY trend",
-        "Which DU has the highest UT this quarter?",
-        "Utilization rate over time for each account",
-        "Quarterly utilization % per segment",
-        "Trend of utilization over time"
-    ],
-    "Q10": [
-        "DU wise Fresher UT Trends",
-        "fresher ut trend",
-        "ut% trend for freshers",
-        "fresher utilization trend by DU"
-    ],
-    "Q6": [
-        "Realized Rate Drop",
-        "realized rate drop",
-        "Realized Rate",
-        "realized rate"
-    ],
-    "Q9": [
-        "Revenue Per Person",
-        "revenue per person",
-    ]
-}
+# Router of the questions the lexical fast path defers: "embeddings" (nearest
+# PROMPT_BANK prompt by sentence-transformer cosine) or "classifier" (the
+# trained TF-IDF model of utils/intent_classifier.py, no transformer needed)
+ROUTER_MODE = os.getenv("ROUTER_MODE", "embeddings").lower()
 
-# Flatten prompt bank into parallel lists
-questions, qids = [], []
-for qid, qlist in PROMPT_BANK.items():
-    for q in qlist:
-        questions.append(q)
-        qids.append(qid)
+_bank = {}
+_bank_lock = threading.Lock()
 
-# Precompute question embeddings
-question_embeddings = model.encode(questions)
+def question_embeddings():
+    """
+    PROMPT_BANK embeddings. The model (backend from ENCODER_BACKEND: torch,
+    onnx or onnx-int8) is loaded on first use: queries the lexical fast
+    path answers never need it.
+    """
+    with _bank_lock:
+        if "embeddings" not in _bank:
+            _bank["embeddings"] = get_encoder().encode(questions)
+        return _bank["embeddings"]
 
-SIM_THRESHOLD = 0.72  # similarity threshold for fallback
+def embedding_matches(user_queries):
+    """(qid, matched_prompt, score) of each query by cosine similarity to the PROMPT_BANK."""
+    # Concurrent sessions' queries are encoded together in micro-batches
+    query_embeddings = get_encoder_service().encode(user_queries)
+    similarities = cos_sim(query_embeddings, question_embeddings())
+    best_indices = similarities.argmax(axis=1).tolist()
 
-def find_best_matching_qid(user_query):
-    query_embedding = model.encode([user_query])[0]
-    similarities = util.cos_sim(query_embedding, question_embeddings)[0]
-    best_idx = similarities.argmax().item()
-    best_qid = qids[best_idx]
-    matched_question = questions[best_idx]
-    best_score = similarities[best_idx].item()
+    matches = []
+    for row, best_idx in enumerate(best_indices):
+        best_score = float(similarities[row, best_idx])
+        # Apply threshold: if below, treat as no match
+        best_qid = qids[best_idx] if best_score >= SIM_THRESHOLD else None
+        matches.append((best_qid, questions[best_idx], best_score))
+    return matches
 
-    # Apply threshold: if below, treat as no match
-    if best_score < SIM_THRESHOLD:
-        return None, matched_question, best_score
+def classifier_matches(user_queries):
+    """(qid, matched_prompt, score) of each query by the trained intent classifier."""
+    return get_intent_classifier(SIM_THRESHOLD).matches(user_queries)
 
-    return best_qid, matched_question, best_score
+def model_matches(user_queries):
+    """The ROUTER_MODE router over `user_queries`."""
+    if ROUTER_MODE == "classifier":
+        return classifier_matches(user_queries)
+    if ROUTER_MODE == "embeddings":
+        return embedding_matches(user_queries)
+    raise ValueError(f"Unknown router mode {ROUTER_MODE!r} (expected embeddings or classifier)")
+
+def find_best_matching_qids(user_queries):
+    """
+    find_best_matching_qid for many questions. Copies of bank prompts and
+    decisive keywords are answered by the lexical matcher; the rest go
+    through the ROUTER_MODE router in one batched call.
+    """
+    if not user_queries:
+        return []
+    lexical = get_lexical_matcher()
+    matches = [lexical.match(q) for q in user_queries]
+    deferred = [i for i, match in enumerate(matches) if match is None]
+    if deferred:
+        for i, match in zip(deferred, model_matches([user_queries[i] for i in deferred])):
+            matches[i] = match
+    return matches
+
+def find_best_matching_qid(user_query):
+    return find_best_matching_qids([user_query])[0]
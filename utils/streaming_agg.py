@@ -0,0 +1,212 @@
+# utils/streaming_agg.py
+
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.columnar import PARQUET_COMPRESSION
+from utils.parallel_agg import partial_aggregate, combine_partials, finalize_partials
+
+# Memory budget of the out-of-core mode (chunk + accumulator state)
+STREAM_MEMORY_MB = int(os.getenv("STREAM_MEMORY_MB", "256"))
+
+# Share of the budget a single decoded chunk may use; the rest is for
+# the accumulators and per-chunk temporaries
+CHUNK_BUDGET_SHARE = 0.25
+
+# A chunk's working set (row preparation copies, factorized keys, partial
+# results) relative to the decoded chunk itself
+WORKING_SET_FACTOR = 4
+
+# Rows decoded to measure the in-memory size of one row
+SAMPLE_ROWS = 2_000
+
+# Rows per row group when writing a fact table to the columnar cache
+FACT_ROW_GROUP_ROWS = 50_000
+
+
+class MemoryCapExceeded(RuntimeError):
+    """The accumulated state no longer fits the configured memory budget."""
+
+
+def fact_object_name(source_name: str) -> str:
+    """Columnar-cache name of a source workbook, e.g. LNTData.xlsx -> LNTData.parquet."""
+    return f"{os.path.splitext(source_name)[0]}.parquet"
+
+
+def _arrow_chunk(df: pd.DataFrame, schema=None) -> pa.Table:
+    if schema is None:
+        # Integers may turn up as floats (NaN) in a later chunk; store all numbers as float64
+        df = df.apply(lambda s: s.astype(float) if pd.api.types.is_integer_dtype(s) else s)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # Columns that are all-null in the first chunk are stored as strings
+        fields = [pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema]
+        return table.cast(pa.schema(fields))
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def write_fact_parquet(chunks, destination, row_group_rows: int = FACT_ROW_GROUP_ROWS) -> int:
+    """
+    Write an iterable of DataFrame chunks (same columns) to one Parquet file
+    with bounded row groups, so it can later be read back chunk by chunk.
+    Returns the number of rows written.
+    """
+    writer, rows = None, 0
+    try:
+        for chunk in chunks:
+            chunk = chunk.copy()
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            if writer is None:
+                table = _arrow_chunk(chunk)
+                writer = pq.ParquetWriter(destination, table.schema, compression=PARQUET_COMPRESSION)
+            else:
+                table = _arrow_chunk(chunk, writer.schema)
+            writer.write_table(table, row_group_size=row_group_rows)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def iter_excel_chunks(source, sheet_name=None, chunk_rows: int = FACT_ROW_GROUP_ROWS):
+    """Stream a workbook sheet as DataFrame chunks (openpyxl read-only mode)."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(next(rows))]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def batch_rows(source, columns=None, memory_mb: int = None) -> int:
+    """Rows per chunk so that one chunk's working set stays within its share of the budget."""
+    memory_mb = STREAM_MEMORY_MB if memory_mb is None else memory_mb
+    parquet = pq.ParquetFile(source)
+    sample = next(parquet.iter_batches(batch_size=SAMPLE_ROWS, columns=columns or None), None)
+    if sample is None or sample.num_rows == 0:
+        return SAMPLE_ROWS
+    # deep=True counts every string separately: a conservative per-row size
+    bytes_per_row = sample.to_pandas().memory_usage(index=True, deep=True).sum() / sample.num_rows
+    budget = memory_mb * 1024 * 1024 * CHUNK_BUDGET_SHARE
+    return int(max(100, min(budget // (bytes_per_row * WORKING_SET_FACTOR), 1_000_000)))
+
+
+def iter_frames(source, columns=None, memory_mb: int = None):
+    """Read a Parquet fact table as a stream of DataFrames sized to the memory budget."""
+    parquet = pq.ParquetFile(source)
+    if columns:
+        columns = [c for c in columns if c in parquet.schema_arrow.names]
+    size = batch_rows(source, columns, memory_mb)
+    for batch in parquet.iter_batches(batch_size=size, columns=columns or None):
+        yield batch.to_pandas()
+
+
+def _frame_bytes(df: pd.DataFrame) -> int:
+    # Object columns hold references to shared strings (Arrow deduplicates them
+    # on conversion); deep=True would count every reference as its own string
+    total = int(df.memory_usage(index=True, deep=False).sum())
+    for column in df.columns[df.dtypes == object]:
+        total += int(pd.Series(pd.unique(df[column])).memory_usage(index=False, deep=True))
+    return total
+
+
+def _state_bytes(state) -> int:
+    partial, pairs = state
+    return _frame_bytes(partial) + sum(_frame_bytes(p) for p in pairs.values())
+
+
+class StreamingAggregator:
+    """
+    Bounded-memory group-by over a stream of chunks.
+
+    Each chunk is reduced to a partial result (sums, counts, distinct
+    (keys, value) pairs) and folded into the running state, whose size
+    depends on the number of groups, not on the number of rows. If the
+    state outgrows the memory budget, MemoryCapExceeded is raised instead
+    of letting the process run out of memory.
+    """
+
+    def __init__(self, keys, aggs: dict, memory_mb: int = None):
+        self.keys = list(keys)
+        self.aggs = aggs
+        self.memory_bytes = (STREAM_MEMORY_MB if memory_mb is None else memory_mb) * 1024 * 1024
+        # Chunks are not partitioned by value, so no distinct count is additive
+        self._additive = set()
+        self._state = None
+        self.rows = 0
+
+    def add(self, chunk: pd.DataFrame):
+        self.rows += len(chunk)
+        partial = partial_aggregate(chunk, self.keys, self.aggs, self._additive)
+        parts = [partial] if self._state is None else [self._state, partial]
+        self._state = combine_partials(parts, self.keys, self.aggs, self._additive)
+        # Folding the next chunk copies the state once, so it may use half of what is left
+        if _state_bytes(self._state) > self.memory_bytes * (1 - CHUNK_BUDGET_SHARE) / 2:
+            raise MemoryCapExceeded(
+                f"Aggregation state for {self.keys} exceeds the {self.memory_bytes // (1024 * 1024)} MB "
+                f"budget after {self.rows:,} rows; raise STREAM_MEMORY_MB or aggregate at a coarser level.")
+
+    def result(self) -> pd.DataFrame:
+        if self._state is None:
+            columns = self.keys + list(self.aggs)
+            return pd.DataFrame(columns=columns)
+        return finalize_partials(self._state, self.keys, self.aggs, self._additive)
+
+
+def stream_aggregate(chunks, prepare, keys, aggs: dict, memory_mb: int = None) -> pd.DataFrame:
+    """Fold `prepare(chunk)` of every chunk into one StreamingAggregator."""
+    aggregator = StreamingAggregator(keys, aggs, memory_mb)
+    for chunk in chunks:
+        prepared = prepare(chunk)
+        if len(prepared):
+            aggregator.add(prepared)
+    return aggregator.result()
+
+
+# ---------------------------------------------------------------------
+# Out-of-core KPI builders. Each reads the fact table from the columnar
+# cache in chunks and applies the same row preparation as its in-memory
+# counterpart, so the outputs match.
+# ---------------------------------------------------------------------
+def stream_revenue(source, memory_mb: int = None) -> pd.DataFrame:
+    from kpi_engine.revenue_aggregated import REVENUE_KEYS, prepare_revenue_rows
+    return stream_aggregate(iter_frames(source, memory_mb=memory_mb), prepare_revenue_rows,
+                            REVENUE_KEYS, {'Revenue': ('Amount', 'sum')}, memory_mb)
+
+
+def stream_net_available_hours(source, memory_mb: int = None) -> pd.DataFrame:
+    from kpi_engine.net_available_hours_aggregated import HOURS_KEYS, prepare_hours_rows
+    return stream_aggregate(iter_frames(source, memory_mb=memory_mb), prepare_hours_rows,
+                            HOURS_KEYS, {'NetAvailableHours': ('NetAvailableHours', 'sum')}, memory_mb)
+
+
+def stream_headcount(source, memory_mb: int = None) -> pd.DataFrame:
+    from kpi_engine.headcount_aggregated import ACCOUNT_KEYS, prepare_account_headcount_rows
+    return stream_aggregate(iter_frames(source, memory_mb=memory_mb), prepare_account_headcount_rows,
+                            ACCOUNT_KEYS, {'Headcount': ('PSNo', 'nunique')}, memory_mb)
+
+
+def stream_fresher_cohort(source, memory_mb: int = None) -> pd.DataFrame:
+    from kpi_engine.fresher_cohort import COHORT_KEYS, HOUR_COLUMNS, prepare_cohort_rows
+    return stream_aggregate(iter_frames(source, memory_mb=memory_mb), prepare_cohort_rows,
+                            COHORT_KEYS, {col: (col, 'sum') for col in HOUR_COLUMNS}, memory_mb)
+
+
+def stream_ut_engine(source, memory_mb: int = None):
+    """UtilizationEngine over a fact table too large to load (same views as the in-memory engine)."""
+    from kpi_engine.ut_engine import CUBE_KEYS, HOUR_COLUMNS, UtilizationEngine, prepare_cube_rows
+    cube = stream_aggregate(iter_frames(source, memory_mb=memory_mb), prepare_cube_rows,
+                            CUBE_KEYS, {col: (col, 'sum') for col in HOUR_COLUMNS}, memory_mb)
+    return UtilizationEngine.from_cube(cube)
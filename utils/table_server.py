@@ -0,0 +1,97 @@
+# utils/table_server.py
+
+import math
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from utils.dataset_version import VersionedCache
+from utils.groupby_kernels import cached_fingerprint
+
+# Rows sent to the browser per page
+PAGE_SIZE = 50
+
+ORIGINAL_ORDER = "(original order)"
+
+TablePage = namedtuple("TablePage", ["rows", "total_rows", "page", "pages"])
+
+# Row order of a table after filter + sort, per (table, sort, filter)
+_orders = VersionedCache(max_entries=64)
+
+
+def _queryable(df: pd.DataFrame) -> pd.DataFrame:
+    # A meaningful index (pivot rows) is searchable and sortable like a column
+    return df if isinstance(df.index, pd.RangeIndex) else df.reset_index()
+
+
+def _row_order(frame: pd.DataFrame, sort_by, ascending: bool, search: str) -> np.ndarray:
+    positions = np.arange(len(frame))
+    if search:
+        mask = np.zeros(len(frame), dtype=bool)
+        for column in frame.columns:
+            if not pd.api.types.is_numeric_dtype(frame[column]):
+                mask |= frame[column].astype(str).str.contains(search, case=False, regex=False, na=False).to_numpy()
+        positions = positions[mask]
+    if sort_by is not None and sort_by in frame.columns:
+        keys = frame[sort_by].iloc[positions].reset_index(drop=True)
+        positions = positions[keys.sort_values(ascending=ascending, kind="stable", na_position="last").index]
+    return positions
+
+
+def query_table(df: pd.DataFrame, sort_by=None, ascending: bool = True, search: str = None,
+                page: int = 1, page_size: int = PAGE_SIZE) -> TablePage:
+    """
+    One page of `df` after a text filter and a sort, computed next to the
+    data: only `page_size` rows leave the process. The filtered and sorted
+    row order is memoized per (table contents, sort, filter), so paging
+    through a large table sorts it once.
+    """
+    frame = _queryable(df)
+    search = (search or "").strip()
+    order = _orders.get_or_compute((cached_fingerprint(df), sort_by, ascending, search),
+                                   lambda: _row_order(frame, sort_by, ascending, search))
+    total_rows = len(order)
+    pages = max(1, math.ceil(total_rows / page_size))
+    page = min(max(int(page), 1), pages)
+    rows = frame.iloc[order[(page - 1) * page_size:page * page_size]]
+    if frame is not df:
+        rows = rows.set_index(list(rows.columns[:df.index.nlevels]))
+        rows.index.names = df.index.names
+    return TablePage(rows, total_rows, page, pages)
+
+
+def serve_table(df: pd.DataFrame, key: str, page_size: int = PAGE_SIZE, **dataframe_kwargs):
+    """
+    st.dataframe() for tables that may be large: the frame stays on the
+    server and the browser gets one page at a time (st.dataframe ships it
+    as Arrow), with filter, sort and paging controls that query the full
+    table. Tables that fit on one page render as a plain st.dataframe().
+    `key` must be unique on the page.
+    """
+    import streamlit as st
+
+    if len(df) <= page_size:
+        st.dataframe(df, **dataframe_kwargs)
+        return
+
+    columns = list(_queryable(df).columns)
+
+    # A fragment: paging, sorting and filtering rerun only this table
+    @st.fragment
+    def table():
+        col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+        search = col1.text_input("Filter rows", key=f"{key}_search", placeholder="🔎 Filter rows containing…",
+                                 label_visibility="collapsed")
+        sort_by = col2.selectbox("Sort by", [ORIGINAL_ORDER] + columns, key=f"{key}_sort",
+                                 label_visibility="collapsed")
+        descending = col3.toggle("Desc", key=f"{key}_desc")
+        page = col4.number_input("Page", min_value=1, value=1, step=1, key=f"{key}_page",
+                                 label_visibility="collapsed")
+
+        result = query_table(df, None if sort_by == ORIGINAL_ORDER else sort_by, not descending, search,
+                             page, page_size)
+        st.dataframe(result.rows, **dataframe_kwargs)
+        first = (result.page - 1) * page_size + 1 if result.total_rows else 0
+        last = min(result.page * page_size, result.total_rows)
+        st.caption(f"Rows {first:,}–{last:,} of {result.total_rows:,} (page {result.page} of {result.pages})")
+
+    table()
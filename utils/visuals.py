@@ -1,20 +1,108 @@
-import matplotlib.pyplot as plt
 import io
 import base64
+import queue
+from contextlib import contextmanager
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from utils.dataset_version import VersionedCache
+from utils.groupby_kernels import frame_fingerprint, cached_fingerprint
 
-def generate_bar_chart(df, x_col, y_col, title):
-    fig, ax = plt.subplots()
-    ax.bar(df[x_col], df[y_col])
-    ax.set_title(title)
-    ax.set_xlabel(x_col)
-    ax.set_ylabel(y_col)
-    plt.xticks(rotation=45)
-
-    buf = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    encoded = base64.b64encode(buf.read()).decode("utf-8")
-    plt.close(fig)
-    return {"type": "image", "image_base64": encoded}
+# Bars/series drawn before the rest are folded into "Other"
+MAX_CATEGORIES = 12
+OTHER_LABEL = "Other"
+
+# Rendered images and chart specs per (data fingerprint, chart type, options)
+_chart_cache = VersionedCache(max_entries=256)
+
+
+class FigurePool:
+    """
+    Reusable Matplotlib figures on the Agg canvas. Clearing a figure is
+    cheaper than creating one, and Figure objects (unlike pyplot's global
+    figure manager) are safe to draw on from question worker threads.
+    """
+
+    def __init__(self, size: int = 4):
+        self._free = queue.LifoQueue()
+        self._size = size
+
+    @contextmanager
+    def figure(self, figsize=(6.4, 4.8)):
+        try:
+            fig = self._free.get_nowait()
+        except queue.Empty:
+            fig = Figure()
+            FigureCanvasAgg(fig)
+        fig.set_size_inches(figsize)
+        try:
+            yield fig
+        finally:
+            fig.clear()
+            if self._free.qsize() < self._size:
+                self._free.put(fig)
+
+
+_figures = FigurePool()
+
+
+def _fingerprint(data):
+    if isinstance(data, (tuple, list)):
+        return tuple(_fingerprint(d) for d in data)
+    return cached_fingerprint(data)
 
+
+def top_n_with_other(df, category_col, value_col, n: int = MAX_CATEGORIES, by=None):
+    """
+    Keep the `n - 1` largest categories of `category_col` (by total
+    `value_col`) and fold the rest into one "Other" category, summed per
+    `by` column(s) (e.g. Month) if given. Frames within budget pass through.
+    """
+    totals = df.groupby(category_col, observed=True)[value_col].sum()
+    if len(totals) <= n:
+        return df
+    keep = totals.nlargest(n - 1).index
+    by = [by] if isinstance(by, str) else list(by or [])
+    rest = df[~df[category_col].isin(keep)]
+    other = rest.groupby(by, observed=True, as_index=False)[value_col].sum() if by \
+        else pd.DataFrame({value_col: [rest[value_col].sum()]})
+    other[category_col] = OTHER_LABEL
+    return pd.concat([df[df[category_col].isin(keep)], other[df.columns.intersection(other.columns)]],
+                     ignore_index=True)
+
+
+def cached_spec(kind: str, data, build, *options):
+    """
+    Vega-Lite spec (dict) of the Altair chart `build(data)`, cached per
+    (data fingerprint, chart kind, options). Render it with
+    st.vega_lite_chart(); rebuilding and validating the Altair chart on
+    every rerun is skipped.
+    """
+    return _chart_cache.get_or_compute(("spec", kind, _fingerprint(data)) + options,
+                                       lambda: build(data).to_dict())
+
+
+def _render_bar_chart(df, x_col, y_col, title):
+    data = df.groupby(x_col, observed=True, as_index=False, sort=False)[y_col].sum()
+    data[x_col] = data[x_col].astype(str)
+    data = top_n_with_other(data, x_col, y_col)
+
+    with _figures.figure() as fig:
+        ax = fig.subplots()
+        ax.bar(data[x_col], data[y_col])
+        ax.set_title(title)
+        ax.set_xlabel(x_col)
+        ax.set_ylabel(y_col)
+        ax.tick_params(axis="x", labelrotation=45)
+
+        buf = io.BytesIO()
+        fig.tight_layout()
+        fig.savefig(buf, format="png")
+    return {"type": "image", "image_base64": base64.b64encode(buf.getvalue()).decode("utf-8")}
+
+
+def generate_bar_chart(df, x_col, y_col, title):
+    # Bars of repeated x values are summed; beyond MAX_CATEGORIES the
+    # smallest are shown as one "Other" bar
+    return _chart_cache.get_or_compute(("bar", frame_fingerprint(df[[x_col, y_col]]), x_col, y_col, title),
+                                       lambda: _render_bar_chart(df, x_col, y_col, title))